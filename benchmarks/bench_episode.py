@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from episode_detector import analyze_episode_fields, tokenize
+from rename_engine import RenameSettings, make_file_record, sort_files_by_episode, sort_files_by_field
+from name_template import render_names
+
+# 集数字段识别基准：多部番剧混合、带 CRC 和分辨率的发布名，检查耗时随文件数线性增长且识别正确
+# 之后对比更换集数选择后整批重新取集数、排序、渲染预览的耗时：
+#   - 旧版：按数字值 episode_pattern 逐个比较 numbers 列表（只有数值相同的文件能匹配，其余按序号）
+#   - 每次刷新重新分词查找字段
+#   - 导入时建好的字段索引（文件信息中的 'fields'）
+# 用法：python benchmarks/bench_episode.py [最大文件数，默认 100000]
+
+
+def make_files(count):
+    rng = random.Random(0)
+    return [
+        {'filename': f'[Group] Title {i // 1000} - {i % 1000 + 1:03d} [WebRip 1080p HEVC-10bit AAC][{rng.getrandbits(32):08X}].mkv'}
+        for i in range(count)
+    ]
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    count = 1000
+    while count <= limit:
+        files = make_files(count)
+        start = time.perf_counter()
+        analysis = analyze_episode_fields(files)
+        elapsed = time.perf_counter() - start
+        print(f'{count:>8} 个文件  {elapsed * 1000:>8.1f} ms  {elapsed / count * 1e6:.1f} µs/文件  '
+              f'{analysis.best.describe()}  置信度 {analysis.confidence:.0%}')
+        count *= 10
+
+    records = [make_file_record(f'/media/{file_info["filename"]}', 0) for file_info in make_files(limit)]
+    field = analyze_episode_fields(records).best.key
+    settings = RenameSettings(title='Title', episode_field=field)
+
+    def reselect_pattern(files):
+        sort_files_by_episode(files, '500')
+        render_names(RenameSettings(title='Title', episode_pattern='500'), files)
+
+    def reselect_tokenize(files):
+        values = {}
+        for file_info in files:
+            value = next((number for key, number, _, _ in tokenize(file_info['filename']) if key == field), None)
+            values[id(file_info)] = int(value) if value is not None else 0
+        files.sort(key=lambda file_info: values[id(file_info)])
+        render_names(settings, files)
+
+    def reselect_index(files):
+        sort_files_by_field(files, field)
+        render_names(settings, files)
+
+    print(f'更换集数选择后重新排序和渲染 {limit} 个文件:')
+    for label, work in (('按数字值比较', reselect_pattern), ('重新分词', reselect_tokenize), ('字段索引', reselect_index)):
+        elapsed = []
+        for _ in range(3):
+            # 每次都从同样打乱的顺序开始
+            files = list(records)
+            random.Random(1).shuffle(files)
+            start = time.perf_counter()
+            work(files)
+            elapsed.append(time.perf_counter() - start)
+        print(f'  {label:<8}{min(elapsed) * 1000:>10.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
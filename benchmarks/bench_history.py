@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rename_history import RenameHistory, where, daily, errors
+
+# 重命名历史基准：写入 N 条记录，再流式查询文件去向、每日统计和失败原因，报告耗时和内存峰值
+# 用法：python benchmarks/bench_history.py [记录数，默认 1000000]
+
+
+def measure(label, work):
+    start = time.perf_counter()
+    result = work()
+    elapsed = time.perf_counter() - start
+    # tracemalloc 会明显拖慢执行，内存峰值单独再跑一次测量
+    tracemalloc.start()
+    work()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:<8}{elapsed:>8.2f} s  内存峰值 {peak / 1024 / 1024:.1f} MB')
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as folder:
+        history_file = os.path.join(folder, 'rename_history.jsonl')
+        history = RenameHistory(history_file)
+
+        def write():
+            for batch_start in range(0, count, 1000):
+                batch = history.begin(None, 'rename', '[影视类型] - [标题] - [季数] - [集数]', 1000)
+                for i in range(batch_start, min(batch_start + 1000, count)):
+                    old = f'/media/anime/[Group] Title {i // 1000} - {i % 1000:03d} [WebRip 1080p].mkv'
+                    new = f'/media/anime/番剧 - Title {i // 1000} - 1 - {i % 1000:03d}.mkv'
+                    error = OSError(13, 'Permission denied') if i % 997 == 0 else None
+                    batch.record(old, new, 1024 ** 3, 0.002, error)
+                batch.end(1000, 0, 0)
+
+        start = time.perf_counter()
+        write()
+        print(f'{"写入":<8}{time.perf_counter() - start:>8.2f} s')
+        print(f'{count} 条记录，文件大小 {os.path.getsize(history_file) / 1024 / 1024:.1f} MB')
+        name = f'[Group] Title {count // 2000} - 500 [WebRip 1080p].mkv'
+        measure('where', lambda: list(where(history_file, name)))
+        measure('daily', lambda: daily(history_file))
+        measure('errors', lambda: errors(history_file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rename_engine import make_file_record, natural_sort_key
+from file_list import FileList
+
+# 导入基准：分批向已有列表添加文件，对比旧版（逐个线性查重 + 每次整体重排）与 FileList
+# 用法：python benchmarks/bench_import.py [每批文件数，默认 2000] [批数，默认 10]
+
+
+def make_batch(batch, size):
+    return [
+        make_file_record(f'/anime/{batch:03d}/[Group] Title - {i:04d} [WebRip 1080p HEVC-10bit AAC].mkv', size=0)
+        for i in range(size)
+    ]
+
+
+def legacy_add(files, records):
+    # 旧版 add_files_to_list：每个路径都重建一次路径列表做查重，最后整体重新排序
+    for record in records:
+        if record['path'] not in [f['path'] for f in files]:
+            files.append(record)
+    files.sort(key=lambda x: natural_sort_key(x['filename']))
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    batches = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    data = [make_batch(b, batch_size) for b in range(batches)]
+
+    print(f'每批 {batch_size} 个文件，共 {batches} 批')
+    print(f'{"已有文件数":>10} {"旧版(s)":>10} {"FileList(s)":>12}')
+    legacy_files = []
+    file_list = FileList()
+    # 旧版为平方复杂度，文件数较多时跳过
+    legacy_limit = 20000
+    for records in data:
+        existing = len(file_list)
+        legacy_time = None
+        if existing + batch_size <= legacy_limit:
+            start = time.perf_counter()
+            legacy_add(legacy_files, records)
+            legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        file_list.add_records(records)
+        new_time = time.perf_counter() - start
+
+        legacy_text = f'{legacy_time:.3f}' if legacy_time is not None else '-'
+        print(f'{existing:>10} {legacy_text:>10} {new_time:>12.3f}')
+
+    # 再次添加同一批文件，全部命中去重索引
+    start = time.perf_counter()
+    added = file_list.add_records(data[0])
+    print(f'重复添加 {batch_size} 个文件: 新增 {added} 个, 耗时 {time.perf_counter() - start:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
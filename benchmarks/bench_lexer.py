@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from release_lexer import lex_release
+from rename_engine import extract_numbers
+from episode_detector import tokenize
+
+# 发布名词法分析吞吐量：生成多种风格的文件名（字幕组、scene、全括号、中文、带装饰），
+# 对比 lex_release（全部字段）与只提取数字的 extract_numbers、tokenize
+#   python benchmarks/bench_lexer.py --count 1000000
+
+DEFAULT_COUNT = 1000000
+STYLES = (
+    '[Group{group}] Title {show} - {episode:02d} [WebRip 1080p HEVC-10bit AAC][{crc:08X}].mkv',
+    '[Group{group}] Title {show} - {episode:02d}v2 (1080p) [{crc:08X}].mkv',
+    'Show.Name.{show}.S01E{episode:02d}.1080p.WEB-DL.x264-GRP.mkv',
+    '[Group{group}][Title {show}][{episode:02d}][1080p][CHS].mp4',
+    '[Group{group}] 标题{show} 第{episode:02d}话 [WEB-DL][1080p][AVC AAC].mp4',
+    '【Group{group}】★04月新番★[标题{show}][{episode:02d}][1080p][简日双语].mp4',
+    'Title {show} {episode:02d}.mkv'
+)
+
+
+def make_names(count):
+    return [
+        STYLES[i % len(STYLES)].format(group=i % 7, show=i // 1000, episode=i % 1000 % 99 + 1, crc=i * 2654435761 % 2 ** 32)
+        for i in range(count)
+    ]
+
+
+def measure(function, names):
+    start = time.perf_counter()
+    for name in names:
+        function(name)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='发布名词法分析吞吐量')
+    parser.add_argument('--count', type=int, default=DEFAULT_COUNT, help='文件名个数（默认 %(default)s）')
+    args = parser.parse_args(argv)
+
+    names = make_names(args.count)
+    print(f'{"函数":<18}{"耗时(s)":>10}{"每秒文件名":>14}{"每个(µs)":>10}')
+    for label, function in (('lex_release', lex_release), ('extract_numbers', extract_numbers),
+                            ('tokenize', tokenize)):
+        seconds = measure(function, names)
+        print(f'{label:<18}{seconds:>10.2f}{args.count / seconds:>14,.0f}{seconds / args.count * 1e6:>10.2f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
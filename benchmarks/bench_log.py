@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_writer import LogWriter, format_entries
+
+# 日志基准：旧版每条消息打开/关闭一次日志文件，对比 LogWriter 的后台批量写入
+# 用法：python benchmarks/bench_log.py [消息数，默认 10000]
+
+
+def legacy_log(log_file, message):
+    with open(log_file, 'a', encoding='utf-8') as f:
+        f.write(format_entries([message]))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    messages = [f'成功重命名: [Group] Title - {i:05d} [WebRip 1080p].mkv -> 番剧 - Title - 1 - {i:05d}.mkv'
+                for i in range(count)]
+    with tempfile.TemporaryDirectory() as folder:
+        legacy_file = os.path.join(folder, 'legacy.txt')
+        start = time.perf_counter()
+        for message in messages:
+            legacy_log(legacy_file, message)
+        legacy_time = time.perf_counter() - start
+
+        writer_file = os.path.join(folder, 'writer.txt')
+        start = time.perf_counter()
+        writer = LogWriter(writer_file)
+        for message in messages:
+            writer.write(message)
+        call_time = time.perf_counter() - start
+        writer.close()
+        total_time = time.perf_counter() - start
+
+        assert os.path.getsize(legacy_file) == os.path.getsize(writer_file)
+    print(f'{count} 条日志')
+    print(f'旧版（逐条打开文件）: {legacy_time:.3f} s')
+    print(f'LogWriter: 调用方 {call_time:.3f} s, 含写完文件 {total_time:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
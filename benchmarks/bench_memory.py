@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rename_engine import FileRecord, extract_numbers, format_file_size
+
+# 文件记录内存基准：每个文件占用的内存（tracemalloc 统计，含文件名等字符串）
+#   - 旧版：每个文件一个字典，路径、预先格式化的大小字符串和数字序列列表各自独立保存
+#   - FileRecord：__slots__，目录前缀共用，大小字符串和数字序列按需计算（另含集数字段索引）
+# 用法：python benchmarks/bench_memory.py [文件数，默认 500000]
+#
+# 参考结果（500000 个文件，100 个目录，Python 3.11）：旧版约 1030 字节/文件，FileRecord 约 310 字节/文件
+
+
+def legacy_record(file_path, size):
+    # 旧版 make_file_record 生成的字典
+    filename = os.path.basename(file_path)
+    return {
+        'path': file_path,
+        'filename': filename,
+        'ext': os.path.splitext(filename)[1],
+        'size': size,
+        'size_str': format_file_size(size),
+        'numbers': extract_numbers(filename)
+    }
+
+
+def make_paths(count):
+    rng = random.Random(0)
+    return [
+        (f'/media/anime/Title {i // 5000}', f'[Group] Title {i // 5000} - {i % 5000 + 1:04d} '
+         f'[WebRip 1080p HEVC-10bit AAC][{rng.getrandbits(32):08X}].mkv', rng.randrange(1 << 30, 1 << 31))
+        for i in range(count)
+    ]
+
+
+def measure(label, build, paths):
+    tracemalloc.start()
+    start = time.perf_counter()
+    # 与扫描器一样，每个文件的完整路径字符串在导入时新建
+    records = [build(os.path.join(directory, name), size) for directory, name, size in paths]
+    elapsed = time.perf_counter() - start
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:<12}{used / len(records):>8.0f} 字节/文件  共 {used / 1024 / 1024:>7.1f} MB  '
+          f'创建耗时 {elapsed:.2f} s（含 tracemalloc 开销）')
+    return records
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    paths = make_paths(count)
+    print(f'{count} 个文件')
+    measure('旧版字典', legacy_record, paths)
+    measure('FileRecord', FileRecord.from_path, paths)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rename_engine import RenameSettings, make_file_record, plan_renames, apply_renames
+
+# 重命名基准：模拟网络共享上每次 os.rename 的往返延迟，对比逐个执行与按挂载点并发执行
+# 用法：python benchmarks/bench_rename.py [文件数，默认 10000] [每次重命名的延迟毫秒，默认 2]
+# 指定第三个参数（如 NAS 上的文件夹）时在该文件夹中测试，不再模拟延迟
+
+
+def make_files(folder, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f'[Group] Title - {i + 1:05d} [WebRip 1080p HEVC-10bit AAC].mkv')
+        open(path, 'wb').close()
+        paths.append(path)
+    return [make_file_record(path) for path in paths]
+
+
+def run(folder, count, workers_per_mount):
+    records = make_files(folder, count)
+    settings = RenameSettings(template='[标题] - [季数] - [集数]', custom_rule='', media_type='番剧',
+                              title='Title', season='1', episode_prefix='EP')
+    plan = plan_renames(records, settings)
+    start = time.perf_counter()
+    success_count, error_count = apply_renames(plan, workers_per_mount=workers_per_mount)
+    elapsed = time.perf_counter() - start
+    assert (success_count, error_count) == (count, 0)
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.002
+    base = sys.argv[3] if len(sys.argv) > 3 else None
+
+    if base is None:
+        real_rename = os.rename
+
+        def slow_rename(source, target):
+            time.sleep(latency)
+            real_rename(source, target)
+        os.rename = slow_rename
+        print(f'{count} 个文件，每次重命名模拟 {latency * 1000:.1f} ms 延迟')
+    else:
+        print(f'{count} 个文件，位于 {base}')
+
+    print(f'{"每挂载点线程数":>14} {"耗时(s)":>10} {"加速":>8}')
+    serial = None
+    for workers in (1, 4, 8, 16):
+        folder = tempfile.mkdtemp(dir=base)
+        try:
+            elapsed = run(folder, count, workers)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        serial = serial or elapsed
+        print(f'{workers:>14} {elapsed:>10.3f} {serial / elapsed:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
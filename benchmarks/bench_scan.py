@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rename_engine import is_video_file, make_file_record
+from file_scanner import scan_folder
+
+# 扫描基准：对比旧版（os.walk + 逐个 os.path.getsize）、并行 scandir 扫描器以及扫描缓存
+# 用法：python benchmarks/bench_scan.py [要扫描的文件夹]
+# 不指定文件夹时在临时目录中生成测试文件；要体现网络延迟的影响，请指定 SMB/NFS 挂载目录
+
+
+def legacy_scan(folder):
+    records = []
+    for root, _, filenames in os.walk(folder):
+        for filename in filenames:
+            if is_video_file(filename):
+                records.append(make_file_record(os.path.join(root, filename)))
+    return records
+
+
+def make_tree(base, shows=500, episodes=200):
+    for show in range(shows):
+        folder = os.path.join(base, f'Show {show:03d}')
+        os.makedirs(folder)
+        for episode in range(episodes):
+            name = f'[Group] Show {show:03d} - {episode:02d} [WebRip 1080p HEVC-10bit AAC].mkv'
+            open(os.path.join(folder, name), 'wb').close()
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    records = func(*args, **kwargs)
+    return records, time.perf_counter() - start
+
+
+def main():
+    cache_dir = tempfile.TemporaryDirectory()
+    cache_file = os.path.join(cache_dir.name, 'scan_cache.db')
+    if len(sys.argv) > 1:
+        folder = sys.argv[1]
+        tmp = None
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        folder = tmp.name
+        make_tree(folder)
+
+    legacy, legacy_time = timed(legacy_scan, folder)
+    scanned, scan_time = timed(scan_folder, folder)
+    assert sorted(r['path'] for r in legacy) == sorted(r['path'] for r in scanned)
+
+    print(f'文件数: {len(scanned)}')
+    print(f'os.walk + getsize: {legacy_time:.3f} s')
+    print(f'并行 scandir:      {scan_time:.3f} s')
+
+    cold, cold_time = timed(scan_folder, folder, cache_file=cache_file)
+    warm, warm_time = timed(scan_folder, folder, cache_file=cache_file)
+    assert sorted(r['path'] for r in cold) == sorted(r['path'] for r in warm) == sorted(r['path'] for r in legacy)
+    print(f'扫描缓存（首次）:  {cold_time:.3f} s')
+    print(f'扫描缓存（未变化）: {warm_time:.3f} s')
+    cache_dir.cleanup()
+
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
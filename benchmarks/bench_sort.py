@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rename_engine import FileRecord, FILE_SORT_KEYS
+from file_list import FileList
+from episode_detector import analyze_episode_fields
+
+# 排序基准：在大列表中依次点击各列标题（每列升序、倒序各一次）
+#   - 旧版：每次点击都按该列重新计算排序键并整体排序
+#   - FileList：首次使用某列时生成并缓存顺序，之后只取出缓存
+# 用法：python benchmarks/bench_sort.py [文件数，默认 100000]
+
+COLUMNS = ['filename', 'ext', 'size', 'path']
+
+
+def make_records(count):
+    rng = random.Random(0)
+    return [
+        FileRecord(f'/media/anime/Title {rng.randrange(200)}/',
+                   f'[Group] Title {rng.randrange(200)} - {rng.randrange(1, 1000):03d} [WebRip 1080p]'
+                   f'{rng.choice([".mkv", ".mp4", ".ts"])}', rng.randrange(1 << 30, 1 << 31))
+        for _ in range(count)
+    ]
+
+
+def timed(work):
+    start = time.perf_counter()
+    work()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    records = make_records(count)
+    files = FileList(records)
+    field = analyze_episode_fields(files).best.key
+    legacy = list(files)
+    print(f'{count} 个文件，单位 ms')
+    print(f'{"列":<10}{"旧版":>10}{"首次":>10}{"再次":>10}{"倒序":>10}')
+    for column in COLUMNS + ['episode']:
+        if column == 'episode':
+            values = {id(record): int(record['fields'][1][record['fields'][0][field]])
+                      if field in record['fields'][0] else 0 for record in legacy}
+            legacy_key = lambda record: values[id(record)]
+            key = ('episode', field)
+        else:
+            legacy_key = FILE_SORT_KEYS[column]
+            key = column
+        legacy_time = timed(lambda: legacy.sort(key=legacy_key))
+        first = timed(lambda: files.sort_by(key))
+        files.sort_by('natural')
+        again = timed(lambda: files.sort_by(key))
+        reverse = timed(lambda: files.sort_by(key, reverse=True))
+        print(f'{column:<10}{legacy_time:>10.1f}{first:>10.1f}{again:>10.1f}{reverse:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rename_engine import (
+    RenameSettings, extract_numbers, natural_sort_key, sort_files_by_field, plan_renames, apply_renames
+)
+from name_template import render_names
+from file_list import FileList
+from import_worker import ImportJob
+from episode_detector import analyze_episode_fields
+from rename_journal import RenameJournal
+from rename_history import RenameHistory
+from log_writer import LogWriter
+
+# 热点路径基准套件：在 tmpfs 上生成字幕组风格的文件名，不启动界面，依次测量
+#   import                添加文件夹（add_files_to_list：后台扫描 + 界面线程合并到文件列表）
+#   extract_numbers       提取每个文件名中的数字序列
+#   natural_sort_key      计算每个文件名的自然排序键
+#   detect_episode        识别集数字段
+#   generate_new_name     渲染整批新文件名（预览与重命名计划）
+#   sort_files_by_episode 按集数字段排序（清空缓存后的首次排序）
+#   start_rename          执行重命名（含重命名日志、历史和日志文件，与界面中的"开始重命名"相同）
+# 结果可输出为 JSON，并与保存的基线对比，耗时超出容差时以非零状态退出：
+#   python benchmarks/bench_suite.py --sizes 1000 10000 --output results.json
+#   python benchmarks/bench_suite.py --save-baseline benchmarks/baseline.json
+#   python benchmarks/bench_suite.py --baseline benchmarks/baseline.json --tolerance 0.25
+# 基线与机器有关，请在同一台机器上生成和对比
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+# 每个文件夹中的文件数
+FILES_PER_FOLDER = 1000
+CASES = ['import', 'extract_numbers', 'natural_sort_key', 'detect_episode',
+         'generate_new_name', 'sort_files_by_episode', 'start_rename']
+SETTINGS = dict(template='[标题] - [季数] - [集数]', media_type='番剧', title='Title', season='1', episode_prefix='EP')
+
+
+def default_base_dir():
+    # 优先使用 tmpfs，避免磁盘性能影响结果
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def make_tree(base, count):
+    for start in range(0, count, FILES_PER_FOLDER):
+        show = start // FILES_PER_FOLDER
+        folder = os.path.join(base, f'Title {show:04d}')
+        os.makedirs(folder)
+        for episode in range(1, min(FILES_PER_FOLDER, count - start) + 1):
+            name = f'[Group] Title {show:04d} - {episode:02d} [WebRip 1080p HEVC-10bit AAC].mkv'
+            open(os.path.join(folder, name), 'wb').close()
+
+
+def best_of(work, repeat, setup=None):
+    elapsed = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        work()
+        elapsed.append(time.perf_counter() - start)
+    return min(elapsed)
+
+
+def run_import(folder):
+    # 与界面相同：后台扫描，前台定期取回结果并合并
+    files = FileList()
+    job = ImportJob([folder])
+    job.start()
+    while not job.finished:
+        files.add_records(job.drain())
+        if not job.finished:
+            time.sleep(0.005)
+    if job.error is not None:
+        raise job.error
+    return files
+
+
+def run_size(base_dir, count, repeat, cases):
+    results = {}
+    base = tempfile.mkdtemp(prefix='bench_suite_', dir=base_dir)
+    try:
+        tree = os.path.join(base, 'files')
+        make_tree(tree, count)
+        files = run_import(tree)
+        assert len(files) == count
+        names = [file_info['filename'] for file_info in files]
+        settings = RenameSettings(**SETTINGS)
+
+        if 'import' in cases:
+            results['import'] = best_of(lambda: run_import(tree), repeat)
+        if 'extract_numbers' in cases:
+            results['extract_numbers'] = best_of(lambda: [extract_numbers(name) for name in names], repeat)
+        if 'natural_sort_key' in cases:
+            results['natural_sort_key'] = best_of(lambda: [natural_sort_key(name) for name in names], repeat)
+
+        analysis = analyze_episode_fields(files)
+        if 'detect_episode' in cases:
+            results['detect_episode'] = best_of(lambda: analyze_episode_fields(files), repeat)
+        settings.episode_field = analysis.best.key
+
+        if 'generate_new_name' in cases:
+            results['generate_new_name'] = best_of(lambda: render_names(settings, files), repeat)
+        if 'sort_files_by_episode' in cases:
+            def reset_order():
+                files.orders = {}
+                files.sort_natural()
+            results['sort_files_by_episode'] = best_of(
+                lambda: sort_files_by_field(files, settings.episode_field), repeat, reset_order)
+
+        if 'start_rename' in cases:
+            # 文件重命名后无法重复，只测一次
+            state = os.path.join(base, 'state')
+            os.makedirs(state)
+            log_writer = LogWriter(os.path.join(state, 'rename_log.txt'))
+            plan = plan_renames(files, settings)
+            start = time.perf_counter()
+            success_count, error_count = apply_renames(
+                plan, log_writer.write, journal=RenameJournal(os.path.join(state, 'journal')),
+                history=RenameHistory(os.path.join(state, 'rename_history.jsonl')), template=settings.rule
+            )
+            log_writer.flush()
+            results['start_rename'] = time.perf_counter() - start
+            log_writer.close()
+            assert (success_count, error_count) == (count, 0)
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # 返回超出容差的项目 [(用例, 文件数, 基线秒数, 本次秒数), ...]
+    previous = {(entry['case'], entry['files']): entry['seconds'] for entry in baseline['results']}
+    regressions = []
+    for entry in results:
+        base_seconds = previous.get((entry['case'], entry['files']))
+        if base_seconds is not None and entry['seconds'] > base_seconds * (1 + tolerance):
+            regressions.append((entry['case'], entry['files'], base_seconds, entry['seconds']))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='热点路径基准套件')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='文件数（默认 1000 10000 100000，可加 1000000）')
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES, help='只运行指定的用例')
+    parser.add_argument('--repeat', type=int, default=3, help='每个用例重复次数，取最短时间（默认 %(default)s）')
+    parser.add_argument('--dir', default=None, help='生成测试文件的目录（默认 /dev/shm 或临时目录）')
+    parser.add_argument('--output', help='把结果写入 JSON 文件')
+    parser.add_argument('--save-baseline', help='把结果保存为基线')
+    parser.add_argument('--baseline', help='与基线对比，超出容差时返回 1')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='允许比基线慢的比例（默认 %(default)s）')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    base_dir = args.dir or default_base_dir()
+    report = {
+        'meta': {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'dir': base_dir,
+            'repeat': args.repeat
+        },
+        'results': []
+    }
+    print(f'{"用例":<24}{"文件数":>10}{"耗时(ms)":>12}{"每文件(µs)":>12}')
+    for count in args.sizes:
+        for case, seconds in run_size(base_dir, count, args.repeat, args.cases).items():
+            report['results'].append({
+                'case': case, 'files': count, 'seconds': round(seconds, 6),
+                'per_file_us': round(seconds / count * 1e6, 3)
+            })
+            print(f'{case:<24}{count:>10}{seconds * 1000:>12.1f}{seconds / count * 1e6:>12.2f}')
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report['results'], baseline, args.tolerance)
+        for case, count, base_seconds, seconds in regressions:
+            print(f'性能回退: {case}（{count} 个文件）{base_seconds * 1000:.1f} ms -> {seconds * 1000:.1f} ms',
+                  file=sys.stderr)
+        if regressions:
+            return 1
+        print(f'与基线相比均在 {args.tolerance:.0%} 容差内')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rename_engine import RenameSettings, make_file_record
+from name_template import render_names
+
+# 命名模板渲染基准：对比旧版逐文件 replace 链与编译后的批量渲染
+# 注意：旧版在界面中还要为每个文件读取一遍 Tk 变量，这部分开销未计入
+# 用法：python benchmarks/bench_template.py [文件数，默认 100000]
+
+
+def legacy_generate_new_name(settings, file_info, index=0):
+    # 旧版 generate_new_name 的实现（每个文件重新读取规则并执行 replace 链）
+    rule = settings.custom_rule if settings.custom_rule else settings.template
+    episode_str = ''
+    if settings.episode_pattern:
+        for num in file_info.get('numbers', []):
+            if num == settings.episode_pattern:
+                episode_str = num.zfill(2)
+                break
+    if not episode_str:
+        episode_str = str(index + 1).zfill(2)
+    full_episode = f"{settings.episode_prefix}{episode_str}"
+
+    new_name = rule
+    new_name = new_name.replace('[影视类型]', settings.media_type)
+    new_name = new_name.replace('[标题]', settings.title if settings.title else os.path.splitext(file_info['filename'])[0])
+    new_name = new_name.replace('[季数]', settings.season if settings.season else '1')
+    new_name = new_name.replace('[集数]', full_episode)
+    if ('季' in new_name or 'EP' in new_name) and '集' in new_name:
+        season = settings.season if settings.season else '01'
+        title = settings.title if settings.title else os.path.splitext(file_info['filename'])[0]
+        new_name = f"{title} - {season} - {full_episode}"
+    return new_name + file_info['ext']
+
+
+def best_of(func, repeat=3):
+    # 取多次运行中的最短耗时，减少机器抖动的影响
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    files = [
+        make_file_record(f'/anime/[Group] Title - {i:05d} [WebRip 1080p HEVC-10bit AAC].mkv', size=0)
+        for i in range(count)
+    ]
+    settings = RenameSettings(
+        template='[标题] - [季数]x[集数]', title='Title', season='1',
+        episode_prefix='EP', episode_pattern='00042'
+    )
+
+    legacy, legacy_time = best_of(lambda: [legacy_generate_new_name(settings, f, i) for i, f in enumerate(files)])
+    compiled, compiled_time = best_of(lambda: render_names(settings, files))
+
+    assert legacy == compiled
+    print(f'文件数: {count}')
+    print(f'replace 链: {legacy_time:.3f} s, 每个文件 {legacy_time / count * 1e6:.2f} us')
+    print(f'编译模板:   {compiled_time:.3f} s, 每个文件 {compiled_time / count * 1e6:.2f} us')
+
+
+if __name__ == '__main__':
+    main()
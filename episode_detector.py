@@ -0,0 +1,242 @@
+import os
+import re
+
+import perf_stats
+
+# 集数字段自动识别：整批文件名各分词一次，按"位置"把数字归为字段，再看每个字段在整批中如何变化
+#   - 字段由数字前面的几个字符、后面的一个字符和同一上下文中的出现次序确定，
+#     标题中数字个数不同（如 "Title 2 - 03" 与 "Title - 03"）也能对上
+#   - CRC32、分辨率、编码、位深等一定不是集数的数字在分词时直接跳过
+#   - 在整批中保持不变的字段（年份、季数、分辨率）得分低；逐个递增、连续不重复的字段得分高
+#   - 数字前后的标记（EP、第、" - "、话）作为辅助依据，只有一个文件时主要靠它
+# 整个分析只遍历一遍文件名，10k 以上的文件也是线性时间
+#
+# 每个文件在导入时分词一次，结果保存在文件信息的 'fields' 中：(字段位置表, 数字元组)
+#   - 字段位置表 {字段标识: 位置} 在字段顺序相同的文件之间共用，同一批发布名通常只有几个不同的位置表
+#   - 数字元组按位置存放该文件的各个数字
+# 选定集数字段后，整批文件的集数、排序和预览都直接按位置取值，不再逐个比较数字
+
+# 字段上下文：数字前最多取几个字符
+CONTEXT_CHARS = 3
+# 置信度达到该值时自动采用识别结果
+AUTO_CONFIDENCE = 0.5
+# 每个字段保留的示例值个数
+FIELD_EXAMPLES = 3
+
+# 不可能是集数的数字与数字序列放在同一个正则中，一次扫描完成分词；前者在同一位置优先匹配
+_TOKEN_RE = re.compile(
+    r'(?:(?<![0-9a-z])[0-9a-f]{8}(?![0-9a-z])'   # CRC32：[1A2B3C4D]
+    r'|\d{3,4}[pi](?![a-z])'                    # 分辨率：1080p、480i
+    r'|\d{3,4}[x×]\d{3,4}'                      # 分辨率：1920x1080
+    r'|[xh]\.?26[45]'                            # 编码：x264、H.265
+    r'|\d{1,2}-?bits?'                           # 位深：10bit
+    r'|\d\.\d(?![0-9]))'                         # 声道：5.1、2.0
+    r'|(\d+)',                                   # 其余数字
+    re.IGNORECASE
+)
+
+# 数字前后的标记：(结尾, 权重)，按顺序取第一个匹配
+_LEFT_MARKERS = (
+    ('episode', 1.0), ('ep.', 1.0), ('ep', 1.0), ('第', 1.0), ('#', 1.0), ('e', 0.9), ('- ', 0.9),
+    ('season', 0.2), ('s', 0.2), ('v', 0.1), ('vol.', 0.2), ('vol', 0.2)
+)
+_RIGHT_MARKERS = {'话': 1.0, '話': 1.0, '集': 1.0, '季': 0.2}
+_NEUTRAL_PRIOR = 0.5
+
+# 驻留表：各文件中相同的字段标识、字段位置表和较短的数字共用同一个对象
+_KEYS = {}
+_LAYOUTS = {}
+_NUMBERS = {}
+
+
+def tokenize(filename):
+    # 返回 [(字段标识, 数字, 起始位置, 结束位置), ...]，字段标识为 (前文, 后一个字符, 出现次序)
+    stem = os.path.splitext(filename)[0]
+    tokens = []
+    seen = {}
+    previous_end = 0
+    for match in _TOKEN_RE.finditer(stem):
+        start, end = match.span()
+        value = match.group(1)
+        if value is None:
+            previous_end = end
+            continue
+        context = (stem[max(previous_end, start - CONTEXT_CHARS):start].casefold(), stem[end:end + 1].casefold())
+        occurrence = seen.get(context, 0)
+        seen[context] = occurrence + 1
+        key = context + (occurrence,)
+        tokens.append((_KEYS.setdefault(key, key), value, start, end))
+        previous_end = end
+    return tokens
+
+
+def file_fields(filename):
+    # 导入时为每个文件计算一次：返回 (字段位置表, 数字元组)
+    tokens = tokenize(filename)
+    keys = tuple(token[0] for token in tokens)
+    layout = _LAYOUTS.get(keys)
+    if layout is None:
+        layout = _LAYOUTS.setdefault(keys, {key: position for position, key in enumerate(keys)})
+    numbers = tuple(
+        _NUMBERS.setdefault(token[1], token[1]) if len(token[1]) <= 4 else token[1]
+        for token in tokens
+    )
+    return layout, numbers
+
+
+def _fields_of(file_info):
+    fields = file_info.get('fields')
+    if fields is None:
+        # 不是经 make_file_record 生成的文件信息
+        fields = file_fields(file_info['filename'])
+    return fields
+
+
+def field_values(files, field):
+    # 整批文件的该字段数字（没有时为 None），按位置一次取完
+    values = []
+    append = values.append
+    for file_info in files:
+        layout, numbers = _fields_of(file_info)
+        position = layout.get(field)
+        append(None if position is None else numbers[position])
+    return values
+
+
+def field_for_value(files, value):
+    # 旧版配置只保存了数字本身（episode_pattern）：取第一个含有该数字的文件中它所在的字段
+    for file_info in files:
+        layout, numbers = _fields_of(file_info)
+        for key, position in layout.items():
+            if numbers[position] == value:
+                return key
+    return None
+
+
+def field_at(filename, offset):
+    # 文件名第 offset 个字符所在数字的字段标识（界面上点击数字时使用），不在数字上时返回 None
+    for key, _, start, end in tokenize(filename):
+        if start <= offset < end:
+            return key
+    return None
+
+
+def _context_prior(key):
+    left, right, _ = key
+    if right in _RIGHT_MARKERS:
+        return _RIGHT_MARKERS[right]
+    for marker, weight in _LEFT_MARKERS:
+        if left.endswith(marker):
+            return weight
+    return _NEUTRAL_PRIOR
+
+
+class EpisodeField:
+    def __init__(self, key):
+        self.key = key
+        self.count = 0
+        self.values = set()
+        self.minimum = None
+        self.maximum = None
+        self.widest = 0
+        # 按列表顺序相邻两次出现时恰好加一的次数
+        self.steps = 0
+        self.last = None
+        self.examples = []
+        self.score = 0.0
+
+    def add(self, value):
+        number = int(value)
+        self.count += 1
+        self.values.add(number)
+        if self.minimum is None or number < self.minimum:
+            self.minimum = number
+        if self.maximum is None or number > self.maximum:
+            self.maximum = number
+        self.widest = max(self.widest, len(value))
+        if self.last is not None and number == self.last + 1:
+            self.steps += 1
+        self.last = number
+        if len(self.examples) < FIELD_EXAMPLES and value not in self.examples:
+            self.examples.append(value)
+
+    @property
+    def prior(self):
+        # 前后标记的权重：EP、第…话、" - " 接近 1，没有标记时为 _NEUTRAL_PRIOR
+        return _context_prior(self.key)
+
+    def rate(self, total):
+        # 得分 0~1：出现的比例 ×（变化方式 75% + 前后标记 25%）× 位数惩罚
+        distinct = len(self.values)
+        if distinct > 1:
+            variation = (
+                0.4 * distinct / self.count
+                + 0.3 * distinct / (self.maximum - self.minimum + 1)
+                + 0.3 * self.steps / (self.count - 1)
+            )
+        else:
+            variation = 0.0
+        penalty = 1.0
+        if self.widest > 4 or (self.widest == 4 and 1900 <= self.minimum <= 2099):
+            # 日期、年份
+            penalty = 0.1
+        self.score = self.count / total * (0.75 * variation + 0.25 * self.prior) * penalty
+        return self.score
+
+    @property
+    def place(self):
+        # 字段在文件名中的位置：'"- " 后'、'"ep" 后第 2 处'、'开头'
+        left, right, occurrence = self.key
+        place = f'"{left}" 后' if left else '开头'
+        if occurrence:
+            place += f'第 {occurrence + 1} 处'
+        return place
+
+    def describe(self):
+        return f'{self.place}的数字（{"、".join(self.examples)}…，{self.count} 个文件）'
+
+
+class EpisodeAnalysis:
+    def __init__(self, fields, total):
+        # fields 按得分从高到低排列
+        self.fields = fields
+        self.total = total
+
+    @property
+    def best(self):
+        return self.fields[0] if self.fields else None
+
+    @property
+    def alternatives(self):
+        return self.fields[1:]
+
+    @property
+    def confidence(self):
+        # 最高分与第二名拉开的差距：两个字段同样像集数时置信度低
+        if not self.fields:
+            return 0.0
+        second = self.fields[1].score if len(self.fields) > 1 else 0.0
+        return max(0.0, self.fields[0].score - second)
+
+    @property
+    def is_confident(self):
+        return self.confidence >= AUTO_CONFIDENCE
+
+
+def analyze_episode_fields(files):
+    # files: 文件信息列表（按当前列表顺序），返回 EpisodeAnalysis
+    fields = {}
+    total = 0
+    with perf_stats.span('detect') as span:
+        for file_info in files:
+            total += 1
+            layout, numbers = _fields_of(file_info)
+            for key, position in layout.items():
+                field = fields.get(key)
+                if field is None:
+                    field = fields[key] = EpisodeField(key)
+                field.add(numbers[position])
+        for field in fields.values():
+            field.rate(total)
+        span.items = total
+    return EpisodeAnalysis(sorted(fields.values(), key=lambda field: field.score, reverse=True), total)
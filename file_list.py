@@ -0,0 +1,205 @@
+import os
+from bisect import bisect_right
+from heapq import merge
+from operator import itemgetter
+
+from rename_engine import make_file_record, natural_sort_key, FILE_SORT_KEYS
+from episode_detector import field_values
+import perf_stats
+
+# 文件列表：按规范化绝对路径建立索引，去重为 O(1)；
+# 新文件先在本批内排序，再合并进已有的自然顺序，避免每次添加都整体重新排序
+#
+# 自然顺序（natural）及其排序键始终保留，每个文件的自然排序键只在添加时计算一次
+# 其他顺序（扩展名、大小、路径、集数字段）第一次使用时由自然顺序稳定排序得到并缓存，
+# 之后切换排序方式或点击列标题只需取出缓存的顺序（倒序时反转），不再重新计算排序键和排序
+# 添加或删除文件后缓存的顺序失效，下次使用时重新生成
+
+_first = itemgetter(0)
+
+# 按文件名排序与自然顺序相同
+_NATURAL_COLUMNS = ('natural', 'filename')
+
+
+class FileList:
+    def __init__(self, records=None):
+        # 当前显示顺序；处于自然顺序时与 natural 是同一个列表
+        self.records = []
+        self.index = {}
+        # 自然顺序的文件及其排序键，一一对应
+        self.natural = self.records
+        self.natural_keys = []
+        # 缓存的其他顺序（升序）：{排序方式: 文件列表}
+        self.orders = {}
+        # 目录前缀的自然排序键，同一目录的文件共用
+        self.prefix_keys = {}
+        # 目录是否大小写不敏感的探测结果缓存
+        self.case_insensitive_dirs = {}
+        # 文件或顺序每变化一次加一，界面据此判断按文件列表算出的结果（如剧集分组）是否需要重算
+        self.version = 0
+        if records:
+            self.add_records(records)
+
+    # ---- 序列接口，前端可以像普通列表一样读取 ----
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def __bool__(self):
+        return bool(self.records)
+
+    # ---- 去重索引 ----
+    def is_case_insensitive(self, directory, sample_path):
+        # 通过切换文件名大小写后能否访问到同一文件，判断该目录所在的文件系统是否大小写不敏感
+        cached = self.case_insensitive_dirs.get(directory)
+        if cached is None:
+            swapped = os.path.join(directory, os.path.basename(sample_path).swapcase())
+            if swapped == sample_path or os.name == 'nt':
+                cached = os.name == 'nt'
+            else:
+                try:
+                    cached = os.path.samefile(sample_path, swapped)
+                except OSError:
+                    cached = False
+            self.case_insensitive_dirs[directory] = cached
+        return cached
+
+    def path_key(self, file_path):
+        path = os.path.normpath(os.path.abspath(file_path))
+        if self.is_case_insensitive(os.path.dirname(path), path):
+            return path.casefold()
+        return path
+
+    def __contains__(self, file_path):
+        return self.path_key(file_path) in self.index
+
+    # ---- 添加 / 删除 ----
+    def add_paths(self, file_paths):
+        # 只为索引中不存在的路径读取文件信息，返回实际添加的数量
+        new_records = []
+        for file_path in file_paths:
+            key = self.path_key(file_path)
+            if key not in self.index:
+                record = make_file_record(file_path)
+                self.index[key] = record
+                new_records.append(record)
+        self.insert_sorted(new_records)
+        return len(new_records)
+
+    def add_records(self, records):
+        # 添加已经读取好文件信息的记录（如扫描器返回的记录），返回实际添加的数量
+        new_records = []
+        for record in records:
+            key = self.path_key(record['path'])
+            if key not in self.index:
+                self.index[key] = record
+                new_records.append(record)
+        self.insert_sorted(new_records)
+        return len(new_records)
+
+    def insert_sorted(self, new_records):
+        if not new_records:
+            return
+        with perf_stats.span('merge', len(new_records)):
+            new_keyed = sorted(((natural_sort_key(r['filename']), r) for r in new_records), key=_first)
+            self.orders = {}
+
+            if len(new_keyed) * 32 < len(self.natural):
+                # 少量新文件：二分查找插入位置
+                for key, record in new_keyed:
+                    position = bisect_right(self.natural_keys, key)
+                    self.natural_keys.insert(position, key)
+                    self.natural.insert(position, record)
+            else:
+                # 大量新文件：线性归并，相同键时已有文件在前（与稳定排序一致）
+                merged = list(merge(zip(self.natural_keys, self.natural), new_keyed, key=_first))
+                self.natural_keys = [key for key, _ in merged]
+                self.natural = [record for _, record in merged]
+        # 与旧版行为一致：添加文件后恢复为自然顺序
+        self.records = self.natural
+        self.version += 1
+
+    def remove(self, indices):
+        # 删除当前顺序中指定位置的文件，返回被删除的记录
+        removed = [self.records[i] for i in sorted(set(indices))]
+        removed_ids = {id(record) for record in removed}
+        for record in removed:
+            self.index.pop(self.path_key(record['path']), None)
+        kept = [(key, record) for key, record in zip(self.natural_keys, self.natural) if id(record) not in removed_ids]
+        in_natural = self.records is self.natural
+        self.natural_keys = [key for key, _ in kept]
+        self.natural = [record for _, record in kept]
+        if in_natural:
+            self.records = self.natural
+        else:
+            self.records = [record for record in self.records if id(record) not in removed_ids]
+        self.orders = {}
+        self.version += 1
+        return removed
+
+    def clear(self):
+        self.records = []
+        self.index = {}
+        self.natural = self.records
+        self.natural_keys = []
+        self.orders = {}
+        self.version += 1
+
+    # ---- 排序 ----
+    def sort_natural(self):
+        self.records = self.natural
+        self.version += 1
+
+    def order_keys(self, column):
+        # 按自然顺序列出某一列的排序键（只在生成该列的顺序时调用一次）
+        if column == 'path':
+            prefix_keys = self.prefix_keys
+            keys = []
+            for natural_key, record in zip(self.natural_keys, self.natural):
+                prefix = record.get('prefix')
+                if prefix is None:
+                    prefix = os.path.join(os.path.dirname(record['path']), '')
+                prefix_key = prefix_keys.get(prefix)
+                if prefix_key is None:
+                    prefix_key = prefix_keys[prefix] = natural_sort_key(prefix)
+                keys.append((prefix_key, natural_key))
+            return keys
+        if isinstance(column, tuple):
+            # ('episode', 字段标识)：集数字段的数值，没有该字段时为 0
+            return [int(value) if value is not None else 0 for value in field_values(self.natural, column[1])]
+        return [FILE_SORT_KEYS[column](record) for record in self.natural]
+
+    def ordered(self, column):
+        # 某一排序方式的升序文件列表，首次使用时生成并缓存；相同键时保持自然顺序
+        if column in _NATURAL_COLUMNS:
+            return self.natural
+        ordered = self.orders.get(column)
+        if ordered is None:
+            with perf_stats.span('sort', len(self.natural)):
+                keys = self.order_keys(column)
+                permutation = sorted(range(len(keys)), key=keys.__getitem__)
+                natural = self.natural
+                ordered = self.orders[column] = [natural[i] for i in permutation]
+        return ordered
+
+    def sort_by(self, column, reverse=False):
+        # 切换到缓存的顺序；column 为 FILE_SORT_KEYS 中的列名、'natural' 或 ('episode', 字段标识)
+        ordered = self.ordered(column)
+        if reverse:
+            self.records = ordered[::-1]
+        elif ordered is self.natural:
+            self.records = ordered
+        else:
+            self.records = list(ordered)
+        self.version += 1
+
+    def sort(self, key=None, reverse=False):
+        # 任意排序方式：在当前顺序上排序，不缓存
+        with perf_stats.span('sort', len(self.records)):
+            self.records = sorted(self.records, key=key, reverse=reverse)
+        self.version += 1
@@ -0,0 +1,245 @@
+import os
+import json
+import sqlite3
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from rename_engine import is_video_file, make_file_record, FileRecord
+from scan_cache import ScanCache
+import perf_stats
+
+# 基于 os.scandir 的并行扫描器：
+#   - 文件大小直接取自 DirEntry.stat()（Windows 上在列目录时已经拿到，无需再次访问文件）
+#   - 子目录的列举和文件的 stat 在有上限的线程池中并发进行，适合 SMB/NFS 等高延迟挂载
+#   - 可选的扫描缓存（scan_cache.py）：目录 mtime/inode 未变时跳过该目录的列举和 stat
+
+# 线程数上限：扫描主要耗时在等待网络 I/O，可以比 CPU 核心数多
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# 一个目录中文件较多时，按此大小分块并发 stat
+STAT_CHUNK_SIZE = 256
+
+# Windows 上 DirEntry.stat() 使用列目录时缓存的结果，不需要再拆分任务
+_STAT_IS_CACHED = os.name == 'nt'
+
+
+def _list_dir(path):
+    files = []
+    subdirs = []
+    with perf_stats.span('scan') as span:
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            # 与 os.walk 默认行为一致：不进入符号链接指向的目录
+                            if not entry.is_symlink():
+                                subdirs.append(entry.path)
+                        elif is_video_file(entry.name):
+                            files.append(entry)
+                    except OSError:
+                        continue
+        except OSError:
+            # 与 os.walk 一致：无法访问的目录直接跳过
+            pass
+        span.items = len(files) + len(subdirs)
+    return files, subdirs
+
+
+def _stat_entries(entries, directory=None):
+    # 先 stat 整块再生成记录，性能统计中 I/O 与分词分开计时
+    sizes = []
+    with perf_stats.span('stat', len(entries)):
+        for entry in entries:
+            try:
+                sizes.append((entry.path, entry.stat().st_size))
+            except OSError:
+                continue
+    with perf_stats.span('extract', len(sizes)):
+        records = [make_file_record(path, size) for path, size in sizes]
+    return 'chunk', directory, records
+
+
+def _stat_paths(paths):
+    records = []
+    with perf_stats.span('stat', len(paths)):
+        for path in paths:
+            try:
+                records.append(make_file_record(path))
+            except OSError:
+                continue
+    return 'files', None, records
+
+
+def _scan_dir(path, cache_rows=None):
+    # 列出目录；stat 已缓存时直接生成记录，否则把文件分块留给线程池
+    # 返回 ('dir', 目录, 目录 stat, 记录, 待 stat 的文件块, 子目录)，
+    # 或缓存命中时返回 ('cached', 目录, 缓存行)
+    dir_stat = None
+    if cache_rows is not None:
+        try:
+            dir_stat = os.stat(path)
+        except OSError:
+            return 'dir', path, None, [], [], []
+        cached = cache_rows.get(path)
+        if (cached is not None and cached[0] == dir_stat.st_mtime_ns
+                and cached[1] == dir_stat.st_ino and cached[2] == dir_stat.st_dev):
+            # 目录未变化：直接使用缓存的列表，不再列目录和 stat 文件
+            # 记录在调度线程中生成，工作线程只负责 I/O
+            return 'cached', path, cached
+
+    files, subdirs = _list_dir(path)
+    if _STAT_IS_CACHED or len(files) <= STAT_CHUNK_SIZE:
+        return 'dir', path, dir_stat, _stat_entries(files)[2], [], subdirs
+    chunks = [files[i:i + STAT_CHUNK_SIZE] for i in range(0, len(files), STAT_CHUNK_SIZE)]
+    return 'dir', path, dir_stat, [], chunks, subdirs
+
+
+def _scan_dirs(paths, cache_rows=None):
+    # 一个任务依次处理多个目录，减少线程切换（缓存命中时每个目录只需一次 stat）
+    return 'dirs', [_scan_dir(path, cache_rows) for path in paths]
+
+
+def _cached_listing(path, cached):
+    prefix = os.path.join(path, '')
+    subdirs = [prefix + name for name in json.loads(cached[3])]
+    # 缓存按列存储：[文件名列表, 大小列表]，扩展名和数字序列由 FileRecord 从文件名得出
+    names, sizes = json.loads(cached[4])
+    with perf_stats.span('extract', len(names)):
+        records = [FileRecord(prefix, name, size) for name, size in zip(names, sizes)]
+    return records, subdirs
+
+
+def _cache_entry(path, dir_stat, subdirs, records):
+    return (
+        path, dir_stat,
+        [os.path.basename(subdir) for subdir in subdirs],
+        [
+            [r['filename'] for r in records],
+            [r['size'] for r in records]
+        ]
+    )
+
+
+def iter_scan_paths(paths, include_all_files=False, max_workers=DEFAULT_WORKERS,
+                    cancel_event=None, cache_file=None):
+    # 并发扫描文件和文件夹，每完成一个任务就产出一批文件记录（顺序不固定）
+    # include_all_files 为 True 时，直接给出的文件不按扩展名过滤（文件夹中的文件始终过滤）
+    # cancel_event 被设置后停止提交新任务并尽快返回，已产出的记录不受影响
+    # cache_file 指定扫描缓存（SQLite）后，未变化的目录直接从缓存读取，变化的目录扫描后写回缓存
+    files = []
+    folders = []
+    for path in paths:
+        if os.path.isdir(path):
+            folders.append(os.path.normpath(os.path.abspath(path)))
+        elif include_all_files or is_video_file(path):
+            files.append(path)
+
+    cache = None
+    cache_rows = None
+    if cache_file and folders:
+        try:
+            cache = ScanCache(cache_file)
+            cache_rows = {}
+            for folder in folders:
+                cache_rows.update(cache.load_subtree(folder))
+        except (sqlite3.Error, OSError):
+            # 缓存只是加速手段：打不开或读不了（如配置文件所在目录只读）时照常完整扫描
+            if cache is not None:
+                cache.close()
+            cache = None
+            cache_rows = None
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    # 已完成的任务放入队列，避免每次等待都遍历全部未完成任务
+    completed = queue.Queue()
+    pending = set()
+
+    def submit(func, *args):
+        future = pool.submit(func, *args)
+        pending.add(future)
+        future.add_done_callback(completed.put)
+
+    def submit_dirs(dirs):
+        # 把目录均匀分给各个线程
+        size = max(1, -(-len(dirs) // max_workers))
+        for i in range(0, len(dirs), size):
+            submit(_scan_dirs, dirs[i:i + size], cache_rows)
+    # 文件被拆分成多块 stat 的目录：{目录: [目录 stat, 子目录, 已完成的记录, 剩余块数]}
+    building = {}
+    # 需要写回缓存的目录
+    to_store = []
+    try:
+        for i in range(0, len(files), STAT_CHUNK_SIZE):
+            submit(_stat_paths, files[i:i + STAT_CHUNK_SIZE])
+        submit_dirs(folders)
+
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            # 带超时等待，保证取消请求能及时响应
+            try:
+                future = completed.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            pending.discard(future)
+            result = future.result()
+            if result[0] == 'dirs':
+                results = result[1]
+            else:
+                results = [result]
+
+            records = []
+            next_dirs = []
+            for result in results:
+                if result[0] == 'dir':
+                    _, directory, dir_stat, dir_records, chunks, subdirs = result
+                    for chunk in chunks:
+                        submit(_stat_entries, chunk, directory)
+                    next_dirs.extend(subdirs)
+                    if cache is not None and dir_stat is not None:
+                        if chunks:
+                            building[directory] = [dir_stat, subdirs, list(dir_records), len(chunks)]
+                        else:
+                            to_store.append(_cache_entry(directory, dir_stat, subdirs, dir_records))
+                elif result[0] == 'cached':
+                    dir_records, subdirs = _cached_listing(result[1], result[2])
+                    next_dirs.extend(subdirs)
+                else:
+                    kind, directory, dir_records = result
+                    if kind == 'chunk' and directory in building:
+                        entry = building[directory]
+                        entry[2].extend(dir_records)
+                        entry[3] -= 1
+                        if entry[3] == 0:
+                            del building[directory]
+                            to_store.append(_cache_entry(directory, entry[0], entry[1], entry[2]))
+                records.extend(dir_records)
+
+            if next_dirs:
+                submit_dirs(next_dirs)
+            if records:
+                yield records
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
+        if cache is not None:
+            # 只写入完整扫描过的目录；被取消时未完成的目录下次重新扫描
+            try:
+                cache.store(to_store)
+            except (sqlite3.Error, OSError):
+                pass
+            cache.close()
+
+
+def scan_folder(folder, max_workers=DEFAULT_WORKERS, cache_file=None):
+    return scan_paths([folder], max_workers=max_workers, cache_file=cache_file)
+
+
+def scan_paths(paths, include_all_files=False, max_workers=DEFAULT_WORKERS, cache_file=None):
+    # 展开文件和文件夹，返回文件记录（含大小）
+    records = []
+    for chunk in iter_scan_paths(paths, include_all_files, max_workers, cache_file=cache_file):
+        records.extend(chunk)
+    return records
@@ -0,0 +1,79 @@
+import time
+import queue
+import threading
+
+from file_scanner import iter_scan_paths
+
+# 后台导入：扫描在工作线程中进行，记录分批放入队列，由界面线程定时取出并合并到文件列表
+# 工作线程从不直接访问界面或文件列表
+
+# 合并小批次时的最短间隔（秒），避免界面被过于频繁的更新淹没
+COALESCE_INTERVAL = 0.1
+
+
+def coalesce_chunks(chunks, interval=COALESCE_INTERVAL):
+    # 把扫描器产出的小批次按时间间隔合并成较大的批次
+    pending = []
+    last = time.monotonic()
+    for chunk in chunks:
+        pending.extend(chunk)
+        now = time.monotonic()
+        if now - last >= interval:
+            yield pending
+            pending = []
+            last = now
+    if pending:
+        yield pending
+
+
+class ImportJob:
+    def __init__(self, paths, include_all_files=True, cache_file=None):
+        self.paths = list(paths)
+        self.include_all_files = include_all_files
+        self.cache_file = cache_file
+        self.queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        # 已交给界面线程的记录数
+        self.received = 0
+        self.finished = False
+        self.error = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            chunks = iter_scan_paths(self.paths, self.include_all_files,
+                                     cancel_event=self.cancel_event, cache_file=self.cache_file)
+            for chunk in coalesce_chunks(chunks):
+                self.queue.put(chunk)
+                if self.cancel_event.is_set():
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            # None 表示扫描结束
+            self.queue.put(None)
+
+    def drain(self):
+        # 在界面线程中调用：取出目前已扫描到的全部记录
+        records = []
+        while True:
+            try:
+                chunk = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if chunk is None:
+                self.finished = True
+                break
+            records.extend(chunk)
+        self.received += len(records)
+        return records
@@ -0,0 +1,293 @@
+import os
+import re
+import mmap
+import time
+import struct
+from bisect import bisect_left, bisect_right
+
+# 日志存储：rename_log.txt 按大小或月份轮转成多个分段，每个分段旁有一个紧凑的二进制索引（分段名 + '.idx'）
+# 索引每 LOG_INDEX_STRIDE 行记一个点，批次开始的行也记一个点：(时间戳, 字节偏移, 行号, 类型)
+# 查看日志时通过 mmap 按页读取，跳转到某一行或某个日期只需二分查找索引再向后扫描几十行，
+# 不会把整个日志读进内存或界面控件
+# 正在写入的当前日志不做 mmap（Windows 上映射着的文件无法轮转改名），而是按已索引的大小读入一次，
+# 它不超过 LOG_ROTATE_BYTES
+
+# 单个日志分段的最大字节数，超过后轮转
+LOG_ROTATE_BYTES = 5 * 1024 * 1024
+# 每隔多少行记一个索引点
+LOG_INDEX_STRIDE = 64
+# 以此开头的日志消息表示一批重命名开始（由 rename_engine.execute_steps 写出）
+BATCH_START_PREFIX = '开始执行:'
+
+INDEX_SUFFIX = '.idx'
+INDEX_RECORD = struct.Struct('<qqIB')
+INDEX_STRIDE_POINT = 0
+INDEX_BATCH_START = 1
+
+_TIMESTAMP_RE = re.compile(rb'^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] ')
+_BATCH_MARK = f'] {BATCH_START_PREFIX}'.encode('utf-8')
+
+
+def parse_timestamp(line):
+    # 从 "[YYYY-mm-dd HH:MM:SS] ..." 中取出时间（秒），格式不符时返回 None
+    match = _TIMESTAMP_RE.match(line)
+    if match is None:
+        return None
+    return int(time.mktime(time.strptime(match.group(1).decode('ascii'), '%Y-%m-%d %H:%M:%S')))
+
+
+def parse_date_input(text):
+    # 查看日志时输入的跳转时间："2026-02-01"、"2026-02-01 16:25" 或 "2026-02-01 16:25:28"
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return int(time.mktime(time.strptime(text.strip(), fmt)))
+        except ValueError:
+            continue
+    return None
+
+
+def format_timestamp(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+
+def is_batch_start(line):
+    return line.find(_BATCH_MARK, 0, 64) != -1
+
+
+def index_file_for(log_file):
+    return log_file + INDEX_SUFFIX
+
+
+def rotated_name(log_file, stamp):
+    # rename_log.txt -> rename_log.20261018-164644-123456.txt（文件名按时间排序）
+    base, ext = os.path.splitext(log_file)
+    return f'{base}.{stamp}{ext}'
+
+
+def segment_files(log_file):
+    # 按时间顺序返回全部日志分段：已轮转的分段（文件名中带时间戳）在前，当前日志在最后
+    directory = os.path.dirname(os.path.abspath(log_file))
+    base, ext = os.path.splitext(os.path.basename(log_file))
+    pattern = re.compile(re.escape(base) + r'\.\d{8}-\d{6}-\d{6}' + re.escape(ext) + '$')
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        names = []
+    segments = [os.path.join(directory, name) for name in sorted(names) if pattern.match(name)]
+    segments.append(os.path.abspath(log_file))
+    return segments
+
+
+class LogIndex:
+    # 一个日志分段的索引：records 按偏移递增；lines/size 为已索引到的行数和字节数
+    def __init__(self):
+        self.records = []
+        self.lines = 0
+        self.size = 0
+        self.first_time = None
+
+    @classmethod
+    def load(cls, log_file, save=True):
+        # 读取索引并补上索引之后新增的行；索引缺失或与日志不符时重新扫描整个分段
+        # save 为 False 时只在内存中补齐，不写索引文件（查看日志时，索引文件由 LogWriter 负责）
+        index = cls()
+        try:
+            size = os.path.getsize(log_file)
+        except OSError:
+            return index
+        try:
+            with open(index_file_for(log_file), 'rb') as f:
+                data = f.read()
+            data = data[:len(data) - len(data) % INDEX_RECORD.size]
+            index.records = list(INDEX_RECORD.iter_unpack(data))
+        except OSError:
+            index.records = []
+        if index.records and index.records[-1][1] >= size:
+            index.records = []
+        # 新的索引点接在已有索引之后，没有可用的索引时重写索引文件
+        append = bool(index.records)
+        start = (index.records[-1][1], index.records[-1][2]) if append else (0, 0)
+        with open(log_file, 'rb') as f:
+            f.seek(start[0])
+            index.lines = start[1]
+            index.size = start[0]
+            if append:
+                # 最后一个索引点所在的行已经记录过
+                line = f.readline()
+                index.lines += 1
+                index.size += len(line)
+            new_records = index.scan(f)
+        if new_records and save:
+            try:
+                with open(index_file_for(log_file), 'ab' if append else 'wb') as f:
+                    f.write(b''.join(INDEX_RECORD.pack(*record) for record in new_records))
+            except OSError:
+                pass
+        if index.records:
+            index.first_time = index.records[0][0]
+        return index
+
+    def scan(self, lines_iter):
+        # 依次读入日志行（bytes），返回新增的索引点
+        new_records = []
+        for line in lines_iter:
+            new_records.extend(self.add_line(line))
+        return new_records
+
+    def add_line(self, line):
+        # 记录一行，返回需要写入索引文件的点（0 或 1 个）
+        number = self.lines
+        offset = self.size
+        self.lines += 1
+        self.size += len(line)
+        batch = is_batch_start(line)
+        if not batch and number % LOG_INDEX_STRIDE:
+            return []
+        timestamp = parse_timestamp(line)
+        if timestamp is None:
+            # 多行消息的续行没有时间戳，沿用上一个索引点的时间
+            timestamp = self.records[-1][0] if self.records else 0
+        record = (timestamp, offset, number, INDEX_BATCH_START if batch else INDEX_STRIDE_POINT)
+        self.records.append(record)
+        if self.first_time is None:
+            self.first_time = timestamp
+        return [record]
+
+
+class LogSegment:
+    def __init__(self, path, live=False):
+        self.path = path
+        # live 为 True 表示正在写入的当前日志
+        self.live = live
+        self.index = LogIndex.load(path, save=False)
+        self.file = None
+        self.map = None
+        # 索引点的行号和时间，用于二分查找
+        self.line_keys = [record[2] for record in self.index.records]
+        self.time_keys = [record[0] for record in self.index.records]
+
+    @property
+    def line_count(self):
+        return self.index.lines
+
+    def open(self):
+        if self.map is None and self.index.size:
+            if self.live:
+                # 读完立即关闭，不占用文件
+                with open(self.path, 'rb') as f:
+                    self.map = f.read(self.index.size)
+            else:
+                self.file = open(self.path, 'rb')
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.map
+
+    def close(self):
+        if self.file is not None:
+            self.map.close()
+            self.file.close()
+            self.file = None
+        self.map = None
+
+    def lines(self, start, stop):
+        # 返回第 [start, stop) 行（不含换行符）
+        data = self.open()
+        if data is None or start >= stop:
+            return []
+        i = bisect_right(self.line_keys, start) - 1
+        _, offset, number, _ = self.index.records[i]
+        end = self.index.size
+        while number < start:
+            offset = data.find(b'\n', offset, end) + 1
+            number += 1
+        result = []
+        while number < stop and offset < end:
+            newline = data.find(b'\n', offset, end)
+            if newline == -1:
+                newline = end
+            result.append(data[offset:newline].decode('utf-8', errors='replace').rstrip('\r'))
+            offset = newline + 1
+            number += 1
+        return result
+
+    def line_at_time(self, timestamp):
+        # 返回第一条时间不早于 timestamp 的行号，没有时返回行数
+        data = self.open()
+        if data is None:
+            return 0
+        i = max(0, bisect_left(self.time_keys, timestamp) - 1)
+        _, offset, number, _ = self.index.records[i]
+        end = self.index.size
+        while offset < end:
+            newline = data.find(b'\n', offset, end)
+            if newline == -1:
+                newline = end
+            line_time = parse_timestamp(data[offset:offset + 22])
+            if line_time is not None and line_time >= timestamp:
+                return number
+            offset = newline + 1
+            number += 1
+        return number
+
+
+class LogStore:
+    # 全部日志分段按时间顺序拼接成一个只读的行序列
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.segments = []
+        # 每个分段第一行的全局行号
+        self.starts = []
+        self.line_count = 0
+        self.refresh()
+
+    def refresh(self):
+        # 重新读取分段和索引（日志有新内容或发生轮转后调用）
+        self.close()
+        live_path = os.path.abspath(self.log_file)
+        self.segments = [
+            LogSegment(path, live=path == live_path)
+            for path in segment_files(self.log_file) if os.path.exists(path)
+        ]
+        self.starts = []
+        total = 0
+        for segment in self.segments:
+            self.starts.append(total)
+            total += segment.line_count
+        self.line_count = total
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+
+    def lines(self, start, stop):
+        # 返回全局第 [start, stop) 行
+        result = []
+        i = max(0, bisect_right(self.starts, start) - 1)
+        while i < len(self.segments) and start < stop:
+            segment = self.segments[i]
+            local_start = start - self.starts[i]
+            local_stop = min(stop - self.starts[i], segment.line_count)
+            if local_stop > local_start:
+                result.extend(segment.lines(local_start, local_stop))
+                start = self.starts[i] + local_stop
+            i += 1
+        return result
+
+    def line_at_time(self, timestamp):
+        # 第一条时间不早于 timestamp 的全局行号
+        for start, segment in zip(self.starts, self.segments):
+            if segment.line_count:
+                number = segment.line_at_time(timestamp)
+                if number < segment.line_count:
+                    return start + number
+        return self.line_count
+
+    def batches(self):
+        # [(时间戳, 全局行号), ...]：每批重命名开始的位置
+        result = []
+        for start, segment in zip(self.starts, self.segments):
+            result.extend(
+                (timestamp, start + number)
+                for timestamp, _, number, kind in segment.index.records
+                if kind == INDEX_BATCH_START
+            )
+        return result
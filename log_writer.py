@@ -0,0 +1,220 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+from log_store import LogIndex, LOG_ROTATE_BYTES, INDEX_RECORD, index_file_for, rotated_name
+import perf_stats
+
+# 日志写入：一个长期打开的文件句柄，由后台线程批量写入并 flush，调用方不再为每条消息打开/关闭文件
+# 文件格式不变：每行 "[YYYY-mm-dd HH:MM:SS] 消息"
+# 程序退出前（close 或 atexit）会写完队列中的全部日志，与原来每条消息立即写入文件的效果相同
+# 写入的同时维护索引（见 log_store.py）；日志超过 LOG_ROTATE_BYTES 或跨月时轮转为带时间戳的分段
+# 轮转失败时（如 Windows 上其他进程正打开着日志）继续写入当前文件，ROTATE_RETRY_SECONDS 后再试
+#
+# 界面、--watch 守护进程和命令行可能同时写同一个日志：每次写入和轮转都在锁文件（日志名 + '.lock'）的
+# 独占锁内进行，写入前检查日志是否已被其他进程轮转（文件已换）或追加（大小与索引不符），据此重新打开或补齐索引
+
+ROTATE_RETRY_SECONDS = 60
+LOCK_SUFFIX = '.lock'
+
+
+class FileLock:
+    # 进程间的独占锁：with lock: ...
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def __enter__(self):
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        else:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            while True:
+                try:
+                    # LK_LOCK 最多等待约 10 秒，之后抛出 OSError，继续等
+                    msvcrt.locking(self.fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        return False
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def format_entries(messages):
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return ''.join(f'[{timestamp}] {message}\n' for message in messages)
+
+
+class LogWriter:
+    def __init__(self, log_file, rotate_bytes=LOG_ROTATE_BYTES):
+        self.log_file = log_file
+        self.rotate_bytes = rotate_bytes
+        self.queue = queue.Queue()
+        self.file = None
+        self.index_file = None
+        self.index = None
+        self.lock = FileLock(log_file + LOCK_SUFFIX)
+        # 轮转失败后，在此时间（time.monotonic）之前不再尝试
+        self.rotate_after = 0.0
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def write(self, message):
+        return self.write_many([message])
+
+    def write_many(self, messages):
+        # 加上时间戳后放入写入队列，返回格式化后的文本供界面显示
+        entry = format_entries(messages)
+        if not self.closed:
+            self.queue.put(entry)
+        return entry
+
+    def flush(self):
+        # 等待队列中已有的日志全部写入文件（如打开日志文件查看之前）
+        if not self.closed:
+            done = threading.Event()
+            self.queue.put(done)
+            done.wait()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            entries = []
+            waiters = []
+            stop = False
+            # 把已排队的日志合并成一次写入
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    entries.append(item)
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if entries:
+                text = ''.join(entries)
+                with perf_stats.span('log_write', text.count('\n')):
+                    self.write_entries(text)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                self.close_files()
+                self.lock.close()
+                return
+
+    def open_files(self):
+        if self.file is None:
+            self.index = LogIndex.load(self.log_file)
+            self.file = open(self.log_file, 'ab')
+            if not self.index.records:
+                # 日志中还没有索引点时清掉可能残留的旧索引（如轮转时索引未能一起改名）
+                open(index_file_for(self.log_file), 'wb').close()
+            # 追加模式：其他进程写入的索引点不会被覆盖
+            self.index_file = open(index_file_for(self.log_file), 'ab')
+
+    def close_files(self):
+        for f in (self.file, self.index_file):
+            if f is not None:
+                try:
+                    f.close()
+                except Exception:
+                    pass
+        self.file = None
+        self.index_file = None
+
+    def sync_with_file(self):
+        # 其他进程轮转过日志（路径上已是另一个文件）时重新打开，追加过内容时补齐索引
+        if self.file is not None:
+            try:
+                current = os.stat(self.log_file)
+            except OSError:
+                current = None
+            opened = os.fstat(self.file.fileno())
+            if current is None or (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+                self.close_files()
+        self.open_files()
+        if os.fstat(self.file.fileno()).st_size != self.index.size:
+            self.index = LogIndex.load(self.log_file)
+
+    def needs_rotation(self):
+        if not self.index.lines or time.monotonic() < self.rotate_after:
+            return False
+        if self.index.size >= self.rotate_bytes:
+            return True
+        # 跨月时轮转，每个分段只包含一个月的日志
+        first = time.localtime(self.index.first_time or 0)
+        now = time.localtime()
+        return (first.tm_year, first.tm_mon) != (now.tm_year, now.tm_mon)
+
+    def rotate(self):
+        self.close_files()
+        target = rotated_name(self.log_file, datetime.now().strftime('%Y%m%d-%H%M%S-%f'))
+        try:
+            os.replace(self.log_file, target)
+        except OSError as e:
+            # 日志仍在原处，本批照常写入当前文件
+            print(f'日志轮转失败，稍后重试: {str(e)}', file=sys.stderr)
+            self.rotate_after = time.monotonic() + ROTATE_RETRY_SECONDS
+        else:
+            try:
+                if os.path.exists(index_file_for(self.log_file)):
+                    os.replace(index_file_for(self.log_file), index_file_for(target))
+            except OSError:
+                # 索引可以重建：分段的索引在查看时补齐，当前日志的旧索引在 open_files 中清掉
+                pass
+        self.open_files()
+
+    def write_entries(self, text):
+        try:
+            with self.lock:
+                self.sync_with_file()
+                if self.needs_rotation():
+                    self.rotate()
+                data = text.encode('utf-8')
+                self.file.write(data)
+                self.file.flush()
+                records = self.index.scan(data.splitlines(keepends=True))
+                if records:
+                    self.index_file.write(b''.join(INDEX_RECORD.pack(*record) for record in records))
+                    self.index_file.flush()
+        except Exception as e:
+            print(f'保存日志失败: {str(e)}', file=sys.stderr)
+            # 下次重新打开（如日志文件被移走）
+            self.close_files()
@@ -1,16 +1,38 @@
 import sys
 import os
-import json
-from datetime import datetime
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QListWidget, QPushButton, QLabel, QLineEdit, QComboBox, QFileDialog, 
-    QTextEdit, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
-    QGroupBox, QFormLayout, QCheckBox
+    QTextEdit, QTableView, QHeaderView, QMessageBox,
+    QGroupBox, QFormLayout, QCheckBox, QProgressBar, QAbstractItemView,
+    QTableWidget, QTableWidgetItem
 )
-from PyQt5.QtCore import Qt, QDropEvent, QMimeData
+from PyQt5.QtCore import Qt, QDropEvent, QMimeData, QTimer
 from PyQt5.QtGui import QFont
 
+import rename_engine
+from rename_engine import RenameSettings
+from file_list import FileList
+from qt_workers import ImportThread, RenameThread
+from log_writer import LogWriter
+from log_store import LogStore, parse_date_input, format_timestamp
+from scan_cache import cache_file_for
+from rename_journal import RenameJournal, journal_dir_for
+from rename_history import RenameHistory, history_file_for
+from qt_table_models import FileTableModel, PreviewTableModel, LogLineModel, EpisodeFieldModel
+from episode_detector import analyze_episode_fields
+from series_groups import group_by_series
+import perf_stats
+
+# 输入停止多久后才刷新预览（毫秒），连续输入时只刷新一次
+PREVIEW_DELAY_MS = 150
+# 日志文本框的刷新间隔（毫秒）：期间的多条日志合并为一次追加
+LOG_FLUSH_MS = 16
+# 日志查看窗口中批次下拉框最多列出的批次数（最近的若干批）
+LOG_VIEW_BATCHES = 200
+# 性能统计窗口的刷新间隔（毫秒）
+STATS_REFRESH_MS = 1000
+
 class MovieRenamerApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -18,12 +40,42 @@ class MovieRenamerApp(QMainWindow):
         self.setGeometry(100, 100, 1000, 700)
         self.setMinimumSize(800, 600)
         
-        self.files = []
+        self.files = FileList()
         self.config_file = 'config.json'
         self.log_file = 'rename_log.txt'
+        # 正在进行的后台导入线程及已收到的文件数
+        self.import_thread = None
+        self.import_received = 0
+        # 代表集数的字段（None 表示使用集数输入框）及整批文件的识别结果
+        self.episode_field = None
+        self.episode_analysis = None
+        # 按剧集分组：用户修改过的各组标题和季数，以及按当前文件列表分好的组 (列表版本, 集数字段, 分组)
+        self.series_overrides = {}
+        self.series_cache = None
+        
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DELAY_MS)
+        self.preview_timer.timeout.connect(self.update_preview)
+        
+        # 重命名日志：用于撤销和中断后恢复
+        self.journal = RenameJournal(journal_dir_for(self.config_file))
+        self.history = RenameHistory(history_file_for(self.config_file))
+        # 正在进行的后台重命名线程及其操作名称
+        self.rename_thread = None
+        self.rename_action = ''
+        
+        # 日志文件由后台线程批量写入；文本框每帧最多更新一次
+        self.log_writer = LogWriter(self.log_file)
+        self.pending_log = []
+        self.log_timer = QTimer(self)
+        self.log_timer.setSingleShot(True)
+        self.log_timer.setInterval(LOG_FLUSH_MS)
+        self.log_timer.timeout.connect(self.flush_log_view)
         
         self.init_ui()
         self.load_config()
+        self.check_interrupted_renames()
     
     def init_ui(self):
         central_widget = QWidget()
@@ -44,18 +96,30 @@ class MovieRenamerApp(QMainWindow):
         self.btn_clear = QPushButton('清空列表')
         self.btn_clear.clicked.connect(self.clear_list)
         
+        self.btn_cancel_import = QPushButton('取消导入')
+        self.btn_cancel_import.setEnabled(False)
+        self.btn_cancel_import.clicked.connect(self.cancel_import)
+        
+        # 导入进度
+        self.import_status = QLabel('')
+        
         select_layout.addWidget(self.btn_add_files)
         select_layout.addWidget(self.btn_add_folder)
         select_layout.addWidget(self.btn_clear)
+        select_layout.addWidget(self.btn_cancel_import)
+        select_layout.addWidget(self.import_status)
         select_group.setLayout(select_layout)
         
         # 文件列表显示区域
         list_group = QGroupBox('文件列表')
         list_layout = QVBoxLayout()
         
-        self.file_table = QTableWidget()
-        self.file_table.setColumnCount(4)
-        self.file_table.setHorizontalHeaderLabels(['原始文件名', '文件类型', '大小', '路径'])
+        # 使用模型/视图，表格只为可见单元格取数据
+        self.file_model = FileTableModel(self.files)
+        self.file_model.files_sorted.connect(self.on_files_sorted)
+        self.file_table = QTableView()
+        self.file_table.setModel(self.file_model)
+        self.file_table.setSortingEnabled(True)
         self.file_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         
         # 启用拖拽功能
@@ -77,27 +141,42 @@ class MovieRenamerApp(QMainWindow):
             '[影视类型] - [标题]',
             '[标题]'
         ])
-        self.template_combo.currentTextChanged.connect(self.update_preview)
+        self.template_combo.currentTextChanged.connect(self.schedule_preview)
         
         self.custom_rule = QLineEdit()
         self.custom_rule.setPlaceholderText('自定义命名规则，例如：[标题] - [年份]')
-        self.custom_rule.textChanged.connect(self.update_preview)
+        self.custom_rule.textChanged.connect(self.schedule_preview)
         
         self.media_type_combo = QComboBox()
         self.media_type_combo.addItems(['番剧', '电视剧', '电影', '其他'])
-        self.media_type_combo.currentTextChanged.connect(self.update_preview)
+        self.media_type_combo.currentTextChanged.connect(self.schedule_preview)
         
         self.title_input = QLineEdit()
         self.title_input.setPlaceholderText('输入标题')
-        self.title_input.textChanged.connect(self.update_preview)
+        self.title_input.textChanged.connect(self.schedule_preview)
         
         self.season_input = QLineEdit()
         self.season_input.setPlaceholderText('输入季数')
-        self.season_input.textChanged.connect(self.update_preview)
+        self.season_input.textChanged.connect(self.schedule_preview)
         
         self.episode_input = QLineEdit()
         self.episode_input.setPlaceholderText('输入集数')
-        self.episode_input.textChanged.connect(self.update_preview)
+        self.episode_input.textChanged.connect(self.schedule_preview)
+        
+        # 集数字段：导入后自动识别，候选字段按像集数的程度排列
+        # 候选项由模型提供，下拉列表只为可见行生成文字，字段再多也能立即打开
+        self.episode_field_model = EpisodeFieldModel(self)
+        self.episode_field_combo = QComboBox()
+        self.episode_field_combo.setModel(self.episode_field_model)
+        self.episode_field_combo.view().setUniformItemSizes(True)
+        # 宽度随布局伸缩，不按所有候选项的文字计算
+        self.episode_field_combo.setSizeAdjustPolicy(QComboBox.AdjustToMinimumContentsLengthWithIcon)
+        self.episode_field_combo.setMinimumContentsLength(30)
+        self.episode_field_combo.currentIndexChanged.connect(self.on_episode_field_changed)
+        self.episode_detect_label = QLabel('')
+        episode_field_layout = QHBoxLayout()
+        episode_field_layout.addWidget(self.episode_field_combo, 1)
+        episode_field_layout.addWidget(self.episode_detect_label)
         
         config_layout.addRow('命名模板:', self.template_combo)
         config_layout.addRow('自定义规则:', self.custom_rule)
@@ -105,15 +184,28 @@ class MovieRenamerApp(QMainWindow):
         config_layout.addRow('标题:', self.title_input)
         config_layout.addRow('季数:', self.season_input)
         config_layout.addRow('集数:', self.episode_input)
+        config_layout.addRow('集数字段:', episode_field_layout)
+        
+        # 按剧集分组：一个文件夹中有多部剧集时，每部各用文件名中的标题、季数和集数
+        self.group_series_check = QCheckBox('按剧集分组')
+        self.group_series_check.toggled.connect(self.on_group_series_toggled)
+        self.btn_edit_series = QPushButton('编辑分组')
+        self.btn_edit_series.clicked.connect(self.edit_series_groups)
+        self.series_label = QLabel('')
+        series_layout = QHBoxLayout()
+        series_layout.addWidget(self.group_series_check)
+        series_layout.addWidget(self.btn_edit_series)
+        series_layout.addWidget(self.series_label, 1)
+        config_layout.addRow('剧集分组:', series_layout)
         config_group.setLayout(config_layout)
         
         # 预览区域
         preview_group = QGroupBox('预览')
         preview_layout = QVBoxLayout()
         
-        self.preview_table = QTableWidget()
-        self.preview_table.setColumnCount(2)
-        self.preview_table.setHorizontalHeaderLabels(['原始文件名', '重命名后'])
+        self.preview_model = PreviewTableModel()
+        self.preview_table = QTableView()
+        self.preview_table.setModel(self.preview_model)
         self.preview_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         
         preview_layout.addWidget(self.preview_table)
@@ -126,6 +218,9 @@ class MovieRenamerApp(QMainWindow):
         self.btn_rename = QPushButton('开始重命名')
         self.btn_rename.clicked.connect(self.start_rename)
         
+        self.btn_undo = QPushButton('撤销上次重命名')
+        self.btn_undo.clicked.connect(self.undo_last_rename)
+        
         self.btn_cancel = QPushButton('取消操作')
         self.btn_cancel.clicked.connect(self.cancel_operation)
         
@@ -135,11 +230,28 @@ class MovieRenamerApp(QMainWindow):
         self.btn_view_log = QPushButton('查看日志')
         self.btn_view_log.clicked.connect(self.view_log)
         
+        self.btn_view_stats = QPushButton('性能统计')
+        self.btn_view_stats.clicked.connect(self.view_stats)
+        
         control_layout.addWidget(self.btn_rename)
+        control_layout.addWidget(self.btn_undo)
         control_layout.addWidget(self.btn_cancel)
         control_layout.addWidget(self.btn_save_config)
         control_layout.addWidget(self.btn_view_log)
-        control_group.setLayout(control_layout)
+        control_layout.addWidget(self.btn_view_stats)
+        
+        # 重命名进度
+        self.rename_progress = QProgressBar()
+        self.rename_progress.setValue(0)
+        self.rename_status = QLabel('')
+        progress_layout = QHBoxLayout()
+        progress_layout.addWidget(self.rename_progress)
+        progress_layout.addWidget(self.rename_status)
+        
+        control_box = QVBoxLayout()
+        control_box.addLayout(control_layout)
+        control_box.addLayout(progress_layout)
+        control_group.setLayout(control_box)
         
         # 日志显示区域
         log_group = QGroupBox('操作日志')
@@ -178,108 +290,353 @@ class MovieRenamerApp(QMainWindow):
     def add_folder(self):
         folder = QFileDialog.getExistingDirectory(self, '选择文件夹')
         if folder:
-            files = []
-            for root, _, filenames in os.walk(folder):
-                for filename in filenames:
-                    if any(filename.lower().endswith(ext) for ext in ['.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.ts']):
-                        files.append(os.path.join(root, filename))
-            if files:
-                self.add_files_to_list(files)
-    
-    def add_files_to_list(self, files):
-        for file_path in files:
-            if file_path not in [f['path'] for f in self.files]:
-                filename = os.path.basename(file_path)
-                file_ext = os.path.splitext(filename)[1]
-                file_size = os.path.getsize(file_path)
-                size_str = self.format_file_size(file_size)
-                
-                self.files.append({
-                    'path': file_path,
-                    'filename': filename,
-                    'ext': file_ext,
-                    'size': file_size,
-                    'size_str': size_str
-                })
+            self.add_files_to_list([folder])
+    
+    def add_files_to_list(self, paths, include_all_files=True):
+        if self.import_thread is not None:
+            QMessageBox.warning(self, '警告', '正在导入文件，请稍候或先取消导入')
+            return
         
+        # 在后台线程中扫描文件夹并读取文件大小，结果分批通过信号送回
+        self.import_received = 0
+        # 未变化的目录直接从扫描缓存读取
+        self.import_thread = ImportThread(paths, include_all_files, cache_file_for(self.config_file), self)
+        self.import_thread.chunk_ready.connect(self.on_import_chunk)
+        self.import_thread.import_finished.connect(self.on_import_finished)
+        self.import_status.setText('正在导入...')
+        self.btn_cancel_import.setEnabled(True)
+        self.import_thread.start()
+    
+    def on_import_chunk(self, files):
+        # 导入已被取消并清空列表时，丢弃剩余结果
+        if self.sender() is not self.import_thread:
+            return
+        self.import_received += len(files)
+        self.files.add_records(files)
         self.update_file_table()
         self.update_preview()
-        self.log(f'添加了 {len(files)} 个文件')
+        self.import_status.setText(f'正在导入: 已找到 {self.import_received} 个文件')
+    
+    def on_import_finished(self, cancelled, error):
+        thread = self.sender()
+        thread.deleteLater()
+        if thread is not self.import_thread:
+            return
+        self.import_thread = None
+        self.btn_cancel_import.setEnabled(False)
+        self.import_status.setText('')
+        # 按剧集分组时，选定集数字段后（on_episode_field_changed）各组依次排列
+        self.detect_episode_field()
+        
+        if error:
+            self.log(f'导入失败: {error}')
+        if cancelled:
+            self.log(f'取消了导入，已添加 {self.import_received} 个文件')
+        elif self.import_received:
+            self.log(f'添加了 {self.import_received} 个文件')
+    
+    def cancel_import(self):
+        if self.import_thread is not None:
+            self.import_thread.cancel()
+            self.import_status.setText('正在取消导入...')
     
     def clear_list(self):
-        self.files = []
+        if self.import_thread is not None:
+            # 线程结束后 on_import_finished 会因线程已不是当前导入线程而直接返回
+            self.import_thread.cancel()
+            self.log(f'取消了导入，已添加 {self.import_received} 个文件')
+            self.import_thread = None
+            self.btn_cancel_import.setEnabled(False)
+            self.import_status.setText('')
+        self.files.clear()
+        self.detect_episode_field()
         self.update_file_table()
         self.update_preview()
         self.log('清空了文件列表')
     
     def update_file_table(self):
-        self.file_table.setRowCount(len(self.files))
-        for i, file_info in enumerate(self.files):
-            self.file_table.setItem(i, 0, QTableWidgetItem(file_info['filename']))
-            self.file_table.setItem(i, 1, QTableWidgetItem(file_info['ext']))
-            self.file_table.setItem(i, 2, QTableWidgetItem(file_info['size_str']))
-            self.file_table.setItem(i, 3, QTableWidgetItem(file_info['path']))
+        self.file_model.set_files(self.files)
+    
+    def detect_episode_field(self):
+        # 分析整批文件名，列出候选集数字段；未选择过字段且置信度足够高时自动选中最可能的字段
+        self.episode_analysis = analyze_episode_fields(self.files) if self.files else None
+        fields = self.episode_analysis.fields if self.episode_analysis is not None else []
+        self.episode_field_combo.blockSignals(True)
+        self.episode_field_model.set_fields(fields)
+        selected = self.episode_field_model.row_of(self.episode_field)
+        if not selected and fields and self.episode_analysis.is_confident:
+            selected = 1
+            self.log(f'自动识别集数: {fields[0].describe()}，置信度 {self.episode_analysis.confidence:.0%}')
+        self.episode_field_combo.setCurrentIndex(selected)
+        self.episode_field_combo.blockSignals(False)
+        if fields:
+            self.episode_detect_label.setText(f'置信度 {self.episode_analysis.confidence:.0%}')
+        else:
+            self.episode_detect_label.setText('')
+        self.on_episode_field_changed(selected)
+    
+    def on_episode_field_changed(self, index):
+        # 选择集数字段后按该字段的数值排序并刷新预览
+        # 字段标识是元组，经 QVariant 保存后可能变成列表
+        key = self.episode_field_combo.itemData(index) if index >= 0 else None
+        self.episode_field = tuple(key) if key is not None else None
+        if self.group_series_check.isChecked():
+            self.arrange_series()
+        elif self.episode_field is not None:
+            rename_engine.sort_files_by_field(self.files, self.episode_field)
+            self.update_file_table()
+        self.update_preview()
+    
+    def current_series_groups(self):
+        # 按剧集分组时，当前文件列表分好的组；文件或顺序变化、集数字段改变后重新分组
+        if not self.group_series_check.isChecked():
+            return None
+        if self.series_cache is None or self.series_cache[:2] != (self.files.version, self.episode_field):
+            self.series_cache = (self.files.version, self.episode_field, group_by_series(self.files, self.episode_field))
+        groups = self.series_cache[2]
+        self.series_label.setText(f'{len(groups)} 部剧集' if groups else '')
+        return groups
+    
+    def arrange_series(self):
+        # 按剧集分组排列文件列表：各组依次排列，组内按集数排序
+        groups = self.current_series_groups()
+        if groups:
+            rename_engine.sort_files_by_series(self.files, groups)
+            # 排序后组内顺序已同步更新，分组仍然有效
+            self.series_cache = (self.files.version, self.episode_field, groups)
+            self.update_file_table()
+    
+    def on_group_series_toggled(self, checked):
+        if checked:
+            self.arrange_series()
+        else:
+            self.series_label.setText('')
+            if self.episode_field is not None:
+                rename_engine.sort_files_by_field(self.files, self.episode_field)
+                self.update_file_table()
+        self.update_preview()
+    
+    def edit_series_groups(self):
+        groups = self.current_series_groups()
+        if not groups:
+            QMessageBox.information(self, '提示', '请先勾选"按剧集分组"并添加文件')
+            return
+        
+        groups_window = QWidget()
+        groups_window.setWindowTitle('编辑分组')
+        groups_window.setGeometry(200, 200, 700, 400)
+        
+        table = QTableWidget(len(groups), 4)
+        table.setHorizontalHeaderLabels(['标题', '季数', '文件数', '集数'])
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        table.verticalHeader().setVisible(False)
+        
+        settings = self.current_settings()
+        for row, group in enumerate(groups):
+            group_settings = group.settings_for(settings)
+            episode = '按集数字段' if group.episode_field is not None else '按序号'
+            values = (group_settings.title, group_settings.season or '1', str(len(group.files)), episode)
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column >= 2:
+                    # 文件数和集数只读
+                    item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+                table.setItem(row, column, item)
+        
+        def on_item_changed(item):
+            # 修改标题或季数后立即刷新预览
+            row = item.row()
+            self.series_overrides[groups[row].key] = {
+                'title': table.item(row, 0).text().strip(),
+                'season': table.item(row, 1).text().strip()
+            }
+            self.update_preview()
+        
+        table.itemChanged.connect(on_item_changed)
+        
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel('双击单元格修改该剧集的标题和季数'))
+        layout.addWidget(table)
+        groups_window.setLayout(layout)
+        groups_window.setAttribute(Qt.WA_DeleteOnClose)
+        # 保留引用，避免窗口被回收
+        self.groups_window = groups_window
+        groups_window.show()
+    
+    def on_files_sorted(self):
+        # 排序后文件顺序改变，预览需要整体刷新
+        self.set_preview_batch(names_only=False)
+    
+    def schedule_preview(self):
+        # 合并连续的输入事件，停止输入一段时间后再刷新预览
+        self.preview_timer.start()
     
     def update_preview(self):
-        self.preview_table.setRowCount(len(self.files))
-        for i, file_info in enumerate(self.files):
-            self.preview_table.setItem(i, 0, QTableWidgetItem(file_info['filename']))
-            
-            new_name = self.generate_new_name(file_info)
-            self.preview_table.setItem(i, 1, QTableWidgetItem(new_name))
+        self.preview_timer.stop()
+        self.set_preview_batch()
+    
+    def set_preview_batch(self, names_only=True):
+        # 界面参数每次刷新只读取一次，可见行由模型按需渲染；按剧集分组时整批预先渲染
+        settings = self.current_settings()
+        if not settings.group_series:
+            self.preview_model.set_batch(self.files, settings, names_only)
+        elif self.import_thread is not None:
+            # 分组要等全部文件导入后才能确定，导入期间不显示预览
+            self.preview_model.set_batch([], settings, names_only=False)
+        else:
+            names = rename_engine.render_batch_names(settings, self.files, self.current_series_groups())
+            self.preview_model.set_batch(self.files, settings, names_only, names)
+    
+    def current_settings(self):
+        return RenameSettings(
+            template=self.template_combo.currentText(),
+            custom_rule=self.custom_rule.text(),
+            media_type=self.media_type_combo.currentText(),
+            title=self.title_input.text(),
+            season=self.season_input.text(),
+            # 集数输入框为空且未选择集数字段、未按剧集分组时，与旧版一致使用固定集数 1
+            episode=self.episode_input.text() or ('' if self.episode_field or self.group_series_check.isChecked() else '1'),
+            episode_field=self.episode_field,
+            group_series=self.group_series_check.isChecked(),
+            series_overrides=dict(self.series_overrides)
+        )
     
     def generate_new_name(self, file_info):
-        rule = self.custom_rule.text() if self.custom_rule.text() else self.template_combo.currentText()
-        
-        new_name = rule
-        new_name = new_name.replace('[影视类型]', self.media_type_combo.currentText())
-        new_name = new_name.replace('[标题]', self.title_input.text() if self.title_input.text() else os.path.splitext(file_info['filename'])[0])
-        new_name = new_name.replace('[季数]', self.season_input.text() if self.season_input.text() else '1')
-        new_name = new_name.replace('[集数]', self.episode_input.text() if self.episode_input.text() else '1')
-        
-        return new_name + file_info['ext']
+        return rename_engine.generate_new_name(self.current_settings(), file_info)
     
     def start_rename(self):
+        if self.rename_thread is not None:
+            QMessageBox.warning(self, '警告', '正在重命名，请稍候或点击"取消操作"')
+            return
+        
+        if self.import_thread is not None:
+            QMessageBox.warning(self, '警告', '正在导入文件，请稍候或先取消导入')
+            return
+        
         if not self.files:
             QMessageBox.warning(self, '警告', '请先添加文件')
             return
         
-        if not self.title_input.text():
+        if not self.title_input.text() and not self.group_series_check.isChecked():
             QMessageBox.warning(self, '警告', '请输入标题')
             return
         
-        success_count = 0
-        error_count = 0
-        
-        for file_info in self.files:
-            try:
-                old_path = file_info['path']
-                directory = os.path.dirname(old_path)
-                new_name = self.generate_new_name(file_info)
-                new_path = os.path.join(directory, new_name)
-                
-                # 检查重名
-                if os.path.exists(new_path) and new_path != old_path:
-                    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-                    base_name, ext = os.path.splitext(new_name)
-                    new_name = f"{base_name}_{timestamp}{ext}"
-                    new_path = os.path.join(directory, new_name)
-                
-                os.rename(old_path, new_path)
-                success_count += 1
-                self.log(f'成功重命名: {file_info["filename"]} -> {new_name}')
-                
-            except Exception as e:
-                error_count += 1
-                self.log(f'重命名失败: {file_info["filename"]} - {str(e)}')
+        settings = self.current_settings()
+        plan = rename_engine.plan_renames(self.files, settings, self.current_series_groups())
+        # 成功重命名的 (原路径, 新路径)，取消时只从列表中去掉这些文件
+        renamed = []
+        self.start_rename_thread('重命名', lambda log, progress, cancel_event: rename_engine.apply_renames(
+            plan, log, renamed, journal=self.journal, progress=progress, cancel_event=cancel_event,
+            history=self.history, template=settings.rule))
+        self.rename_thread.renamed = renamed
+    
+    def start_rename_thread(self, action, work, cancellable=True):
+        # 在后台线程中执行 work，进度和日志按固定间隔通过信号发回
+        self.rename_action = action
+        self.rename_thread = RenameThread(work, cancellable, self)
+        self.rename_thread.messages_ready.connect(self.log_many)
+        self.rename_thread.progress_changed.connect(self.on_rename_progress)
+        self.rename_thread.rename_finished.connect(self.on_rename_finished)
+        self.rename_progress.setValue(0)
+        self.rename_status.setText(f'正在{action}...')
+        self.rename_thread.start()
+    
+    def on_rename_progress(self, done, total, status):
+        self.rename_progress.setMaximum(total)
+        self.rename_progress.setValue(done)
+        if self.rename_thread is not None and self.rename_thread.cancel_event.is_set():
+            status = f'正在取消... {status}'
+        self.rename_status.setText(status)
+    
+    def on_rename_finished(self, success_count, error_count, cancelled, error):
+        thread = self.rename_thread
+        self.rename_thread = None
+        self.rename_progress.setValue(0)
+        self.rename_status.setText('')
+        action = self.rename_action
+        
+        if error:
+            # 重命名日志写入失败等，尚未重命名任何文件
+            self.log(f'{action}失败: {error}')
+            QMessageBox.critical(self, '错误', f'{action}失败: {error}')
+            return
         
-        self.log(f'操作完成: 成功 {success_count} 个, 失败 {error_count} 个')
-        QMessageBox.information(self, '完成', f'重命名操作完成\n成功: {success_count} 个\n失败: {error_count} 个')
+        summary = f'成功: {success_count} 个\n失败: {error_count} 个'
+        if cancelled:
+            skipped = thread.progress.total - success_count - error_count
+            QMessageBox.information(self, '已取消', f'{action}已取消\n{summary}\n未执行: {skipped} 个')
+            renamed = getattr(thread, 'renamed', None)
+            if renamed is not None:
+                # 未执行的文件留在列表中，可以直接再次重命名
+                self.remove_renamed_files(renamed)
+                return
+        else:
+            QMessageBox.information(self, '完成', f'{action}操作完成\n{summary}')
         
         # 清空列表并更新
         self.clear_list()
     
+    def remove_renamed_files(self, renamed):
+        sources = {source for source, _ in renamed}
+        self.files.remove([i for i, file_info in enumerate(self.files) if file_info['path'] in sources])
+        self.update_file_table()
+        self.detect_episode_field()
+        self.update_preview()
+    
+    def undo_last_rename(self):
+        if self.rename_thread is not None:
+            QMessageBox.warning(self, '警告', '正在重命名，请稍候')
+            return
+        
+        batch = self.journal.last_undoable()
+        if batch is None:
+            QMessageBox.information(self, '提示', '没有可撤销的重命名')
+            return
+        
+        reply = QMessageBox.question(self, '确认', f'撤销 {batch.time} 的重命名（{batch.file_count} 个文件）？')
+        if reply != QMessageBox.Yes:
+            return
+        
+        self.log(f'撤销 {batch.time} 的重命名')
+        # 撤销不支持中途取消，否则会留下一半撤销、一半未撤销的批次
+        self.start_rename_thread('撤销', lambda log, progress, cancel_event: self.journal.undo(
+            batch, log, progress=progress, history=self.history), cancellable=False)
+    
+    def check_interrupted_renames(self, batches=None):
+        # 上次重命名中途退出时，逐个询问继续完成还是回滚；与普通重命名一样在后台执行，完成后再询问下一个
+        batches = self.journal.interrupted() if batches is None else batches
+        while batches:
+            batch = batches.pop(0)
+            reply = QMessageBox.question(
+                self, '发现未完成的重命名',
+                f'{batch.time} 的重命名（{batch.file_count} 个文件）未能完成。\n'
+                '是：继续完成\n否：回滚已完成的部分\n取消：下次再处理',
+                QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel
+            )
+            if reply == QMessageBox.Yes:
+                self.log(f'继续完成 {batch.time} 的重命名')
+                self.start_rename_thread('继续完成', lambda log, progress, cancel_event: self.journal.resume(
+                    batch, log, progress=progress, history=self.history), cancellable=False)
+            elif reply == QMessageBox.No:
+                self.log(f'回滚 {batch.time} 的重命名')
+                self.start_rename_thread('回滚', lambda log, progress, cancel_event: self.journal.undo(
+                    batch, log, progress=progress, history=self.history), cancellable=False)
+            else:
+                continue
+            # 在 on_rename_finished 之后调用
+            self.rename_thread.rename_finished.connect(lambda *_: self.check_interrupted_renames(batches))
+            return
+    
     def cancel_operation(self):
+        if self.rename_thread is not None:
+            # 正在重命名时只停止重命名，已完成的部分保留，可通过"撤销上次重命名"改回
+            if not self.rename_thread.cancellable:
+                QMessageBox.information(self, '提示', f'{self.rename_action}不能中途取消，请稍候')
+                return
+            self.rename_thread.cancel()
+            self.rename_status.setText('正在取消...')
+            return
+        
         self.clear_list()
         self.title_input.clear()
         self.season_input.clear()
@@ -294,11 +651,15 @@ class MovieRenamerApp(QMainWindow):
             'media_type': self.media_type_combo.currentText(),
             'title': self.title_input.text(),
             'season': self.season_input.text(),
-            'episode': self.episode_input.text()
+            'episode': self.episode_input.text(),
+            # Qt 前端没有集数前缀输入框；与 Tk 前端和命令行共用配置时，这两项保持一致的含义
+            'episode_prefix': '',
+            'episode_field': list(self.episode_field) if self.episode_field else None,
+            'group_series': self.group_series_check.isChecked(),
+            'series_overrides': self.series_overrides
         }
         
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
+        rename_engine.save_config(self.config_file, config)
         
         self.log('配置已保存')
         QMessageBox.information(self, '成功', '配置已保存')
@@ -306,8 +667,7 @@ class MovieRenamerApp(QMainWindow):
     def load_config(self):
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
+                config = rename_engine.load_config(self.config_file)
                 
                 if 'template' in config:
                     index = self.template_combo.findText(config['template'])
@@ -331,71 +691,216 @@ class MovieRenamerApp(QMainWindow):
                 if 'episode' in config:
                     self.episode_input.setText(config['episode'])
                 
+                # 保存的集数字段：下次识别时，这批文件中有该字段才会选中（见 EpisodeFieldModel.row_of）
+                if config.get('episode_field'):
+                    self.episode_field = tuple(config['episode_field'])
+                
+                self.series_overrides = dict(config.get('series_overrides') or {})
+                self.group_series_check.setChecked(config.get('group_series', False))
+                
                 self.log('配置已加载')
             except Exception as e:
                 self.log(f'加载配置失败: {str(e)}')
     
     def view_log(self):
-        if os.path.exists(self.log_file):
-            try:
-                with open(self.log_file, 'r', encoding='utf-8') as f:
-                    log_content = f.read()
-                
-                log_window = QWidget()
-                log_window.setWindowTitle('操作日志')
-                log_window.setGeometry(200, 200, 800, 600)
-                
-                layout = QVBoxLayout()
-                log_text = QTextEdit()
-                log_text.setReadOnly(True)
-                log_text.setText(log_content)
-                
-                layout.addWidget(log_text)
-                log_window.setLayout(layout)
-                log_window.show()
-            except Exception as e:
-                QMessageBox.warning(self, '错误', f'查看日志失败: {str(e)}')
-        else:
+        self.log_writer.flush()
+        if not os.path.exists(self.log_file):
             QMessageBox.information(self, '提示', '暂无日志记录')
+            return
+        
+        try:
+            # 日志按页从内存映射中读取，表格只向模型请求可见的行
+            store = LogStore(self.log_file)
+        except Exception as e:
+            QMessageBox.warning(self, '错误', f'查看日志失败: {str(e)}')
+            return
+        
+        log_window = QWidget()
+        log_window.setWindowTitle('操作日志')
+        log_window.setGeometry(200, 200, 900, 600)
+        
+        date_input = QLineEdit()
+        date_input.setPlaceholderText('2026-02-01 16:25')
+        btn_jump = QPushButton('跳转')
+        batch_combo = QComboBox()
+        btn_refresh = QPushButton('刷新')
+        count_label = QLabel('')
+        
+        toolbar = QHBoxLayout()
+        toolbar.addWidget(QLabel('跳转到时间:'))
+        toolbar.addWidget(date_input)
+        toolbar.addWidget(btn_jump)
+        toolbar.addWidget(QLabel('批次:'))
+        toolbar.addWidget(batch_combo)
+        toolbar.addWidget(btn_refresh)
+        toolbar.addStretch()
+        toolbar.addWidget(count_label)
+        
+        model = LogLineModel(store, log_window)
+        table = QTableView()
+        table.setModel(model)
+        table.horizontalHeader().setStretchLastSection(True)
+        table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        
+        layout = QVBoxLayout()
+        layout.addLayout(toolbar)
+        layout.addWidget(table)
+        log_window.setLayout(layout)
+        
+        batches = []
+        
+        def scroll_to_line(line):
+            if store.line_count:
+                table.scrollTo(model.index(min(line, store.line_count - 1), 0), QAbstractItemView.PositionAtTop)
+        
+        def load():
+            model.reload()
+            batches[:] = store.batches()[-LOG_VIEW_BATCHES:][::-1]
+            batch_combo.blockSignals(True)
+            batch_combo.clear()
+            batch_combo.addItems([f'{format_timestamp(timestamp)}（第 {line + 1} 行）' for timestamp, line in batches])
+            batch_combo.setCurrentIndex(-1)
+            batch_combo.blockSignals(False)
+            count_label.setText(f'共 {store.line_count} 行')
+        
+        def jump_to_date():
+            timestamp = parse_date_input(date_input.text())
+            if timestamp is None:
+                QMessageBox.warning(log_window, '警告', '请输入日期，如 2026-02-01 或 2026-02-01 16:25')
+                return
+            scroll_to_line(store.line_at_time(timestamp))
+        
+        def jump_to_batch(index):
+            if index >= 0:
+                scroll_to_line(batches[index][1])
+        
+        def refresh():
+            self.log_writer.flush()
+            load()
+        
+        btn_jump.clicked.connect(jump_to_date)
+        date_input.returnPressed.connect(jump_to_date)
+        batch_combo.currentIndexChanged.connect(jump_to_batch)
+        btn_refresh.clicked.connect(refresh)
+        log_window.destroyed.connect(lambda *args: store.close())
+        log_window.setAttribute(Qt.WA_DeleteOnClose)
+        
+        load()
+        # 默认显示最新的日志
+        table.scrollToBottom()
+        # 保留引用，避免窗口被回收
+        self.log_window = log_window
+        log_window.show()
+    
+    def view_stats(self):
+        # 各环节的次数和耗时分布（见 perf_stats.py），窗口打开期间定时刷新
+        stats_window = QWidget()
+        stats_window.setWindowTitle('性能统计')
+        stats_window.setGeometry(200, 200, 900, 400)
+        
+        enabled_check = QCheckBox('启用统计')
+        enabled_check.setChecked(perf_stats.is_enabled())
+        btn_reset = QPushButton('重置')
+        btn_export = QPushButton('导出 JSON')
+        btn_profile = QPushButton('分析下一批重命名')
+        status_label = QLabel('')
+        
+        toolbar = QHBoxLayout()
+        toolbar.addWidget(enabled_check)
+        toolbar.addWidget(btn_reset)
+        toolbar.addWidget(btn_export)
+        toolbar.addWidget(btn_profile)
+        toolbar.addStretch()
+        toolbar.addWidget(status_label)
+        
+        table = QTableWidget(0, len(perf_stats.COLUMN_TITLES))
+        table.setHorizontalHeaderLabels(perf_stats.COLUMN_TITLES)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        
+        layout = QVBoxLayout()
+        layout.addLayout(toolbar)
+        layout.addWidget(table)
+        stats_window.setLayout(layout)
+        
+        def refresh():
+            rows = perf_stats.format_rows()
+            table.setRowCount(len(rows))
+            for row, values in enumerate(rows):
+                for column, value in enumerate(values):
+                    item = QTableWidgetItem(value)
+                    if column:
+                        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    table.setItem(row, column, item)
+            pending = perf_stats.profile_pending()
+            status_label.setText(f'等待分析下一批: {os.path.basename(pending)}' if pending else '')
+        
+        def reset():
+            perf_stats.reset()
+            refresh()
+        
+        def export_json():
+            path, _ = QFileDialog.getSaveFileName(stats_window, '导出性能统计', 'perf_stats.json', 'JSON 文件 (*.json)')
+            if path:
+                try:
+                    perf_stats.export_json(path)
+                except Exception as e:
+                    QMessageBox.warning(stats_window, '错误', f'导出失败: {str(e)}')
+        
+        def request_profile():
+            path, _ = QFileDialog.getSaveFileName(stats_window, '保存性能分析结果', 'rename.prof', 'cProfile 结果 (*.prof)')
+            if path:
+                perf_stats.request_profile(path)
+                refresh()
+        
+        enabled_check.toggled.connect(perf_stats.enable)
+        btn_reset.clicked.connect(reset)
+        btn_export.clicked.connect(export_json)
+        btn_profile.clicked.connect(request_profile)
+        
+        timer = QTimer(stats_window)
+        timer.setInterval(STATS_REFRESH_MS)
+        timer.timeout.connect(refresh)
+        timer.start()
+        stats_window.setAttribute(Qt.WA_DeleteOnClose)
+        
+        refresh()
+        # 保留引用，避免窗口被回收
+        self.stats_window = stats_window
+        stats_window.show()
     
     def log(self, message):
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        log_entry = f'[{timestamp}] {message}\n'
-        
+        self.log_many([message])
+    
+    def log_many(self, messages):
+        # 写入日志文件（后台线程批量写入），文本框的更新合并到下一帧
+        self.pending_log.append(self.log_writer.write_many(messages))
+        if not self.log_timer.isActive():
+            self.log_timer.start()
+    
+    def flush_log_view(self):
+        log_entry = ''.join(self.pending_log)
+        self.pending_log = []
         self.log_text.append(log_entry)
-        
-        # 保存到日志文件
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
+    
+    def closeEvent(self, event):
+        # 退出前写完所有日志
+        self.log_writer.close()
+        super().closeEvent(event)
     
     def format_file_size(self, size_bytes):
-        if size_bytes < 1024:
-            return f"{size_bytes} B"
-        elif size_bytes < 1024 * 1024:
-            return f"{size_bytes / 1024:.2f} KB"
-        elif size_bytes < 1024 * 1024 * 1024:
-            return f"{size_bytes / (1024 * 1024):.2f} MB"
-        else:
-            return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
+        return rename_engine.format_file_size(size_bytes)
     
     def drag_enter_event(self, event):
         if event.mimeData().hasUrls():
             event.acceptProposedAction()
     
     def drop_event(self, event):
-        files = []
-        for url in event.mimeData().urls():
-            path = url.toLocalFile()
-            if os.path.isfile(path) and any(path.lower().endswith(ext) for ext in ['.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.ts']):
-                files.append(path)
-            elif os.path.isdir(path):
-                for root, _, filenames in os.walk(path):
-                    for filename in filenames:
-                        if any(filename.lower().endswith(ext) for ext in ['.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.ts']):
-                            files.append(os.path.join(root, filename))
-        
-        if files:
-            self.add_files_to_list(files)
+        paths = [url.toLocalFile() for url in event.mimeData().urls()]
+        if paths:
+            self.add_files_to_list(paths, include_all_files=False)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
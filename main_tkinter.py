@@ -1,11 +1,36 @@
 import sys
 import os
-import json
-import re
-from datetime import datetime
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-import webbrowser
+from tkinter import ttk, filedialog, messagebox, simpledialog
+
+import rename_engine
+from rename_engine import RenameSettings, TEMPLATES, MEDIA_TYPES
+from name_template import render_names
+from file_list import FileList
+from import_worker import ImportJob
+from scan_cache import cache_file_for
+from rename_journal import RenameJournal, journal_dir_for
+from rename_history import RenameHistory, history_file_for
+from rename_worker import RenameJob
+from log_writer import LogWriter
+from log_store import LogStore, parse_date_input, format_timestamp
+from tk_virtual_tree import VirtualTreeview
+from episode_detector import analyze_episode_fields, field_for_value, field_values, tokenize
+from series_groups import group_by_series
+import perf_stats
+
+# 输入停止多久后才刷新预览（毫秒），连续输入时只刷新一次
+PREVIEW_DELAY_MS = 150
+# 后台导入时界面取回扫描结果的间隔（毫秒）
+IMPORT_POLL_MS = 100
+# 后台重命名时界面刷新进度和日志的间隔（毫秒）
+RENAME_POLL_MS = 100
+# 日志文本框的刷新间隔（毫秒）：期间的多条日志合并为一次插入
+LOG_FLUSH_MS = 16
+# 日志查看窗口中批次下拉框最多列出的批次数（最近的若干批）
+LOG_VIEW_BATCHES = 200
+# 性能统计窗口的刷新间隔（毫秒）
+STATS_REFRESH_MS = 1000
 
 class MovieRenamerApp:
     def __init__(self, root):
@@ -15,13 +40,44 @@ class MovieRenamerApp:
         self.root.geometry('900x650')
         self.root.minsize(800, 600)
         
-        self.files = []
+        self.files = FileList()
         self.config_file = 'config.json'
         self.log_file = 'rename_log.txt'
         self.episode_index = -1  # 存储用户选择的数字索引，-1表示未选择
+        # 代表集数的字段及整批文件的识别结果；episode_field_manual 为 True 时是用户选择的，不再自动替换
+        self.episode_field = None
+        self.episode_field_manual = False
+        # 配置中保存的集数字段：只作为第一批文件的提示，这批文件中有该字段时才采用
+        self.saved_episode_field = None
+        self.episode_analysis = None
+        # 按剧集分组：用户修改过的各组标题和季数，以及按当前文件列表分好的组 (列表版本, 集数字段, 分组)
+        self.series_overrides = {}
+        self.series_cache = None
+        
+        # 预览使用的命名参数，每次刷新时读取一次，可见行按需渲染
+        self.preview_settings = None
+        # 按剧集分组时整批预先渲染的新文件名（各组分别编号，无法只渲染可见行）
+        self.preview_names = None
+        self.preview_after_id = None
+        # 文件列表当前的排序列及是否倒序
+        self.sort_column = None
+        self.sort_reverse = False
+        # 正在进行的后台导入任务
+        self.import_job = None
+        # 重命名日志：用于撤销和中断后恢复
+        self.journal = RenameJournal(journal_dir_for(self.config_file))
+        self.history = RenameHistory(history_file_for(self.config_file))
+        # 正在进行的后台重命名任务
+        self.rename_job = None
+        # 日志文件由后台线程批量写入；文本框每帧最多更新一次
+        self.log_writer = LogWriter(self.log_file)
+        self.pending_log = []
+        self.log_flush_id = None
+        self.root.protocol('WM_DELETE_WINDOW', self.on_close)
         
         self.create_widgets()
         self.load_config()
+        self.root.after_idle(self.check_interrupted_renames)
     
     def create_widgets(self):
         # 创建主框架，添加滚动功能
@@ -65,30 +121,33 @@ class MovieRenamerApp:
         ttk.Button(select_buttons, text='添加文件', command=self.add_files).pack(side=tk.LEFT, padx=5)
         ttk.Button(select_buttons, text='添加文件夹', command=self.add_folder).pack(side=tk.LEFT, padx=5)
         ttk.Button(select_buttons, text='清空列表', command=self.clear_list).pack(side=tk.LEFT, padx=5)
+        self.cancel_import_button = ttk.Button(select_buttons, text='取消导入', command=self.cancel_import, state=tk.DISABLED)
+        self.cancel_import_button.pack(side=tk.LEFT, padx=5)
+        
+        # 导入进度
+        self.import_status_var = tk.StringVar()
+        ttk.Label(select_buttons, textvariable=self.import_status_var).pack(side=tk.LEFT, padx=5)
         
         # 文件列表显示区域
         list_frame = ttk.LabelFrame(scrollable_frame, text='文件列表', padding='10')
         list_frame.pack(fill=tk.X, pady=5)
         
-        # 创建树状视图，设置高度
-        self.file_tree = ttk.Treeview(list_frame, columns=('filename', 'ext', 'size', 'path'), show='headings', height=15)
-        self.file_tree.heading('filename', text='原始文件名')
-        self.file_tree.heading('ext', text='文件类型')
-        self.file_tree.heading('size', text='大小')
-        self.file_tree.heading('path', text='路径')
+        # 创建虚拟化树状视图（自带滚动条），只为可见行创建条目
+        self.file_view = VirtualTreeview(list_frame, columns=('filename', 'ext', 'size', 'path'), get_rows=self.get_file_rows, height=15)
+        self.file_tree = self.file_view.tree
+        # 点击列标题排序
+        self.file_view.heading('filename', text='原始文件名', command=lambda: self.sort_by_column('filename'))
+        self.file_view.heading('ext', text='文件类型', command=lambda: self.sort_by_column('ext'))
+        self.file_view.heading('size', text='大小', command=lambda: self.sort_by_column('size'))
+        self.file_view.heading('path', text='路径', command=lambda: self.sort_by_column('path'))
         
         # 设置列宽
-        self.file_tree.column('filename', width=200)
-        self.file_tree.column('ext', width=80)
-        self.file_tree.column('size', width=100)
-        self.file_tree.column('path', width=400)
-        
-        # 添加滚动条
-        file_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.file_tree.yview)
-        self.file_tree.configure(yscroll=file_scrollbar.set)
-        file_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.file_view.column('filename', width=200)
+        self.file_view.column('ext', width=80)
+        self.file_view.column('size', width=100)
+        self.file_view.column('path', width=400)
         
-        self.file_tree.pack(fill=tk.X, expand=False)
+        self.file_view.pack(fill=tk.X, expand=False)
         
         # 启用拖拽功能
         # tkinter的拖拽功能需要不同的实现方式
@@ -110,12 +169,7 @@ class MovieRenamerApp:
         ttk.Label(config_grid, text='命名模板:').grid(row=0, column=0, sticky=tk.W, pady=5)
         self.template_var = tk.StringVar()
         self.template_combo = ttk.Combobox(config_grid, textvariable=self.template_var, width=40)
-        self.template_combo['values'] = [
-            '[影视类型] - [标题] - [季数] - [集数]',
-            '[标题] - [季数] - [集数]',
-            '[影视类型] - [标题]',
-            '[标题]'
-        ]
+        self.template_combo['values'] = TEMPLATES
         self.template_combo.current(0)
         self.template_combo.bind('<<ComboboxSelected>>', self.update_preview)
         self.template_combo.grid(row=0, column=1, sticky=tk.W, pady=5)
@@ -125,14 +179,14 @@ class MovieRenamerApp:
         self.custom_rule_var = tk.StringVar()
         self.custom_rule = ttk.Entry(config_grid, textvariable=self.custom_rule_var, width=40)
         self.custom_rule.insert(0, '')
-        self.custom_rule.bind('<KeyRelease>', self.update_preview)
+        self.custom_rule.bind('<KeyRelease>', self.schedule_preview)
         self.custom_rule.grid(row=1, column=1, sticky=tk.W, pady=5)
         
         # 影视类型
         ttk.Label(config_grid, text='影视类型:').grid(row=2, column=0, sticky=tk.W, pady=5)
         self.media_type_var = tk.StringVar()
         self.media_type_combo = ttk.Combobox(config_grid, textvariable=self.media_type_var, width=20)
-        self.media_type_combo['values'] = ['番剧', '电视剧', '电影', '其他']
+        self.media_type_combo['values'] = MEDIA_TYPES
         self.media_type_combo.current(0)
         self.media_type_combo.bind('<<ComboboxSelected>>', self.update_preview)
         self.media_type_combo.grid(row=2, column=1, sticky=tk.W, pady=5)
@@ -142,7 +196,7 @@ class MovieRenamerApp:
         self.title_var = tk.StringVar()
         self.title_input = ttk.Entry(config_grid, textvariable=self.title_var, width=40)
         self.title_input.insert(0, '')
-        self.title_input.bind('<KeyRelease>', self.update_preview)
+        self.title_input.bind('<KeyRelease>', self.schedule_preview)
         self.title_input.grid(row=3, column=1, sticky=tk.W, pady=5)
         
         # 季数
@@ -150,7 +204,7 @@ class MovieRenamerApp:
         self.season_var = tk.StringVar()
         self.season_input = ttk.Entry(config_grid, textvariable=self.season_var, width=10)
         self.season_input.insert(0, '')
-        self.season_input.bind('<KeyRelease>', self.update_preview)
+        self.season_input.bind('<KeyRelease>', self.schedule_preview)
         self.season_input.grid(row=4, column=1, sticky=tk.W, pady=5)
         
         # 集数前缀
@@ -164,34 +218,46 @@ class MovieRenamerApp:
         self.episode_prefix_var = tk.StringVar()
         self.episode_input = ttk.Entry(self.episode_frame, textvariable=self.episode_prefix_var, width=10)
         self.episode_input.insert(0, '')
-        self.episode_input.bind('<KeyRelease>', self.update_preview)
+        self.episode_input.bind('<KeyRelease>', self.schedule_preview)
         
         # 数字匹配显示标签
         self.episode_match_label = ttk.Label(self.episode_frame, text='', font=('Arial', 10))
         self.episode_match_label.bind('<Button-1>', self.on_episode_label_click)
         
+        # 集数字段识别结果，点击后可从候选字段中选择
+        self.episode_detect_label = ttk.Label(self.episode_frame, text='', foreground='gray', cursor='hand2')
+        self.episode_detect_label.bind('<Button-1>', lambda event: self.prompt_episode_selection())
+        
         # 布局
         self.episode_input.pack(side=tk.LEFT, padx=5)
         self.episode_match_label.pack(side=tk.LEFT, padx=5)
+        self.episode_detect_label.pack(side=tk.LEFT, padx=5)
+        
+        # 按剧集分组：一个文件夹中有多部剧集时，每部各用文件名中的标题、季数和集数
+        ttk.Label(config_grid, text='剧集分组:').grid(row=6, column=0, sticky=tk.W, pady=5)
+        series_frame = ttk.Frame(config_grid)
+        series_frame.grid(row=6, column=1, sticky=tk.W, pady=5)
+        self.group_series_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(series_frame, text='按剧集分组', variable=self.group_series_var,
+                        command=self.on_group_series_toggled).pack(side=tk.LEFT, padx=5)
+        ttk.Button(series_frame, text='编辑分组', command=self.edit_series_groups).pack(side=tk.LEFT, padx=5)
+        self.series_label = ttk.Label(series_frame, text='', foreground='gray')
+        self.series_label.pack(side=tk.LEFT, padx=5)
         
         # 预览区域
         preview_frame = ttk.LabelFrame(scrollable_frame, text='预览', padding='10')
         preview_frame.pack(fill=tk.X, pady=5)
         
-        # 创建预览树，设置高度
-        self.preview_tree = ttk.Treeview(preview_frame, columns=('original', 'new'), show='headings', height=10)
-        self.preview_tree.heading('original', text='原始文件名')
-        self.preview_tree.heading('new', text='重命名后')
+        # 创建虚拟化预览树，新文件名只为可见行渲染
+        self.preview_view = VirtualTreeview(preview_frame, columns=('original', 'new'), get_rows=self.get_preview_rows, height=10)
+        self.preview_tree = self.preview_view.tree
+        self.preview_view.heading('original', text='原始文件名')
+        self.preview_view.heading('new', text='重命名后')
         
-        self.preview_tree.column('original', width=300)
-        self.preview_tree.column('new', width=300)
+        self.preview_view.column('original', width=300)
+        self.preview_view.column('new', width=300)
         
-        # 添加滚动条
-        preview_scrollbar = ttk.Scrollbar(preview_frame, orient=tk.VERTICAL, command=self.preview_tree.yview)
-        self.preview_tree.configure(yscroll=preview_scrollbar.set)
-        preview_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        self.preview_tree.pack(fill=tk.X, expand=False)
+        self.preview_view.pack(fill=tk.X, expand=False)
         
         # 操作控制区域
         control_frame = ttk.LabelFrame(scrollable_frame, text='操作控制', padding='10')
@@ -201,9 +267,19 @@ class MovieRenamerApp:
         control_buttons.pack(fill=tk.X)
         
         ttk.Button(control_buttons, text='开始重命名', command=self.start_rename).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_buttons, text='撤销上次重命名', command=self.undo_last_rename).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_buttons, text='取消操作', command=self.cancel_operation).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_buttons, text='保存配置', command=self.save_config).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_buttons, text='查看日志', command=self.view_log).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_buttons, text='性能统计', command=self.view_stats).pack(side=tk.LEFT, padx=5)
+        
+        # 重命名进度
+        rename_progress_frame = ttk.Frame(control_frame)
+        rename_progress_frame.pack(fill=tk.X, pady=(5, 0))
+        self.rename_progress = ttk.Progressbar(rename_progress_frame, mode='determinate')
+        self.rename_progress.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.rename_status_var = tk.StringVar()
+        ttk.Label(rename_progress_frame, textvariable=self.rename_status_var, width=30).pack(side=tk.LEFT, padx=5)
         
         # 日志显示区域
         log_frame = ttk.LabelFrame(scrollable_frame, text='操作日志', padding='10')
@@ -229,203 +305,314 @@ class MovieRenamerApp:
     def add_folder(self):
         folder = filedialog.askdirectory(title='选择文件夹')
         if folder:
-            files = []
-            for root, _, filenames in os.walk(folder):
-                for filename in filenames:
-                    if any(filename.lower().endswith(ext) for ext in ['.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.ts']):
-                        files.append(os.path.join(root, filename))
-            if files:
-                self.add_files_to_list(files)
+            self.add_files_to_list([folder])
     
     def extract_numbers(self, filename):
         # 提取文件名中的所有数字序列
-        numbers = re.findall(r'\d+', filename)
-        return numbers
+        return rename_engine.extract_numbers(filename)
     
     def natural_sort_key(self, s):
-        # 自然排序键函数，将字符串分割成文本和数字部分
-        import re
-        # 使用正则表达式分割字符串，保留数字和非数字部分
-        parts = re.split(r'(\d+)', s)
-        # 对数字部分转换为整数，文本部分保持原样
-        return [int(part) if part.isdigit() else part for part in parts]
-    
-    def add_files_to_list(self, files):
-        for file_path in files:
-            if file_path not in [f['path'] for f in self.files]:
-                filename = os.path.basename(file_path)
-                file_ext = os.path.splitext(filename)[1]
-                file_size = os.path.getsize(file_path)
-                size_str = self.format_file_size(file_size)
-                
-                # 提取文件名中的数字序列
-                numbers = self.extract_numbers(filename)
-                
-                self.files.append({
-                    'path': file_path,
-                    'filename': filename,
-                    'ext': file_ext,
-                    'size': file_size,
-                    'size_str': size_str,
-                    'numbers': numbers
-                })
-        
-        # 使用自然排序
-        self.files.sort(key=lambda x: self.natural_sort_key(x['filename']))
+        return rename_engine.natural_sort_key(s)
+    
+    def add_files_to_list(self, paths, include_all_files=True):
+        if self.import_job is not None:
+            messagebox.showwarning('警告', '正在导入文件，请稍候或先取消导入')
+            return
         
-        self.update_file_tree()
-        self.update_preview()
+        # 在后台线程中扫描文件夹并读取文件大小，界面定时取回结果
+        # 未变化的目录直接从扫描缓存读取
+        self.import_job = ImportJob(paths, include_all_files, cache_file_for(self.config_file))
+        self.import_job.start()
+        self.import_status_var.set('正在导入...')
+        self.cancel_import_button.config(state=tk.NORMAL)
+        self.root.after(IMPORT_POLL_MS, self.poll_import, self.import_job)
+    
+    def poll_import(self, job):
+        # 导入已被取消并清空列表时，丢弃剩余结果
+        if job is not self.import_job:
+            return
         
-        # 更新集数匹配显示
-        self.update_episode_match_display()
+        files = job.drain()
+        if files:
+            # 按规范化路径去重，新文件合并进已有的自然数字顺序
+            self.files.add_records(files)
+            self.update_file_tree()
+            self.update_preview()
+            self.import_status_var.set(f'正在导入: 已找到 {job.received} 个文件')
+        
+        if job.finished:
+            self.finish_import(job)
+        else:
+            self.root.after(IMPORT_POLL_MS, self.poll_import, job)
+    
+    def finish_import(self, job):
+        self.import_job = None
+        self.cancel_import_button.config(state=tk.DISABLED)
+        self.import_status_var.set('')
         
-        self.log(f'添加了 {len(files)} 个文件，并按自然数字顺序排序')
+        # 识别集数字段并更新集数匹配显示
+        self.detect_episode_field()
+        self.update_episode_match_display()
+        if self.group_series_var.get():
+            self.arrange_series()
+            self.update_preview()
+        
+        if job.error is not None:
+            self.log(f'导入失败: {str(job.error)}')
+        if job.cancelled:
+            self.log(f'取消了导入，已添加 {job.received} 个文件')
+        elif job.received:
+            self.log(f'添加了 {job.received} 个文件，并按自然数字顺序排序')
+    
+    def cancel_import(self):
+        if self.import_job is not None:
+            self.import_job.cancel()
+            self.import_status_var.set('正在取消导入...')
     
     def clear_list(self):
-        self.files = []
+        if self.import_job is not None:
+            self.import_job.cancel()
+            self.finish_import(self.import_job)
+        self.files.clear()
         # 重置episode_pattern属性
         if hasattr(self, 'episode_pattern'):
             delattr(self, 'episode_pattern')
         self.episode_index = -1
+        self.episode_field = None
+        self.episode_field_manual = False
+        self.detect_episode_field()
         self.update_file_tree()
         self.update_preview()
         self.update_episode_match_display()
         self.log('清空了文件列表')
     
+    def get_file_rows(self, start, stop):
+        return [
+            (file_info['filename'], file_info['ext'], file_info['size_str'], file_info['path'])
+            for file_info in self.files[start:stop]
+        ]
+    
     def update_file_tree(self):
-        # 清空树状视图
-        for item in self.file_tree.get_children():
-            self.file_tree.delete(item)
-        
-        # 添加文件信息
-        for file_info in self.files:
-            self.file_tree.insert('', tk.END, values=(
-                file_info['filename'],
-                file_info['ext'],
-                file_info['size_str'],
-                file_info['path']
-            ))
+        self.file_view.set_row_count(len(self.files))
+    
+    def sort_by_column(self, column):
+        # 再次点击同一列时切换升序/倒序
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = False
+        rename_engine.sort_files(self.files, column, self.sort_reverse)
+        self.update_file_tree()
+        self.update_preview()
+    
+    def schedule_preview(self, event=None):
+        # 合并连续的输入事件，停止输入一段时间后再刷新预览
+        if self.preview_after_id is not None:
+            self.root.after_cancel(self.preview_after_id)
+        self.preview_after_id = self.root.after(PREVIEW_DELAY_MS, self.update_preview)
     
     def update_preview(self, event=None):
-        # 清空预览树
-        for item in self.preview_tree.get_children():
-            self.preview_tree.delete(item)
-        
-        # 添加预览信息
-        for index, file_info in enumerate(self.files):
-            new_name = self.generate_new_name(file_info, index)
-            self.preview_tree.insert('', tk.END, values=(
-                file_info['filename'],
-                new_name
-            ))
+        if self.preview_after_id is not None:
+            self.root.after_cancel(self.preview_after_id)
+            self.preview_after_id = None
+        
+        # 界面参数每次刷新只读取一次，可见行在 get_preview_rows 中按需渲染
+        self.preview_settings = self.current_settings()
+        if self.preview_settings.group_series and self.import_job is not None:
+            # 分组要等全部文件导入后才能确定，导入期间不显示预览
+            self.preview_names = []
+            self.preview_view.set_row_count(0)
+            return
+        if self.preview_settings.group_series:
+            self.preview_names = rename_engine.render_batch_names(self.preview_settings, self.files, self.current_series_groups())
+        else:
+            self.preview_names = None
+        self.preview_view.set_row_count(len(self.files))
     
-    def generate_new_name(self, file_info, index=0):
-        # 获取命名规则
-        custom_rule = self.custom_rule_var.get()
-        rule = custom_rule if custom_rule else self.template_var.get()
-        
-        # 计算集数
-        episode_str = ''
-        if hasattr(self, 'episode_pattern'):
-            # 根据用户选择的数字序列确定集数
-            numbers = file_info.get('numbers', [])
-            for num in numbers:
-                if num == self.episode_pattern:
-                    episode_str = num.zfill(2)  # 确保两位数格式
-                    break
-        
-        # 如果没有找到匹配的数字，使用索引作为集数
-        if not episode_str:
-            episode_number = index + 1
-            episode_str = str(episode_number).zfill(2)
-        
-        # 获取集数前缀
-        episode_prefix = self.episode_prefix_var.get() if hasattr(self, 'episode_prefix_var') else ''
-        
-        # 组合集数前缀和集数
-        if episode_prefix:
-            full_episode = f"{episode_prefix}{episode_str}"
+    def get_preview_rows(self, start, stop):
+        files = self.files[start:stop]
+        if self.preview_names is not None:
+            new_names = self.preview_names[start:stop]
         else:
-            full_episode = episode_str
-        
-        # 替换占位符
-        new_name = rule
-        new_name = new_name.replace('[影视类型]', self.media_type_var.get())
-        new_name = new_name.replace('[标题]', self.title_var.get() if self.title_var.get() else os.path.splitext(file_info['filename'])[0])
-        new_name = new_name.replace('[季数]', self.season_var.get() if self.season_var.get() else '1')
-        new_name = new_name.replace('[集数]', full_episode)
-        
-        # 特殊处理：如果规则包含季和集的格式，确保使用正确的连接符
-        if ('季' in new_name or 'EP' in new_name) and '集' in new_name:
-            # 提取季数
-            season = self.season_var.get() if self.season_var.get() else '01'
-            # 构建标准格式：番剧名 - 季 - 集
-            title = self.title_var.get() if self.title_var.get() else os.path.splitext(file_info['filename'])[0]
-            new_name = f"{title} - {season} - {full_episode}"
-        
-        return new_name + file_info['ext']
+            new_names = render_names(self.preview_settings, files, start)
+        return [(file_info['filename'], new_name) for file_info, new_name in zip(files, new_names)]
+    
+    def current_settings(self):
+        # 从界面控件读取当前的命名参数
+        return RenameSettings(
+            template=self.template_var.get(),
+            custom_rule=self.custom_rule_var.get(),
+            media_type=self.media_type_var.get(),
+            title=self.title_var.get(),
+            season=self.season_var.get(),
+            episode_prefix=self.episode_prefix_var.get(),
+            episode_pattern=getattr(self, 'episode_pattern', None),
+            episode_field=self.episode_field,
+            group_series=self.group_series_var.get(),
+            series_overrides=dict(self.series_overrides),
+            season_episode_join=True
+        )
+    
+    def generate_new_name(self, file_info, index=0):
+        return rename_engine.generate_new_name(self.current_settings(), file_info, index)
     
     def start_rename(self):
+        if self.rename_job is not None:
+            messagebox.showwarning('警告', '正在重命名，请稍候或点击"取消操作"')
+            return
+        
+        if self.import_job is not None:
+            messagebox.showwarning('警告', '正在导入文件，请稍候或先取消导入')
+            return
+        
         if not self.files:
             messagebox.showwarning('警告', '请先添加文件')
             return
         
-        if not self.title_var.get():
+        if not self.title_var.get() and not self.group_series_var.get():
             messagebox.showwarning('警告', '请输入标题')
             return
         
-        success_count = 0
-        error_count = 0
-        
-        for index, file_info in enumerate(self.files):
-            try:
-                old_path = file_info['path']
-                directory = os.path.dirname(old_path)
-                new_name = self.generate_new_name(file_info, index)
-                new_path = os.path.join(directory, new_name)
-                
-                # 检查重名
-                if os.path.exists(new_path) and new_path != old_path:
-                    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-                    base_name, ext = os.path.splitext(new_name)
-                    new_name = f"{base_name}_{timestamp}{ext}"
-                    new_path = os.path.join(directory, new_name)
-                
-                os.rename(old_path, new_path)
-                success_count += 1
-                self.log(f'成功重命名: {file_info["filename"]} -> {new_name}')
-                
-            except Exception as e:
-                error_count += 1
-                self.log(f'重命名失败: {file_info["filename"]} - {str(e)}')
+        settings = self.current_settings()
+        plan = rename_engine.plan_renames(self.files, settings, self.current_series_groups())
+        # 成功重命名的 (原路径, 新路径)，取消时只从列表中去掉这些文件
+        renamed = []
+        self.start_rename_job('重命名', lambda log, progress, cancel_event: rename_engine.apply_renames(
+            plan, log, renamed, journal=self.journal, progress=progress, cancel_event=cancel_event,
+            history=self.history, template=settings.rule))
+        self.rename_job.renamed = renamed
+    
+    def start_rename_job(self, action, work, cancellable=True):
+        # 在后台线程中执行 work，界面定时刷新进度和日志
+        self.rename_job = RenameJob(work, cancellable)
+        self.rename_job.action = action
+        self.rename_job.start()
+        self.rename_progress['value'] = 0
+        self.rename_status_var.set(f'正在{action}...')
+        self.root.after(RENAME_POLL_MS, self.poll_rename, self.rename_job)
+    
+    def poll_rename(self, job):
+        messages = job.drain()
+        if messages:
+            self.log_many(messages)
+        
+        progress = job.progress
+        if progress.total:
+            self.rename_progress['maximum'] = progress.total
+            self.rename_progress['value'] = progress.done
+            status = progress.describe()
+            self.rename_status_var.set(f'正在取消... {status}' if job.cancelled else status)
+        
+        if job.finished:
+            self.finish_rename(job)
+            remaining = getattr(job, 'remaining_batches', None)
+            if remaining:
+                self.check_interrupted_renames(remaining)
+        else:
+            self.root.after(RENAME_POLL_MS, self.poll_rename, job)
+    
+    def finish_rename(self, job):
+        messages = job.drain()
+        if messages:
+            self.log_many(messages)
+        self.rename_job = None
+        self.rename_progress['value'] = 0
+        self.rename_status_var.set('')
+        
+        if job.error is not None:
+            # 重命名日志写入失败等，尚未重命名任何文件
+            self.log(f'{job.action}失败: {str(job.error)}')
+            messagebox.showerror('错误', f'{job.action}失败: {str(job.error)}')
+            return
         
-        self.log(f'操作完成: 成功 {success_count} 个, 失败 {error_count} 个')
-        messagebox.showinfo('完成', f'重命名操作完成\n成功: {success_count} 个\n失败: {error_count} 个')
+        success_count, error_count = job.result
+        summary = f'成功: {success_count} 个\n失败: {error_count} 个'
+        if job.cancelled:
+            skipped = job.progress.total - success_count - error_count
+            messagebox.showinfo('已取消', f'{job.action}已取消\n{summary}\n未执行: {skipped} 个')
+            renamed = getattr(job, 'renamed', None)
+            if renamed is not None:
+                # 未执行的文件留在列表中，可以直接再次重命名
+                self.remove_renamed_files(renamed)
+                return
+        else:
+            messagebox.showinfo('完成', f'{job.action}操作完成\n{summary}')
         
         # 清空列表并更新
         self.clear_list()
     
+    def remove_renamed_files(self, renamed):
+        sources = {source for source, _ in renamed}
+        self.files.remove([i for i, file_info in enumerate(self.files) if file_info['path'] in sources])
+        self.file_view.clear_selection()
+        self.update_file_tree()
+        self.detect_episode_field()
+        self.update_preview()
+    
+    def undo_last_rename(self):
+        if self.rename_job is not None:
+            messagebox.showwarning('警告', '正在重命名，请稍候')
+            return
+        
+        batch = self.journal.last_undoable()
+        if batch is None:
+            messagebox.showinfo('提示', '没有可撤销的重命名')
+            return
+        
+        if not messagebox.askyesno('确认', f'撤销 {batch.time} 的重命名（{batch.file_count} 个文件）？'):
+            return
+        
+        self.log(f'撤销 {batch.time} 的重命名')
+        # 撤销不支持中途取消，否则会留下一半撤销、一半未撤销的批次
+        self.start_rename_job('撤销', lambda log, progress, cancel_event: self.journal.undo(
+            batch, log, progress=progress, history=self.history), cancellable=False)
+    
+    def check_interrupted_renames(self, batches=None):
+        # 上次重命名中途退出时，逐个询问继续完成还是回滚；与普通重命名一样在后台执行，完成后再询问下一个
+        batches = self.journal.interrupted() if batches is None else batches
+        while batches:
+            batch = batches.pop(0)
+            answer = messagebox.askyesnocancel(
+                '发现未完成的重命名',
+                f'{batch.time} 的重命名（{batch.file_count} 个文件）未能完成。\n'
+                '是：继续完成\n否：回滚已完成的部分\n取消：下次再处理'
+            )
+            if answer is None:
+                continue
+            if answer:
+                self.log(f'继续完成 {batch.time} 的重命名')
+                self.start_rename_job('继续完成', lambda log, progress, cancel_event: self.journal.resume(
+                    batch, log, progress=progress, history=self.history), cancellable=False)
+            else:
+                self.log(f'回滚 {batch.time} 的重命名')
+                self.start_rename_job('回滚', lambda log, progress, cancel_event: self.journal.undo(
+                    batch, log, progress=progress, history=self.history), cancellable=False)
+            self.rename_job.remaining_batches = batches
+            return
+    
     def cancel_operation(self):
+        if self.rename_job is not None:
+            # 正在重命名时只停止重命名，已完成的部分保留，可通过"撤销上次重命名"改回
+            if not self.rename_job.cancellable:
+                messagebox.showinfo('提示', f'{self.rename_job.action}不能中途取消，请稍候')
+                return
+            self.rename_job.cancel()
+            self.rename_status_var.set('正在取消...')
+            return
+        
         self.clear_list()
         self.title_var.set('')
         self.season_var.set('')
-        self.episode_var.set('')
+        self.episode_prefix_var.set('')
         self.custom_rule_var.set('')
         self.log('取消了操作')
     
     def save_config(self):
-        config = {
-            'template': self.template_var.get(),
-            'custom_rule': self.custom_rule_var.get(),
-            'media_type': self.media_type_var.get(),
-            'title': self.title_var.get(),
-            'season': self.season_var.get(),
-            'episode': self.episode_var.get()
-        }
+        config = self.current_settings().to_config()
         
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            rename_engine.save_config(self.config_file, config)
             
             self.log('配置已保存')
             messagebox.showinfo('成功', '配置已保存')
@@ -436,8 +623,8 @@ class MovieRenamerApp:
     def load_config(self):
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
+                config = rename_engine.load_config(self.config_file)
+                settings = RenameSettings.from_config(config)
                 
                 if 'template' in config:
                     template = config['template']
@@ -464,49 +651,190 @@ class MovieRenamerApp:
                 if 'season' in config:
                     self.season_var.set(config['season'])
                 
-                if 'episode' in config:
-                    self.episode_var.set(config['episode'])
+                self.episode_prefix_var.set(settings.episode_prefix)
+                if settings.episode_pattern:
+                    self.episode_pattern = settings.episode_pattern
+                if settings.episode_field:
+                    self.saved_episode_field = settings.episode_field
+                self.group_series_var.set(settings.group_series)
+                self.series_overrides = dict(settings.series_overrides)
                 
                 self.log('配置已加载')
             except Exception as e:
                 self.log(f'加载配置失败: {str(e)}')
     
     def view_log(self):
-        if os.path.exists(self.log_file):
-            try:
-                # 打开日志文件
-                webbrowser.open(self.log_file)
-            except Exception as e:
-                messagebox.showerror('错误', f'查看日志失败: {str(e)}')
-        else:
+        self.log_writer.flush()
+        if not os.path.exists(self.log_file):
             messagebox.showinfo('提示', '暂无日志记录')
+            return
+        
+        try:
+            # 日志按页从内存映射中读取，只有可见的行才会放进表格
+            store = LogStore(self.log_file)
+        except Exception as e:
+            messagebox.showerror('错误', f'查看日志失败: {str(e)}')
+            return
+        
+        log_window = tk.Toplevel(self.root)
+        log_window.title('操作日志')
+        log_window.geometry('900x600')
+        
+        toolbar = ttk.Frame(log_window, padding='5')
+        toolbar.pack(fill=tk.X)
+        
+        ttk.Label(toolbar, text='跳转到时间:').pack(side=tk.LEFT)
+        date_var = tk.StringVar()
+        date_entry = ttk.Entry(toolbar, textvariable=date_var, width=20)
+        date_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text='跳转', command=lambda: jump_to_date()).pack(side=tk.LEFT)
+        
+        ttk.Label(toolbar, text='批次:').pack(side=tk.LEFT, padx=(10, 0))
+        batch_combo = ttk.Combobox(toolbar, state='readonly', width=28)
+        batch_combo.pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text='刷新', command=lambda: refresh()).pack(side=tk.LEFT, padx=5)
+        
+        count_var = tk.StringVar()
+        ttk.Label(toolbar, textvariable=count_var).pack(side=tk.RIGHT)
+        
+        view = VirtualTreeview(log_window, columns=('line',), height=25,
+                               get_rows=lambda start, stop: [(line,) for line in store.lines(start, stop)])
+        view.heading('line', text='日志')
+        view.column('line', width=860)
+        view.pack(fill=tk.BOTH, expand=True)
+        
+        batches = []
+        
+        def load():
+            store.refresh()
+            batches[:] = store.batches()[-LOG_VIEW_BATCHES:][::-1]
+            batch_combo['values'] = [f'{format_timestamp(timestamp)}（第 {line + 1} 行）' for timestamp, line in batches]
+            count_var.set(f'共 {store.line_count} 行')
+            view.set_row_count(store.line_count)
+        
+        def jump_to_date(event=None):
+            timestamp = parse_date_input(date_var.get())
+            if timestamp is None:
+                messagebox.showwarning('警告', '请输入日期，如 2026-02-01 或 2026-02-01 16:25', parent=log_window)
+                return
+            view.scroll_to(store.line_at_time(timestamp))
+        
+        def jump_to_batch(event=None):
+            index = batch_combo.current()
+            if index >= 0:
+                view.scroll_to(batches[index][1])
+        
+        def refresh():
+            self.log_writer.flush()
+            load()
+        
+        def close():
+            store.close()
+            log_window.destroy()
+        
+        date_entry.bind('<Return>', jump_to_date)
+        batch_combo.bind('<<ComboboxSelected>>', jump_to_batch)
+        log_window.protocol('WM_DELETE_WINDOW', close)
+        
+        load()
+        # 默认显示最新的日志
+        view.scroll_to(store.line_count)
+    
+    def view_stats(self):
+        # 各环节的次数和耗时分布（见 perf_stats.py），窗口打开期间定时刷新
+        stats_window = tk.Toplevel(self.root)
+        stats_window.title('性能统计')
+        stats_window.geometry('900x400')
+        
+        toolbar = ttk.Frame(stats_window, padding='5')
+        toolbar.pack(fill=tk.X)
+        
+        enabled_var = tk.BooleanVar(value=perf_stats.is_enabled())
+        ttk.Checkbutton(toolbar, text='启用统计', variable=enabled_var,
+                        command=lambda: perf_stats.enable(enabled_var.get())).pack(side=tk.LEFT)
+        ttk.Button(toolbar, text='重置', command=lambda: reset()).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text='导出 JSON', command=lambda: export_json()).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text='分析下一批重命名', command=lambda: request_profile()).pack(side=tk.LEFT, padx=5)
+        
+        status_var = tk.StringVar()
+        ttk.Label(toolbar, textvariable=status_var).pack(side=tk.RIGHT)
+        
+        columns = tuple(f'c{i}' for i in range(len(perf_stats.COLUMN_TITLES)))
+        tree = ttk.Treeview(stats_window, columns=columns, show='headings')
+        for column, title in zip(columns, perf_stats.COLUMN_TITLES):
+            tree.heading(column, text=title)
+            tree.column(column, width=160 if column == 'c0' else 90, anchor=tk.W if column == 'c0' else tk.E)
+        tree.pack(fill=tk.BOTH, expand=True)
+        
+        refresh_id = None
+        
+        def refresh():
+            nonlocal refresh_id
+            tree.delete(*tree.get_children())
+            for row in perf_stats.format_rows():
+                tree.insert('', tk.END, values=row)
+            pending = perf_stats.profile_pending()
+            status_var.set(f'等待分析下一批: {os.path.basename(pending)}' if pending else '')
+            refresh_id = stats_window.after(STATS_REFRESH_MS, refresh)
+        
+        def reset():
+            perf_stats.reset()
+            tree.delete(*tree.get_children())
+        
+        def export_json():
+            path = filedialog.asksaveasfilename(parent=stats_window, title='导出性能统计', defaultextension='.json',
+                                                filetypes=[('JSON 文件', '*.json')])
+            if path:
+                try:
+                    perf_stats.export_json(path)
+                except Exception as e:
+                    messagebox.showerror('错误', f'导出失败: {str(e)}', parent=stats_window)
+        
+        def request_profile():
+            path = filedialog.asksaveasfilename(parent=stats_window, title='保存性能分析结果', defaultextension='.prof',
+                                                filetypes=[('cProfile 结果', '*.prof')])
+            if path:
+                perf_stats.request_profile(path)
+                refresh_after_change()
+        
+        def refresh_after_change():
+            stats_window.after_cancel(refresh_id)
+            refresh()
+        
+        def close():
+            stats_window.after_cancel(refresh_id)
+            stats_window.destroy()
+        
+        stats_window.protocol('WM_DELETE_WINDOW', close)
+        refresh()
     
     def log(self, message):
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        log_entry = f'[{timestamp}] {message}\n'
+        self.log_many([message])
+    
+    def log_many(self, messages):
+        # 写入日志文件（后台线程批量写入），文本框的更新合并到下一帧
+        self.pending_log.append(self.log_writer.write_many(messages))
+        if self.log_flush_id is None:
+            self.log_flush_id = self.root.after(LOG_FLUSH_MS, self.flush_log_view)
+    
+    def flush_log_view(self):
+        self.log_flush_id = None
+        log_entry = ''.join(self.pending_log)
+        self.pending_log = []
         
         # 更新日志文本框
         self.log_text.config(state=tk.NORMAL)
         self.log_text.insert(tk.END, log_entry)
         self.log_text.see(tk.END)
         self.log_text.config(state=tk.DISABLED)
-        
-        # 保存到日志文件
-        try:
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(log_entry)
-        except Exception as e:
-            print(f'保存日志失败: {str(e)}')
+    
+    def on_close(self):
+        # 退出前写完所有日志
+        self.log_writer.close()
+        self.root.destroy()
     
     def format_file_size(self, size_bytes):
-        if size_bytes < 1024:
-            return f"{size_bytes} B"
-        elif size_bytes < 1024 * 1024:
-            return f"{size_bytes / 1024:.2f} KB"
-        elif size_bytes < 1024 * 1024 * 1024:
-            return f"{size_bytes / (1024 * 1024):.2f} MB"
-        else:
-            return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
+        return rename_engine.format_file_size(size_bytes)
     
     # 拖拽事件处理方法暂时注释掉
     # def drag_enter_event(self, event):
@@ -538,102 +866,206 @@ class MovieRenamerApp:
     
     def show_context_menu(self, event):
         # 确保有选中的项目
-        item = self.file_tree.identify_row(event.y)
+        item = self.file_view.identify_row(event.y)
         if item:
             # 选中点击的项目
-            self.file_tree.selection_set(item)
+            self.file_view.select_index(self.file_view.index_of(item))
             # 显示右键菜单
             self.context_menu.post(event.x_root, event.y_root)
     
+    def detect_episode_field(self):
+        # 分析整批文件名，用户未手动选择时自动采用置信度足够高的集数字段
+        self.episode_analysis = analyze_episode_fields(self.files) if self.files else None
+        analysis = self.episode_analysis
+        if analysis is None or analysis.best is None:
+            self.episode_detect_label.config(text='')
+            return
+        if self.saved_episode_field is not None:
+            field, self.saved_episode_field = self.saved_episode_field, None
+            if self.episode_field is None and any(value is not None for value in field_values(self.files, field)):
+                # 上次使用的字段在这批文件中也有：沿用；否则照常自动识别
+                self.select_episode_field(field)
+        if hasattr(self, 'episode_pattern') and self.episode_field is None:
+            # 配置中保存的是数字本身：换成该数字所在的字段，每个文件取同一位置上的数字
+            field = field_for_value(self.files, self.episode_pattern)
+            if field is not None:
+                self.select_episode_field(field)
+        if not self.episode_field_manual and not hasattr(self, 'episode_pattern'):
+            if analysis.is_confident and self.episode_field != analysis.best.key:
+                self.episode_field = analysis.best.key
+                self.sort_files_by_episode()
+                self.update_preview()
+                self.log(f'自动识别集数: {analysis.best.describe()}，置信度 {analysis.confidence:.0%}')
+        if self.episode_field is not None and not self.episode_field_manual:
+            text = f'自动识别，置信度 {analysis.confidence:.0%}（点击更改）'
+        elif self.episode_field is not None or hasattr(self, 'episode_pattern'):
+            text = '已手动选择（点击更改）'
+        else:
+            text = '未能确定集数（点击选择）'
+        self.episode_detect_label.config(text=text)
+    
+    def select_episode_field(self, field):
+        # 用户选择集数字段：取代按数字值匹配的 episode_pattern
+        self.episode_field = field
+        self.episode_field_manual = True
+        if hasattr(self, 'episode_pattern'):
+            delattr(self, 'episode_pattern')
+        self.sort_files_by_episode()
+        self.update_preview()
+        self.episode_detect_label.config(text='已手动选择（点击更改）')
+    
     def prompt_episode_selection(self):
-        # 创建选择窗口
+        # 候选集数字段按得分从高到低列出；字段来自导入时的分词结果，整批只汇总一遍
+        # 列表是虚拟化的，只为可见行创建条目，候选字段再多打开也不会卡
+        fields = self.episode_analysis.fields if self.episode_analysis is not None else []
+        total = self.episode_analysis.total if self.episode_analysis is not None else 0
+
         selection_window = tk.Toplevel(self.root)
         selection_window.title('选择集数对应的数字')
-        selection_window.geometry('600x400')
+        selection_window.geometry('700x400')
         selection_window.transient(self.root)
         selection_window.grab_set()
-        
-        # 创建滚动区域
-        canvas = tk.Canvas(selection_window)
-        scrollbar = ttk.Scrollbar(selection_window, orient=tk.VERTICAL, command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(
-                scrollregion=canvas.bbox("all")
-            )
-        )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        # 显示文件和数字信息
-        ttk.Label(scrollable_frame, text='请选择哪个数字序列代表集数:', font=('Arial', 10, 'bold')).pack(pady=10)
-        
-        # 收集所有文件中的数字序列
-        all_numbers = []
-        for file_info in self.files:
-            numbers = file_info.get('numbers', [])
-            if numbers:
-                all_numbers.extend(numbers)
-        
-        # 去重并排序
-        unique_numbers = sorted(list(set(all_numbers)), key=lambda x: int(x))
-        
-        # 创建选项列表
-        if unique_numbers:
-            ttk.Label(scrollable_frame, text='可用的数字序列:').pack(anchor=tk.W, padx=20)
-            
-            # 创建变量存储选择
-            selected_var = tk.IntVar(value=-1)
-            
-            # 创建选项按钮
-            for i, num in enumerate(unique_numbers):
-                ttk.Radiobutton(
-                    scrollable_frame, 
-                    text=f'数字: {num}', 
-                    variable=selected_var, 
-                    value=i
-                ).pack(anchor=tk.W, padx=40, pady=2)
-            
-            # 创建确认按钮
-            def confirm_selection():
-                selected = selected_var.get()
-                if selected >= 0 and selected < len(unique_numbers):
-                    # 保存选择的数字
-                    self.episode_pattern = unique_numbers[selected]
-                    # 根据选择的数字排序文件
-                    self.sort_files_by_episode()
-                    # 更新预览
-                    self.update_preview()
-                    self.log(f'选择了数字序列 "{unique_numbers[selected]}" 作为集数')
-                    selection_window.destroy()
-                else:
-                    messagebox.showwarning('警告', '请选择一个数字序列')
-            
-            ttk.Button(scrollable_frame, text='确认选择', command=confirm_selection).pack(pady=20)
+
+        if not fields:
+            ttk.Label(selection_window, text='未在文件名中检测到数字序列').pack(pady=20)
+            ttk.Button(selection_window, text='确定', command=selection_window.destroy).pack(pady=10)
+            return
+
+        ttk.Label(selection_window, text='请选择哪个数字序列代表集数:', font=('Arial', 10, 'bold')).pack(pady=10)
+
+        def get_field_rows(start, stop):
+            return [
+                (field.place, '、'.join(field.examples), f'{field.count}/{total}', f'{field.score:.0%}')
+                for field in fields[start:stop]
+            ]
+
+        field_view = VirtualTreeview(selection_window, columns=('place', 'examples', 'files', 'score'),
+                                     get_rows=get_field_rows, height=12)
+        field_view.tree.configure(selectmode='browse')
+        field_view.heading('place', text='位置')
+        field_view.heading('examples', text='示例')
+        field_view.heading('files', text='文件数')
+        field_view.heading('score', text='得分')
+        field_view.column('place', width=200)
+        field_view.column('examples', width=260)
+        field_view.column('files', width=100)
+        field_view.column('score', width=80)
+        field_view.pack(fill=tk.X, padx=10)
+        field_view.set_row_count(len(fields))
+
+        # 默认选中当前使用的字段
+        current = next((i for i, field in enumerate(fields) if field.key == self.episode_field), None)
+        if current is not None:
+            field_view.select_index(current)
+            field_view.see(current)
+
+        def confirm_selection(event=None):
+            selected = field_view.selection_indices()
+            if selected:
+                # 保存选择的字段并据此排序文件、更新预览
+                field = fields[selected[0]]
+                self.select_episode_field(field.key)
+                self.log(f'选择了{field.describe()}作为集数')
+                selection_window.destroy()
+            else:
+                messagebox.showwarning('警告', '请选择一个数字序列', parent=selection_window)
+
+        field_view.tree.bind('<Double-1>', confirm_selection)
+        buttons = ttk.Frame(selection_window)
+        buttons.pack(pady=10)
+        ttk.Button(buttons, text='确认选择', command=confirm_selection).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text='取消', command=selection_window.destroy).pack(side=tk.LEFT, padx=5)
+    
+    def current_series_groups(self):
+        # 按剧集分组时，当前文件列表分好的组；文件或顺序变化、集数字段改变后重新分组
+        if not self.group_series_var.get():
+            return None
+        if self.series_cache is None or self.series_cache[:2] != (self.files.version, self.episode_field):
+            self.series_cache = (self.files.version, self.episode_field, group_by_series(self.files, self.episode_field))
+        groups = self.series_cache[2]
+        self.series_label.config(text=f'{len(groups)} 部剧集' if groups else '')
+        return groups
+    
+    def arrange_series(self):
+        # 按剧集分组排列文件列表：各组依次排列，组内按集数排序
+        groups = self.current_series_groups()
+        if groups:
+            rename_engine.sort_files_by_series(self.files, groups)
+            # 排序后组内顺序已同步更新，分组仍然有效
+            self.series_cache = (self.files.version, self.episode_field, groups)
+            self.update_file_tree()
+    
+    def on_group_series_toggled(self):
+        if self.group_series_var.get():
+            self.arrange_series()
         else:
-            ttk.Label(scrollable_frame, text='未在文件名中检测到数字序列').pack(pady=20)
-            ttk.Button(scrollable_frame, text='确定', command=selection_window.destroy).pack(pady=10)
+            self.series_label.config(text='')
+            self.sort_files_by_episode()
+        self.update_preview()
     
-    def sort_files_by_episode(self):
-        # 根据用户选择的数字排序文件
-        if not hasattr(self, 'episode_pattern'):
+    def edit_series_groups(self):
+        groups = self.current_series_groups()
+        if not groups:
+            messagebox.showinfo('提示', '请先勾选"按剧集分组"并添加文件')
             return
         
-        def get_episode_number(file_info):
-            numbers = file_info.get('numbers', [])
-            for num in numbers:
-                if num == self.episode_pattern:
-                    return int(num)
-            return 0
-        
-        # 排序文件列表
-        self.files.sort(key=get_episode_number)
+        groups_window = tk.Toplevel(self.root)
+        groups_window.title('编辑分组')
+        groups_window.geometry('700x400')
+        groups_window.transient(self.root)
+        
+        ttk.Label(groups_window, text='双击一行修改该剧集的标题和季数', padding='5').pack(anchor=tk.W)
+        tree = ttk.Treeview(groups_window, columns=('title', 'season', 'count', 'episode'), show='headings')
+        tree.heading('title', text='标题')
+        tree.heading('season', text='季数')
+        tree.heading('count', text='文件数')
+        tree.heading('episode', text='集数')
+        tree.column('title', width=360)
+        tree.column('season', width=60)
+        tree.column('count', width=80, anchor=tk.E)
+        tree.column('episode', width=120)
+        tree.pack(fill=tk.BOTH, expand=True)
+        
+        settings = self.current_settings()
+        
+        def row(group):
+            group_settings = group.settings_for(settings)
+            episode = '按集数字段' if group.episode_field is not None else '按序号'
+            return (group_settings.title, group_settings.season or '1', len(group.files), episode)
+        
+        for i, group in enumerate(groups):
+            tree.insert('', tk.END, iid=str(i), values=row(group))
+        
+        def edit(event=None):
+            selection = tree.selection()
+            if not selection:
+                return
+            group = groups[int(selection[0])]
+            current = row(group)
+            title = simpledialog.askstring('编辑分组', '标题:', initialvalue=current[0], parent=groups_window)
+            if title is None:
+                return
+            season = simpledialog.askstring('编辑分组', '季数:', initialvalue=current[1], parent=groups_window)
+            if season is None:
+                return
+            self.series_overrides[group.key] = {'title': title.strip(), 'season': season.strip()}
+            settings.series_overrides = dict(self.series_overrides)
+            tree.item(selection[0], values=row(group))
+            self.update_preview()
+        
+        tree.bind('<Double-1>', edit)
+    
+    def sort_files_by_episode(self):
+        # 根据用户选择的字段或数字排序文件；按剧集分组时各组依次排列
+        if self.group_series_var.get():
+            self.arrange_series()
+            return
+        if self.episode_field is not None:
+            rename_engine.sort_files_by_field(self.files, self.episode_field)
+        elif hasattr(self, 'episode_pattern'):
+            rename_engine.sort_files_by_episode(self.files, self.episode_pattern)
+        else:
+            return
         # 更新文件树
         self.update_file_tree()
     
@@ -646,9 +1078,10 @@ class MovieRenamerApp:
         # 获取第一个文件的文件名
         first_file = self.files[0]
         filename = first_file['filename']
-        numbers = first_file.get('numbers', [])
+        # 可作为集数的数字及其位置（CRC、分辨率等已排除）
+        tokens = tokenize(filename)
         
-        if not numbers:
+        if not tokens:
             self.episode_match_label.config(text='')
             return
         
@@ -657,18 +1090,13 @@ class MovieRenamerApp:
         display_text = filename
         
         # 存储数字位置信息
-        self.number_positions = []
-        pos = 0
-        for num in numbers:
-            start = display_text.find(num, pos)
-            if start >= 0:
-                self.number_positions.append((start, start + len(num), num))
-                pos = start + len(num)
+        self.number_positions = [(start, end, num, key) for key, num, start, end in tokens]
         
         # 更新标签文本
         self.episode_match_label.config(text=display_text)
-        # 设置标签样式，使其看起来可点击
-        self.episode_match_label.config(foreground='blue', cursor='hand2')
+        # 设置标签样式，使其看起来可点击；已选字段在第一个文件中存在时显示为选中状态
+        selected = any(key == self.episode_field for _, _, _, key in self.number_positions)
+        self.episode_match_label.config(foreground='green' if selected else 'blue', cursor='hand2')
     
     def on_episode_label_click(self, event):
         # 获取点击位置
@@ -698,39 +1126,32 @@ class MovieRenamerApp:
         click_index = max(0, min(click_index, text_length - 1))
         
         # 检查点击位置是否在数字范围内
-        for start, end, num in self.number_positions:
+        for start, end, num, key in self.number_positions:
             if start <= click_index < end:
-                # 选择该数字作为集数模式
-                self.episode_pattern = num
-                # 根据选择的数字排序文件
-                self.sort_files_by_episode()
-                # 更新预览
-                self.update_preview()
+                # 选择该位置的数字字段作为集数：其他文件取同一位置上的数字，而不是数值相同的数字
+                self.select_episode_field(key)
                 # 更新标签样式，显示选中状态
                 self.episode_match_label.config(foreground='green')
-                self.log(f'选择了数字 "{num}" 作为集数模式')
+                self.log(f'选择了数字 "{num}" 所在的位置作为集数')
                 break
     
     def delete_selected_file(self):
         # 获取选中的项目
-        selected_items = self.file_tree.selection()
-        if not selected_items:
+        selected_indices = self.file_view.selection_indices()
+        if not selected_indices:
             return
         
         # 删除选中的文件
-        for item in selected_items:
-            # 获取项目的索引
-            index = self.file_tree.index(item)
-            # 从文件列表中删除
-            if 0 <= index < len(self.files):
-                deleted_file = self.files[index]['filename']
-                del self.files[index]
-                self.log(f'从列表中删除文件: {deleted_file}')
+        valid_indices = [index for index in selected_indices if 0 <= index < len(self.files)]
+        for deleted in self.files.remove(valid_indices):
+            self.log(f'从列表中删除文件: {deleted["filename"]}')
+        self.file_view.clear_selection()
         
         # 更新文件树和预览
         self.update_file_tree()
         self.update_preview()
-        # 更新集数匹配显示
+        # 重新识别集数字段并更新集数匹配显示
+        self.detect_episode_field()
         self.update_episode_match_display()
 
 if __name__ == '__main__':
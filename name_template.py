@@ -0,0 +1,186 @@
+import os
+import re
+from functools import lru_cache
+
+from episode_detector import field_values
+from release_lexer import lex_release_cached
+import perf_stats
+
+# 命名模板编译器：模板只解析一次，整批文件共用同一个渲染程序
+#
+# 每个占位符对应一个绑定函数 binder(settings)，在每批渲染开始时调用一次：
+#   - 返回字符串：该占位符在整批中取值不变，直接折叠进字面量
+#   - 返回函数 column(files, start_index)：一次性算出整批文件的取值列表
+# 新增占位符只需调用 register_placeholder，无需再追加 replace 链
+
+_PLACEHOLDER_RE = re.compile(r'\[([^\[\]]+)\]')
+
+_BINDERS = {}
+
+
+def register_placeholder(name, binder):
+    _BINDERS[name] = binder
+    # 已编译的模板可能把该名称当作普通文本，注册后需重新编译
+    compile_template.cache_clear()
+
+
+def _bind_media_type(settings):
+    return settings.media_type
+
+
+def _bind_title(settings):
+    if settings.title:
+        return settings.title
+
+    def title_column(files, start_index):
+        splitext = os.path.splitext
+        return [splitext(file_info['filename'])[0] for file_info in files]
+    return title_column
+
+
+def _bind_season(settings):
+    return settings.season if settings.season else '1'
+
+
+def _bind_episode(settings):
+    prefix = settings.episode_prefix
+    if settings.episode:
+        return f"{prefix}{settings.episode}"
+
+    field = settings.episode_field
+    if field:
+        # 每个文件取集数字段上的数字，没有该字段时使用索引
+        def field_column(files, start_index):
+            return [
+                f"{prefix}{value.zfill(2)}" if value is not None else f"{prefix}{index + 1:02d}"
+                for index, value in enumerate(field_values(files, field), start_index)
+            ]
+        return field_column
+
+    pattern = settings.episode_pattern
+    if pattern:
+        # 根据用户选择的数字序列确定集数，未找到时使用索引
+        matched = f"{prefix}{pattern.zfill(2)}"
+
+        def episode_column(files, start_index):
+            return [
+                matched if pattern in file_info.get('numbers', ()) else f"{prefix}{index + 1:02d}"
+                for index, file_info in enumerate(files, start_index)
+            ]
+        return episode_column
+
+    def index_column(files, start_index):
+        return [f"{prefix}{index + 1:02d}" for index in range(start_index, start_index + len(files))]
+    return index_column
+
+
+def _bind_release(attr, prefix=''):
+    # 发布名中的字段（字幕组、分辨率等），取自各文件的原文件名，没有时为空
+    def binder(settings):
+        def release_column(files, start_index):
+            values = []
+            append = values.append
+            for file_info in files:
+                value = getattr(lex_release_cached(file_info['filename']), attr)
+                append(prefix + value if value else '')
+            return values
+        return release_column
+    return binder
+
+
+def _value_at(value, files, start_index, position):
+    if callable(value):
+        return value(files[position:position + 1], start_index + position)[0]
+    return value
+
+
+class CompiledTemplate:
+    def __init__(self, rule):
+        self.rule = rule
+        # 解析结果：字面量为 str，占位符为 (名称,)
+        self.tokens = []
+        pos = 0
+        for match in _PLACEHOLDER_RE.finditer(rule):
+            if match.group(1) not in _BINDERS:
+                continue
+            if match.start() > pos:
+                self.tokens.append(rule[pos:match.start()])
+            self.tokens.append((match.group(1),))
+            pos = match.end()
+        if pos < len(rule):
+            self.tokens.append(rule[pos:])
+
+    @property
+    def placeholders(self):
+        return [token[0] for token in self.tokens if isinstance(token, tuple)]
+
+    def bind(self, settings):
+        # 把常量占位符折叠进字面量，返回 (片段列表, 逐文件取值函数列表)
+        # 片段列表中字面量与取值列交替出现：lit0, col0, lit1, col1, ..., litN
+        literals = ['']
+        columns = []
+        for token in self.tokens:
+            if isinstance(token, tuple):
+                value = _BINDERS[token[0]](settings)
+                if callable(value):
+                    columns.append(value)
+                    literals.append('')
+                    continue
+                token = value
+            literals[-1] += token
+        return literals, columns
+
+    def render_batch(self, settings, files, start_index=0):
+        literals, columns = self.bind(settings)
+        values = [column(files, start_index) for column in columns]
+        exts = [file_info['ext'] for file_info in files]
+
+        if not columns:
+            names = [literals[0] + ext for ext in exts]
+        elif len(columns) == 1:
+            head, tail = literals
+            names = [head + value + tail + ext for value, ext in zip(values[0], exts)]
+        else:
+            fmt = '{}'.join(literal.replace('{', '{{').replace('}', '}}') for literal in literals) + '{}'
+            names = [fmt.format(*row) for row in zip(*values, exts)]
+
+        # 特殊处理（仅 Tk 前端）：如果规则包含季和集的格式，确保使用正确的连接符
+        title = None
+        if not settings.season_episode_join or '集' not in '\n'.join(names):
+            return names
+        for position, new_name in enumerate(names):
+            if '集' in new_name and ('季' in new_name or 'EP' in new_name):
+                if title is None:
+                    title = _BINDERS['标题'](settings)
+                    episode = _BINDERS['集数'](settings)
+                    season = settings.season if settings.season else '01'
+                file_title = _value_at(title, files, start_index, position)
+                full_episode = _value_at(episode, files, start_index, position)
+                # 构建标准格式：番剧名 - 季 - 集
+                names[position] = f"{file_title} - {season} - {full_episode}{exts[position]}"
+        return names
+
+
+@lru_cache(maxsize=64)
+def compile_template(rule):
+    return CompiledTemplate(rule)
+
+
+def render_names(settings, files, start_index=0):
+    # 批量渲染：模板编译一次、参数读取一次
+    with perf_stats.span('render', len(files)):
+        return compile_template(settings.rule).render_batch(settings, files, start_index)
+
+
+register_placeholder('影视类型', _bind_media_type)
+register_placeholder('标题', _bind_title)
+register_placeholder('季数', _bind_season)
+register_placeholder('集数', _bind_episode)
+register_placeholder('字幕组', _bind_release('group'))
+register_placeholder('原标题', _bind_release('title'))
+register_placeholder('版本', _bind_release('version', 'v'))
+register_placeholder('分辨率', _bind_release('resolution'))
+register_placeholder('编码', _bind_release('codec'))
+register_placeholder('位深', _bind_release('bit_depth'))
+register_placeholder('片源', _bind_release('source'))
+register_placeholder('CRC', _bind_release('crc'))
@@ -0,0 +1,214 @@
+import sys
+import json
+import time
+import threading
+import cProfile
+from datetime import datetime
+
+# 性能统计：在扫描、stat、数字提取、排序、预览渲染、重命名 I/O、日志写入等热点路径上记录次数和耗时分布
+#   - 默认关闭。关闭时 span() 返回同一个空对象，record() 直接返回，每次调用只多一次函数调用
+#   - 统计点放在批次粒度上（一个目录、一块 stat、一次排序），只有重命名 I/O 按文件记录
+#   - 耗时按 2 的幂（微秒）分桶，得到直方图和近似的 P50/P95
+#   - 可导出为 JSON；request_profile 可对下一批重命名做一次 cProfile 分析
+# 用户反馈"卡住"时：打开统计、重现一次操作、导出 JSON 即可看出时间花在哪里
+
+# 统计项名称及说明（界面和命令行显示用）
+SPAN_LABELS = {
+    'scan': '列目录',
+    'stat': '读取文件大小',
+    'extract': '分词提取数字',
+    'merge': '合并到文件列表',
+    'detect': '识别集数字段',
+    'group': '按剧集分组',
+    'sort': '排序',
+    'render': '渲染新文件名',
+    'rename_io': '重命名 I/O',
+    'log_write': '写入日志'
+}
+# 统计表的列（与 format_rows 对应）
+COLUMN_TITLES = ('统计项', '次数', '对象数', '总耗时', '平均', 'P50', 'P95', '最大')
+
+# 直方图桶数：第 k 个桶为 [2^(k-1), 2^k) 微秒，最后一个桶包含所有更长的耗时
+HISTOGRAM_BUCKETS = 40
+
+_enabled = False
+_lock = threading.Lock()
+_stats = {}
+# 下一批重命名的 cProfile 输出路径
+_profile_path = None
+
+
+class SpanStat:
+    __slots__ = ('name', 'count', 'items', 'total', 'maximum', 'buckets')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        # 各次调用处理的对象数之和（文件数、目录项数、日志行数）
+        self.items = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, seconds, items):
+        self.count += 1
+        self.items += items
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        # 按直方图估算：返回累计次数达到 fraction 的桶的上界（秒），不超过最大值
+        target = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min((1 << bucket) / 1e6, self.maximum)
+        return self.maximum
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'label': SPAN_LABELS.get(self.name, self.name),
+            'count': self.count,
+            'items': self.items,
+            'total_ms': round(self.total * 1000, 3),
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'per_item_us': round(self.total / self.items * 1e6, 3) if self.items else 0.0,
+            'p50_ms': round(self.percentile(0.5) * 1000, 3),
+            'p95_ms': round(self.percentile(0.95) * 1000, 3),
+            'max_ms': round(self.maximum * 1000, 3),
+            # [(桶上界微秒, 次数), ...]，只列出非空的桶
+            'histogram': [[1 << bucket, count] for bucket, count in enumerate(self.buckets) if count]
+        }
+
+
+class _Span:
+    __slots__ = ('name', 'items', 'start')
+
+    def __init__(self, name, items):
+        self.name = name
+        self.items = items
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.start, self.items)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ('items',)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name, items=1):
+    # with span('sort', len(files)): ...   处理对象数在进入前未知时，可在块内设置 span.items
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, items)
+
+
+def record(name, seconds, items=1):
+    # 记录一次已计时的操作（如重命名执行器中已测得的每步耗时）
+    if not _enabled:
+        return
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = SpanStat(name)
+        stat.add(seconds, items)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def snapshot():
+    # 按总耗时从高到低返回各统计项（字典列表）
+    with _lock:
+        entries = [stat.to_dict() for stat in _stats.values()]
+    entries.sort(key=lambda entry: entry['total_ms'], reverse=True)
+    return entries
+
+
+def format_rows(entries=None):
+    # 界面表格和命令行输出共用：[(说明, 次数, 对象数, 总耗时, 平均, P50, P95, 最大), ...]
+    rows = []
+    for entry in snapshot() if entries is None else entries:
+        rows.append((
+            entry['label'], str(entry['count']), str(entry['items']),
+            f"{entry['total_ms']:.1f} ms", f"{entry['mean_ms']:.3f} ms",
+            f"{entry['p50_ms']:.3f} ms", f"{entry['p95_ms']:.3f} ms", f"{entry['max_ms']:.3f} ms"
+        ))
+    return rows
+
+
+def export_json(path):
+    data = {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'enabled': _enabled,
+        'spans': snapshot()
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def request_profile(path):
+    # 对下一批重命名（含撤销和恢复）做 cProfile 分析，结束后写入 path（可用 pstats 或 snakeviz 查看）
+    global _profile_path
+    _profile_path = path
+
+
+def profile_pending():
+    return _profile_path
+
+
+class profile_batch:
+    # 在 execute_steps 中包住一批重命名；没有待分析的请求时什么也不做
+    # 只分析执行这批重命名的线程，执行器线程池中的 os.rename 见 rename_io 统计
+    def __enter__(self):
+        global _profile_path
+        self.path, _profile_path = _profile_path, None
+        self.profiler = None
+        if self.path:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # 已有其他分析器在运行
+                return self
+            self.profiler = profiler
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiler is not None:
+            self.profiler.disable()
+            try:
+                self.profiler.dump_stats(self.path)
+            except OSError as e:
+                # 分析结果写不出来不影响这批重命名的结果
+                print(f'保存性能分析失败: {str(e)}', file=sys.stderr)
+        return False
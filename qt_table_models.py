@@ -0,0 +1,192 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QAbstractListModel, QModelIndex, pyqtSignal
+
+from rename_engine import sort_files
+from name_template import render_names
+
+# Qt 模型/视图后端：表格只在绘制可见单元格时才向模型取数据，不再为每个单元格创建 QTableWidgetItem
+
+# 预览文件名按块渲染并缓存，每块的行数
+PREVIEW_CHUNK_SIZE = 256
+# 日志查看时按块读取的行数，以及最多缓存的块数
+LOG_CHUNK_SIZE = 256
+LOG_CACHED_CHUNKS = 64
+
+
+class FileTableModel(QAbstractTableModel):
+    HEADERS = ['原始文件名', '文件类型', '大小', '路径']
+    COLUMNS = ['filename', 'ext', 'size', 'path']
+
+    # 点击列标题重新排序后发出，通知预览刷新
+    files_sorted = pyqtSignal()
+
+    def __init__(self, files=None, parent=None):
+        super().__init__(parent)
+        self.files = files if files is not None else []
+
+    def set_files(self, files):
+        self.beginResetModel()
+        self.files = files
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.files)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        file_info = self.files[index.row()]
+        column = self.COLUMNS[index.column()]
+        if column == 'size':
+            return file_info['size_str']
+        return file_info[column]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # 直接对文件列表排序，重命名时的顺序与界面显示一致
+        if not self.files:
+            return
+        self.layoutAboutToBeChanged.emit()
+        sort_files(self.files, self.COLUMNS[column], order == Qt.DescendingOrder)
+        self.layoutChanged.emit()
+        self.files_sorted.emit()
+
+
+class PreviewTableModel(QAbstractTableModel):
+    HEADERS = ['原始文件名', '重命名后']
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.files = []
+        self.settings = None
+        self.name_chunks = {}
+        self.names = None
+
+    def set_batch(self, files, settings, names_only=True, names=None):
+        # 命名参数整批读取一次；文件列表未变时只通知"重命名后"一列发生变化
+        # names 为整批预先渲染好的新文件名（按剧集分组时各组分别编号），否则可见行按块渲染
+        self.settings = settings
+        self.name_chunks = {}
+        self.names = names
+        if not names_only or files is not self.files or len(files) != self.rowCount():
+            self.beginResetModel()
+            self.files = files
+            self.endResetModel()
+        elif files:
+            self.dataChanged.emit(self.index(0, 1), self.index(len(files) - 1, 1), [Qt.DisplayRole])
+
+    def new_name(self, row):
+        if self.names is not None:
+            return self.names[row]
+        chunk = row // PREVIEW_CHUNK_SIZE
+        names = self.name_chunks.get(chunk)
+        if names is None:
+            start = chunk * PREVIEW_CHUNK_SIZE
+            names = render_names(self.settings, self.files[start:start + PREVIEW_CHUNK_SIZE], start)
+            self.name_chunks[chunk] = names
+        return names[row % PREVIEW_CHUNK_SIZE]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.files)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        if index.column() == 0:
+            return self.files[index.row()]['filename']
+        return self.new_name(index.row())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+
+class LogLineModel(QAbstractTableModel):
+    # 日志查看：行数据按块从 LogStore（内存映射）读取并缓存，只有可见的行才会被读取
+    HEADERS = ['日志']
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.line_chunks = {}
+
+    def reload(self):
+        self.beginResetModel()
+        self.store.refresh()
+        self.line_chunks = {}
+        self.endResetModel()
+
+    def line(self, row):
+        chunk = row // LOG_CHUNK_SIZE
+        lines = self.line_chunks.get(chunk)
+        if lines is None:
+            if len(self.line_chunks) >= LOG_CACHED_CHUNKS:
+                self.line_chunks.clear()
+            start = chunk * LOG_CHUNK_SIZE
+            lines = self.store.lines(start, start + LOG_CHUNK_SIZE)
+            self.line_chunks[chunk] = lines
+        index = row % LOG_CHUNK_SIZE
+        return lines[index] if index < len(lines) else ''
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.store.line_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return self.line(index.row())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+
+class EpisodeFieldModel(QAbstractListModel):
+    # 集数字段下拉框的候选项：第 0 行为"不使用"，其余为按得分排列的字段，说明文字在绘制可见行时才生成
+    NONE_TEXT = '不使用（按集数输入框）'
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.fields = []
+
+    def set_fields(self, fields):
+        self.beginResetModel()
+        self.fields = fields
+        self.endResetModel()
+
+    def row_of(self, key):
+        # 字段所在的行，没有时为 0（不使用）
+        for row, field in enumerate(self.fields, 1):
+            if field.key == key:
+                return row
+        return 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.fields) + 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            if row == 0:
+                return self.NONE_TEXT
+            field = self.fields[row - 1]
+            return f'{field.describe()}  得分 {field.score:.0%}'
+        if role == Qt.UserRole:
+            return self.fields[row - 1].key if row else None
+        return None
@@ -0,0 +1,93 @@
+import time
+import threading
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from file_scanner import iter_scan_paths
+from import_worker import coalesce_chunks
+from rename_worker import RenameProgress, PROGRESS_INTERVAL
+
+# Qt 后台线程：结果通过信号发回界面线程（跨线程信号自动排队执行）
+
+
+class ImportThread(QThread):
+    # 一批新扫描到的文件记录
+    chunk_ready = pyqtSignal(list)
+    # 扫描结束：(是否被取消, 错误信息，无错误时为空字符串)
+    import_finished = pyqtSignal(bool, str)
+
+    def __init__(self, paths, include_all_files=True, cache_file=None, parent=None):
+        super().__init__(parent)
+        self.paths = list(paths)
+        self.include_all_files = include_all_files
+        self.cache_file = cache_file
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        error = ''
+        try:
+            chunks = iter_scan_paths(self.paths, self.include_all_files,
+                                     cancel_event=self.cancel_event, cache_file=self.cache_file)
+            for chunk in coalesce_chunks(chunks):
+                self.chunk_ready.emit(chunk)
+                if self.cancel_event.is_set():
+                    break
+        except Exception as e:
+            error = str(e)
+        self.import_finished.emit(self.cancel_event.is_set(), error)
+
+
+class RenameThread(QThread):
+    # 一批日志消息，按 PROGRESS_INTERVAL 合并后发出
+    messages_ready = pyqtSignal(list)
+    # 进度：(已处理文件数, 文件总数, 进度说明)
+    progress_changed = pyqtSignal(int, int, str)
+    # 结束：(成功数, 失败数, 是否被取消, 错误信息，无错误时为空字符串)
+    rename_finished = pyqtSignal(int, int, bool, str)
+
+    def __init__(self, work, cancellable=True, parent=None):
+        # work(log, progress, cancel_event) 执行实际的重命名并返回 (成功数, 失败数)
+        super().__init__(parent)
+        self.work = work
+        self.cancellable = cancellable
+        self.cancel_event = threading.Event()
+        self.progress = RenameProgress()
+        self.pending = []
+        self.last_emit = 0.0
+
+    def cancel(self):
+        if self.cancellable:
+            self.cancel_event.set()
+
+    def log(self, message):
+        self.pending.append(message)
+        self.emit_if_due()
+
+    def update_progress(self, done, total):
+        self.progress.update(done, total)
+        self.emit_if_due()
+
+    def emit_if_due(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_emit < PROGRESS_INTERVAL:
+            return
+        self.last_emit = now
+        if self.pending:
+            self.messages_ready.emit(self.pending)
+            self.pending = []
+        if self.progress.total:
+            self.progress_changed.emit(self.progress.done, self.progress.total, self.progress.describe())
+
+    def run(self):
+        self.progress.started = time.monotonic()
+        success_count = error_count = 0
+        error = ''
+        try:
+            success_count, error_count = self.work(self.log, self.update_progress, self.cancel_event)
+        except Exception as e:
+            error = str(e)
+        self.emit_if_due(force=True)
+        self.rename_finished.emit(success_count, error_count, self.cancel_event.is_set(), error)
@@ -0,0 +1,215 @@
+import os
+import re
+import sys
+from functools import lru_cache
+
+# 发布名词法分析：一次扫描文件名，拆出字幕组、标题、季数、集数、版本、分辨率、编码、片源和 CRC
+#   [Group] Title - 03v2 [WebRip 1080p HEVC-10bit AAC ASSx2][ABCD1234].mkv
+#   -> 字幕组 Group，标题 Title，集数 03，版本 2，分辨率 1080p，编码 HEVC，位深 10bit，片源 WebRip，CRC ABCD1234
+#   【喵萌奶茶屋】★04月新番★[间谍过家家][01][1080p][简日双语].mp4
+#   -> 字幕组 喵萌奶茶屋，标题 间谍过家家（括号外只有装饰时取括号中的标题），集数 01，分辨率 1080p
+# 所有词法规则合并在一个预编译的正则中，按位置依次产出记号，每个文件名只扫描一遍；
+# 括号的开闭也是记号，据此区分字幕组、括号中的集数（[03]）和括号中的标签
+# 这些字段可作为命名模板中的占位符使用（见 name_template.py）
+
+_TOKEN_RE = re.compile(
+    r'(?P<open>[\[【（(])'
+    r'|(?P<close>[\]】）)])'
+    # " - 03"、" - 03v2"
+    r'|(?P<dash>\s-\s*(?P<dash_episode>\d{1,4}(?:\.\d)?)(?:v(?P<dash_version>\d))?(?![0-9a-z]))'
+    # 第2季、第03话
+    r'|(?P<cn>第\s*(?:(?P<cn_season>\d{1,2}|[一二三四五六七八九十]{1,3})\s*季|(?P<cn_episode>\d{1,4})\s*[话話集]))'
+    # 其余记号都从单词开头开始：公共的后顾断言只写一次，单词中间的位置一次判断即可跳过
+    r'|(?<![0-9a-z])(?:'
+    # S01E03
+    r'(?P<se>S(?P<se_season>\d{1,2})E(?P<se_episode>\d{1,4})(?:v(?P<se_version>\d))?(?![0-9a-z]))'
+    # S2、Season 2、2nd Season
+    r'|(?P<season>S(?P<season_s>\d{1,2})(?![0-9a-z])|Season\s*(?P<season_n>\d{1,2})'
+    r'|(?P<season_o>\d{1,2})(?:st|nd|rd|th)\s+Season)'
+    # EP03、E03、Episode 3
+    r'|(?P<mark>(?:EP?|Episode\s*)\.?\s*(?P<mark_episode>\d{1,4})(?:v(?P<mark_version>\d))?(?![0-9a-z]))'
+    r'|(?P<resolution>(?:\d{3,4}[pi]|\d{3,4}[x×]\d{3,4}|[48]K)(?![0-9a-z]))'
+    r'|(?P<codec>(?:HEVC|AVC|AV1|VP9|XviD|[xh]\.?26[45])(?![0-9a-z]))'
+    r'|(?P<depth>\d{1,2}-?bits?(?![0-9a-z]))'
+    r'|(?P<source>(?:WEB-?Rip|WEB-?DL|WEB|BD-?Rip|Blu-?Ray|BDMV|BD|DVD-?Rip|DVD|HDTV|TV-?Rip)(?![0-9a-z]))'
+    r'|(?P<crc>[0-9a-f]{8}(?![0-9a-z]))'
+    r'|(?P<number>(?<!\.)(?P<number_value>\d{1,4})(?:v(?P<number_version>\d))?(?![0-9a-z.]))'
+    r')',
+    re.IGNORECASE
+)
+# 括号中只有集数：[03]、[03v2]、【03】
+_BRACKET_EPISODE_RE = re.compile(r'\s*(\d{1,4})(?:v(\d))?\s*$', re.IGNORECASE)
+# 记号类型在标题之后出现：标题到此结束
+_TITLE_ENDS = frozenset(('se', 'season', 'dash', 'cn', 'mark', 'resolution', 'codec', 'depth', 'source'))
+# 括号中出现这些记号时，该括号是标签而不是标题
+_TAG_KINDS = frozenset(('resolution', 'codec', 'depth', 'source', 'crc'))
+# 容易与标题中的单词混淆的片源，只认括号中的
+_BRACKET_ONLY_SOURCES = frozenset(('web', 'bd', 'dvd'))
+# 括号外的装饰文字：★04月新番★、~、「」等，不含其他文字
+_DECORATION_RE = re.compile(r'(?:\d{1,2}月新番|\d{1,2}月|新番|[\W_])*')
+
+_CHINESE_DIGITS = '零一二三四五六七八九'
+
+# 同一批文件的预览会反复渲染可见行，最近的分析结果直接复用
+LEX_CACHE_SIZE = 4096
+
+
+class ReleaseInfo:
+    __slots__ = ('group', 'title', 'season', 'episode', 'version', 'resolution', 'codec', 'bit_depth', 'source', 'crc')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={value!r}' for name, value in self.as_dict().items() if value is not None)
+        return f'ReleaseInfo({fields})'
+
+
+def _clean_title(text):
+    if ' ' not in text.strip():
+        # Title.Name.S01E02 这类用点或下划线分隔的名称
+        text = text.replace('.', ' ')
+    return ' '.join(text.replace('_', ' ').split()).strip(' -')
+
+
+def _season_number(text):
+    if text.isdigit():
+        return str(int(text))
+    # 中文数字：二、十、十二、二十；无法识别时视为未标明季数
+    tens, _, units = text.rpartition('十')
+    try:
+        if '十' not in text:
+            return str(_CHINESE_DIGITS.index(units))
+        return str((_CHINESE_DIGITS.index(tens) if tens else 1) * 10 + (_CHINESE_DIGITS.index(units) if units else 0))
+    except ValueError:
+        return None
+
+
+def _is_year(value):
+    return len(value) == 4 and value[:2] in ('19', '20')
+
+
+def lex_release(filename):
+    # 分析一个文件名（可带扩展名），返回 ReleaseInfo；没有的字段为 None
+    stem = os.path.splitext(filename)[0]
+    info = ReleaseInfo()
+    depth = 0
+    bracket_start = 0
+    # 当前括号中是否出现过标签记号
+    bracket_tagged = False
+    # 标题的起止位置；title_end 为 None 表示尚未遇到标题之后的记号
+    title_start = 0
+    title_end = None
+    # 括号中的候选标题（整个标题都在括号里时使用）
+    bracket_title = None
+    # 括号外最后一个单独的数字（没有集数标记时可能就是集数）
+    trailing = None
+
+    for match in _TOKEN_RE.finditer(stem):
+        kind = match.lastgroup
+        if kind == 'source' and not depth and match.group().lower() in _BRACKET_ONLY_SOURCES:
+            continue
+        if kind == 'open':
+            depth += 1
+            if depth == 1:
+                bracket_start = match.end()
+                bracket_tagged = False
+            continue
+        if kind == 'close':
+            if depth == 1:
+                content = stem[bracket_start:match.start()]
+                if info.group is None and not stem[:bracket_start - 1].strip():
+                    # 开头的括号：字幕组
+                    info.group = content.strip()
+                    title_start = match.end()
+                elif not bracket_tagged:
+                    episode = _BRACKET_EPISODE_RE.match(content)
+                    if episode is not None:
+                        if info.episode is None:
+                            info.episode, info.version = episode.group(1), episode.group(2)
+                    elif bracket_title is None and content.strip():
+                        bracket_title = content
+                if title_end is None:
+                    if stem[title_start:bracket_start - 1].strip():
+                        # 标题之后的括号
+                        title_end = bracket_start - 1
+                    else:
+                        # 标题之前只有括号：标题从括号之后开始
+                        title_start = match.end()
+            depth = max(0, depth - 1)
+            continue
+
+        if kind in _TAG_KINDS:
+            if depth:
+                bracket_tagged = True
+            if kind == 'resolution':
+                info.resolution = info.resolution or match.group()
+            elif kind == 'codec':
+                info.codec = info.codec or match.group()
+            elif kind == 'depth':
+                info.bit_depth = info.bit_depth or match.group()
+            elif kind == 'source':
+                info.source = info.source or match.group()
+            elif depth:
+                # CRC 只认括号中的
+                info.crc = match.group().upper()
+        elif kind == 'se':
+            info.season = info.season or str(int(match.group('se_season')))
+            if info.episode is None:
+                info.episode, info.version = match.group('se_episode'), match.group('se_version')
+        elif kind == 'season':
+            season = match.group('season_s', 'season_n', 'season_o')
+            info.season = info.season or str(int(next(value for value in season if value is not None)))
+        elif kind == 'dash':
+            if info.episode is None:
+                info.episode, info.version = match.group('dash_episode'), match.group('dash_version')
+        elif kind == 'cn':
+            if match.group('cn_season') is not None:
+                info.season = info.season or _season_number(match.group('cn_season'))
+            elif info.episode is None:
+                info.episode = match.group('cn_episode')
+        elif kind == 'mark':
+            if info.episode is None:
+                info.episode, info.version = match.group('mark_episode'), match.group('mark_version')
+        elif kind == 'number':
+            if not depth:
+                trailing = match
+            continue
+
+        if kind in _TITLE_ENDS and not depth and title_end is None:
+            title_end = match.start()
+
+    if title_end is None:
+        title_end = len(stem)
+    if (info.episode is None and trailing is not None and trailing.start() > title_start
+            and not stem[trailing.end():title_end].strip() and not _is_year(trailing.group('number_value'))):
+        # "Title 07"、"Title 07 [1080p]"：标题末尾单独的数字视为集数（年份除外）
+        info.episode, info.version = trailing.group('number_value'), trailing.group('number_version')
+        title_end = trailing.start()
+    title = _clean_title(stem[title_start:title_end])
+    if bracket_title is not None and _DECORATION_RE.fullmatch(title):
+        # 标题整个在括号里：[Group][Title][03]、【Group】★04月新番★[Title][01]
+        title = _clean_title(bracket_title)
+    info.title = title or None
+    return info
+
+
+lex_release_cached = lru_cache(maxsize=LEX_CACHE_SIZE)(lex_release)
+
+
+def main(argv=None):
+    # python release_lexer.py "[Group] Title - 03v2 [WebRip 1080p HEVC-10bit AAC][ABCD1234].mkv" ...
+    for filename in sys.argv[1:] if argv is None else argv:
+        print(filename)
+        for name, value in lex_release(filename).as_dict().items():
+            if value is not None:
+                print(f'  {name}: {value}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
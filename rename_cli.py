@@ -0,0 +1,232 @@
+import sys
+import os
+import argparse
+import unicodedata
+
+from rename_engine import (
+    RenameSettings, load_config,
+    sort_files_by_episode, sort_files_by_field, sort_files_by_series, plan_renames, apply_renames
+)
+from series_groups import group_by_series
+from episode_detector import analyze_episode_fields, field_for_value
+from file_list import FileList
+from file_scanner import scan_paths
+from scan_cache import cache_file_for
+from rename_journal import RenameJournal, journal_dir_for
+from rename_history import RenameHistory, history_file_for
+from rename_executor import RENAME_WORKERS_PER_MOUNT
+from log_writer import LogWriter
+from watch_folder import FolderWatcher, DEFAULT_SETTLE_SECONDS, DEFAULT_POLL_INTERVAL
+import perf_stats
+
+# 命令行入口：无需图形界面即可批量重命名
+# 用法示例：python rename_cli.py E:/Video --title "Seihantai na Kimi to Boku" --season 1 --dry-run
+# 监视模式：python rename_cli.py /downloads --watch   （按 config.json 中的规则自动重命名新下载完成的文件）
+# 查询历史：python rename_history.py where "原文件名.mkv"   （另有 daily、errors，见 rename_history.py）
+# 性能统计：python rename_cli.py E:/Video --stats --stats-json stats.json --profile rename.prof
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='番剧批量重命名工具（命令行版）')
+    parser.add_argument('paths', nargs='*', help='要重命名的文件或文件夹')
+    parser.add_argument('--config', default='config.json', help='配置文件路径（默认 config.json）')
+    parser.add_argument('--template', help='命名模板')
+    parser.add_argument('--custom-rule', help='自定义命名规则，优先于命名模板')
+    parser.add_argument('--media-type', help='影视类型')
+    parser.add_argument('--title', help='标题')
+    parser.add_argument('--season', help='季数')
+    parser.add_argument('--episode-prefix', help='集数前缀，如 EP、第')
+    parser.add_argument('--episode-pattern', help='文件名中代表集数的数字')
+    parser.add_argument('--no-detect', action='store_true', help='不自动识别集数字段，未指定集数时按序号编号')
+    parser.add_argument('--group-series', action='store_true',
+                        help='按剧集分组：一个文件夹中有多部剧集时，每部各用文件名中的标题、季数和集数')
+    parser.add_argument('--log-file', default='rename_log.txt', help='日志文件路径')
+    parser.add_argument('--dry-run', action='store_true', help='只预览，不执行重命名')
+    parser.add_argument('--no-cache', action='store_true', help='不使用扫描缓存，重新扫描所有目录')
+    parser.add_argument('--watch', action='store_true', help='持续监视文件夹，自动重命名新下载完成的文件')
+    parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help='文件大小保持不变多少秒后视为下载完成（默认 %(default)s）')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help='轮询方式下检查文件夹的间隔秒数（默认 %(default)s）')
+    parser.add_argument('--polling', action='store_true', help='不使用 inotify，强制使用轮询')
+    parser.add_argument('--rename-workers', type=int, default=RENAME_WORKERS_PER_MOUNT,
+                        help='每个挂载点同时进行的重命名数，网络共享上可调大（默认 %(default)s）')
+    parser.add_argument('--undo', action='store_true', help='撤销最近一次重命名')
+    parser.add_argument('--resume', action='store_true', help='继续完成上次中断的重命名')
+    parser.add_argument('--rollback', action='store_true', help='回滚上次中断的重命名')
+    parser.add_argument('--stats', action='store_true', help='结束时输出各环节的性能统计')
+    parser.add_argument('--stats-json', help='把性能统计写入 JSON 文件')
+    parser.add_argument('--profile', help='对本次重命名做 cProfile 分析，结果写入该文件')
+    args = parser.parse_args(argv)
+    if not args.paths and not (args.undo or args.resume or args.rollback):
+        parser.error('请指定要重命名的文件或文件夹')
+    return args
+
+
+def build_settings(args):
+    config = {}
+    if os.path.exists(args.config):
+        try:
+            config = load_config(args.config)
+        except Exception as e:
+            print(f'加载配置失败: {str(e)}', file=sys.stderr)
+
+    settings = RenameSettings.from_config(config)
+    # 命令行参数覆盖配置文件
+    for name in ('template', 'custom_rule', 'media_type', 'title', 'season',
+                 'episode_prefix', 'episode_pattern'):
+        value = getattr(args, name)
+        if value is not None:
+            setattr(settings, name, value)
+    if args.episode_pattern is not None:
+        # 命令行指定的数字优先于配置文件中保存的集数字段
+        settings.episode_field = None
+    if args.group_series:
+        settings.group_series = True
+    return settings
+
+
+def make_logger(log_file):
+    # 日志文件由后台线程批量写入，程序退出前写完
+    writer = LogWriter(log_file)
+
+    def log(message):
+        print(writer.write(message), end='')
+    return log
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.stats or args.stats_json:
+        perf_stats.enable()
+    if args.profile:
+        perf_stats.request_profile(args.profile)
+    try:
+        return run(args)
+    finally:
+        if args.stats:
+            print_stats()
+        if args.stats_json:
+            perf_stats.export_json(args.stats_json)
+
+
+def print_stats():
+    rows = [perf_stats.COLUMN_TITLES] + perf_stats.format_rows()
+    # 中文字符占两列
+    width = lambda text: sum(2 if unicodedata.east_asian_width(char) in 'WF' else 1 for char in text)
+    for row in rows:
+        cells = [row[0] + ' ' * (16 - width(row[0]))]
+        cells.extend(' ' * (12 - width(cell)) + cell for cell in row[1:])
+        print(''.join(cells), file=sys.stderr)
+
+
+def run(args):
+    settings = build_settings(args)
+    journal = RenameJournal(journal_dir_for(args.config))
+    history = RenameHistory(history_file_for(args.config))
+
+    if args.undo or args.resume or args.rollback:
+        return recover(args, journal, history)
+
+    interrupted = journal.interrupted()
+    if interrupted and not args.dry_run:
+        for batch in interrupted:
+            print(f'{batch.time} 的重命名（{batch.file_count} 个文件）未能完成', file=sys.stderr)
+        print('请先使用 --resume 继续完成或 --rollback 回滚', file=sys.stderr)
+        return 1
+
+    if args.watch:
+        return watch(args, settings, journal, history)
+
+    files = FileList()
+    cache_file = None if args.no_cache else cache_file_for(args.config)
+    files.add_records(scan_paths(args.paths, cache_file=cache_file))
+    if not files:
+        print('未找到视频文件', file=sys.stderr)
+        return 1
+
+    if settings.episode_pattern and not settings.episode_field:
+        # 按数字所在的位置取每个文件的集数，而不是只匹配数值完全相同的文件
+        settings.episode_field = field_for_value(files, settings.episode_pattern)
+    if not (settings.episode_field or settings.episode_pattern or settings.episode or args.no_detect):
+        analysis = analyze_episode_fields(files)
+        if analysis.is_confident:
+            settings.episode_field = analysis.best.key
+            print(f'自动识别集数: {analysis.best.describe()}，置信度 {analysis.confidence:.0%}', file=sys.stderr)
+
+    groups = None
+    if settings.group_series:
+        groups = group_by_series(files, settings.episode_field)
+        sort_files_by_series(files, groups)
+        print(f'共 {len(groups)} 部剧集:', file=sys.stderr)
+        for group in groups:
+            group_settings = group.settings_for(settings)
+            episode = '按集数字段' if group.episode_field else '按序号'
+            print(f'  {group_settings.title}（第 {group_settings.season or 1} 季）{len(group.files)} 个文件，{episode}编号',
+                  file=sys.stderr)
+    elif settings.episode_field:
+        sort_files_by_field(files, settings.episode_field)
+    elif settings.episode_pattern:
+        sort_files_by_episode(files, settings.episode_pattern)
+
+    plan = plan_renames(files, settings, groups)
+
+    if args.dry_run:
+        for file_info, new_path in plan:
+            print(f'{file_info["filename"]} -> {os.path.basename(new_path)}')
+        return 0
+
+    if not settings.title and not settings.group_series:
+        print('请输入标题（--title 或配置文件中的 title）', file=sys.stderr)
+        return 1
+
+    log = make_logger(args.log_file)
+    log(f'添加了 {len(files)} 个文件，并按自然数字顺序排序')
+    _, error_count = apply_renames(plan, log, journal=journal, workers_per_mount=args.rename_workers,
+                                   history=history, template=settings.rule)
+    return 1 if error_count else 0
+
+
+def recover(args, journal, history):
+    log = make_logger(args.log_file)
+    error_count = 0
+    if args.undo:
+        batch = journal.last_undoable()
+        if batch is None:
+            print('没有可撤销的重命名', file=sys.stderr)
+            return 1
+        log(f'撤销 {batch.time} 的重命名')
+        error_count += journal.undo(batch, log, history=history)[1]
+    for batch in journal.interrupted() if args.resume or args.rollback else []:
+        if args.resume:
+            log(f'继续完成 {batch.time} 的重命名')
+            error_count += journal.resume(batch, log, history=history)[1]
+        else:
+            log(f'回滚 {batch.time} 的重命名')
+            error_count += journal.undo(batch, log, history=history)[1]
+    return 1 if error_count else 0
+
+
+def watch(args, settings, journal, history):
+    folders = [path for path in args.paths if os.path.isdir(path)]
+    if len(folders) != len(args.paths):
+        print('监视模式只接受文件夹', file=sys.stderr)
+        return 1
+    if not settings.title and not settings.group_series:
+        print('请输入标题（--title 或配置文件中的 title）', file=sys.stderr)
+        return 1
+
+    watcher = FolderWatcher(
+        folders, settings, make_logger(args.log_file),
+        settle_seconds=args.settle, poll_interval=args.poll_interval,
+        use_inotify=not args.polling, journal=journal, history=history
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
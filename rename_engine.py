@@ -0,0 +1,343 @@
+import os
+import re
+import json
+
+from name_template import render_names
+from episode_detector import file_fields, field_values
+from series_groups import render_series_names, series_order
+from rename_planner import resolve_renames
+from log_store import BATCH_START_PREFIX
+from rename_executor import run_steps, RENAME_WORKERS_PER_MOUNT, STEP_OK, STEP_FAILED
+import perf_stats
+
+# 重命名核心引擎：不依赖任何界面组件，Tk/Qt 前端与命令行共用
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.ts')
+
+TEMPLATES = [
+    '[影视类型] - [标题] - [季数] - [集数]',
+    '[标题] - [季数] - [集数]',
+    '[影视类型] - [标题]',
+    '[标题]'
+]
+
+MEDIA_TYPES = ['番剧', '电视剧', '电影', '其他']
+
+_NUMBER_RE = re.compile(r'\d+')
+_NUMBER_SPLIT_RE = re.compile(r'(\d+)')
+
+
+class RenameSettings:
+    # 一次批量重命名所需的全部参数，字段与 config.json 保持一致
+    def __init__(self, template=TEMPLATES[0], custom_rule='', media_type=MEDIA_TYPES[0],
+                 title='', season='', episode_prefix='', episode_pattern=None, episode='', episode_field=None,
+                 group_series=False, series_overrides=None, season_episode_join=False):
+        self.template = template
+        self.custom_rule = custom_rule
+        self.media_type = media_type
+        self.title = title
+        self.season = season
+        self.episode_prefix = episode_prefix
+        # 用户选择的代表集数的数字，None 表示未选择（按序号编号）
+        self.episode_pattern = episode_pattern
+        # 代表集数的字段（episode_detector 的字段标识），优先于 episode_pattern：每个文件取该位置上的数字
+        self.episode_field = episode_field
+        # 固定集数（Qt 前端的"集数"输入框），非空时不再按文件识别集数
+        self.episode = episode
+        # 按剧集分组（见 series_groups.py）：每组各自的标题、季数和集数序列，标题和季数为空时才使用上面的值
+        self.group_series = group_series
+        # 用户修改过的分组标题和季数：{分组键: {'title': ..., 'season': ...}}
+        self.series_overrides = series_overrides or {}
+        # Tk 前端的旧规则：新文件名同时含"集"和"季"（或 EP）时改写为"标题 - 季数 - 集数"，Qt 前端不做此改写
+        self.season_episode_join = season_episode_join
+
+    @property
+    def rule(self):
+        return self.custom_rule if self.custom_rule else self.template
+
+    @classmethod
+    def from_config(cls, config):
+        # episode 是 Qt 前端"集数"输入框中的固定集数，与集数前缀无关
+        episode_field = config.get('episode_field')
+        return cls(
+            template=config.get('template', TEMPLATES[0]),
+            custom_rule=config.get('custom_rule', ''),
+            media_type=config.get('media_type', MEDIA_TYPES[0]),
+            title=config.get('title', ''),
+            season=config.get('season', ''),
+            episode_prefix=config.get('episode_prefix', ''),
+            episode_pattern=config.get('episode_pattern') or None,
+            episode=config.get('episode', ''),
+            # JSON 中保存为列表
+            episode_field=tuple(episode_field) if episode_field else None,
+            group_series=config.get('group_series', False),
+            series_overrides=config.get('series_overrides'),
+            season_episode_join=config.get('season_episode_join', False)
+        )
+
+    def to_config(self):
+        return {
+            'template': self.template,
+            'custom_rule': self.custom_rule,
+            'media_type': self.media_type,
+            'title': self.title,
+            'season': self.season,
+            'episode_prefix': self.episode_prefix,
+            'episode_pattern': self.episode_pattern or '',
+            'episode': self.episode,
+            'episode_field': list(self.episode_field) if self.episode_field else None,
+            'group_series': self.group_series,
+            'series_overrides': self.series_overrides,
+            'season_episode_join': self.season_episode_join
+        }
+
+
+def load_config(config_file):
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_config(config_file, config):
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+
+
+def is_video_file(filename):
+    return filename.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def extract_numbers(filename):
+    # 提取文件名中的所有数字序列
+    return _NUMBER_RE.findall(filename)
+
+
+def natural_sort_key(s):
+    # 自然排序键函数，将字符串分割成文本和数字部分
+    parts = _NUMBER_SPLIT_RE.split(s)
+    # 对数字部分转换为整数，文本部分保持原样
+    return [int(part) if part.isdigit() else part for part in parts]
+
+
+def format_file_size(size_bytes):
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
+    elif size_bytes < 1024 * 1024:
+        return f"{size_bytes / 1024:.2f} KB"
+    elif size_bytes < 1024 * 1024 * 1024:
+        return f"{size_bytes / (1024 * 1024):.2f} MB"
+    else:
+        return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
+
+
+# 驻留表：所有文件共用同一个目录前缀和扩展名字符串
+_PREFIXES = {}
+_EXTS = {}
+
+
+class FileRecord:
+    # 一个文件的信息。几十万个文件时逐个字典占用的内存过多，因此：
+    #   - 用 __slots__ 保存，不为每个文件建字典
+    #   - 路径拆成目录前缀和文件名，同一目录的文件共用一个前缀字符串
+    #   - 大小字符串（size_str）和数字序列（numbers）只在读取时计算，界面只为可见行读取
+    #   - 字段分词（fields）在第一次读取时计算并保存，从扫描缓存导入未变化的目录时不必逐个分词
+    # 仍可像字典一样按键读取：file_info['path']、file_info.get('numbers', [])
+    __slots__ = ('prefix', 'filename', 'ext', 'size', '_fields')
+
+    def __init__(self, prefix, filename, size):
+        self.prefix = _PREFIXES.setdefault(prefix, prefix)
+        self.filename = filename
+        ext = os.path.splitext(filename)[1]
+        self.ext = _EXTS.setdefault(ext, ext)
+        self.size = size
+        self._fields = None
+
+    @classmethod
+    def from_path(cls, file_path, size):
+        directory, filename = os.path.split(file_path)
+        return cls(os.path.join(directory, '') if directory else '', filename, size)
+
+    @property
+    def path(self):
+        return self.prefix + self.filename
+
+    @property
+    def fields(self):
+        # 按字段位置索引的数字（见 episode_detector.py），选择集数字段时直接按位置取值
+        fields = self._fields
+        if fields is None:
+            fields = self._fields = file_fields(self.filename)
+        return fields
+
+    @property
+    def size_str(self):
+        return format_file_size(self.size)
+
+    @property
+    def numbers(self):
+        # 提取文件名中的数字序列
+        return extract_numbers(self.filename)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self):
+        return f'FileRecord({self.path!r}, {self.size})'
+
+
+def make_file_record(file_path, size=None):
+    # size 已知时（如来自 DirEntry.stat()）直接使用，不再访问文件
+    return FileRecord.from_path(file_path, os.path.getsize(file_path) if size is None else size)
+
+
+# 文件列表各列的排序键
+FILE_SORT_KEYS = {
+    'filename': lambda f: natural_sort_key(f['filename']),
+    'ext': lambda f: f['ext'].lower(),
+    'size': lambda f: f['size'],
+    'path': lambda f: natural_sort_key(f['path'])
+}
+
+
+def sort_files(files, column, reverse=False):
+    # file_list.FileList 缓存了各列的顺序，直接切换；普通列表就地排序
+    if hasattr(files, 'sort_by'):
+        files.sort_by(column, reverse)
+    else:
+        files.sort(key=FILE_SORT_KEYS[column], reverse=reverse)
+    return files
+
+
+def sort_files_by_episode(files, episode_pattern):
+    # 根据用户选择的数字排序文件
+    def get_episode_number(file_info):
+        for num in file_info.get('numbers', []):
+            if num == episode_pattern:
+                return int(num)
+        return 0
+
+    files.sort(key=get_episode_number)
+    return files
+
+
+def sort_files_by_field(files, episode_field):
+    # 按集数字段的数值排序，没有该字段的文件排在最前（与 sort_files_by_episode 一致）
+    if hasattr(files, 'sort_by'):
+        files.sort_by(('episode', episode_field))
+        return files
+    # 先一次取出整批文件的集数，再按位置排序
+    values = iter([int(value) if value is not None else 0 for value in field_values(files, episode_field)])
+    # list.sort 按原顺序对每个元素恰好调用一次 key
+    files.sort(key=lambda file_info: next(values))
+    return files
+
+
+def sort_files_by_series(files, groups):
+    # 按剧集分组时：各组按标题排列，组内按本组的集数字段排序
+    order = series_order(groups, natural_sort_key)
+    files.sort(key=lambda file_info: order[id(file_info)])
+    return files
+
+
+def generate_new_name(settings, file_info, index=0):
+    return render_names(settings, [file_info], index)[0]
+
+
+def render_batch_names(settings, files, groups=None):
+    # 整批文件的新文件名；按剧集分组时各组分别编号（groups 可传入已分好的组）
+    if settings.group_series:
+        return render_series_names(settings, files, groups)
+    return render_names(settings, files)
+
+
+def plan_renames(files, settings, groups=None):
+    # 计算每个文件的目标路径，不触碰文件系统
+    new_names = render_batch_names(settings, files, groups)
+    return [
+        (file_info, os.path.join(os.path.dirname(file_info['path']), new_name))
+        for file_info, new_name in zip(files, new_names)
+    ]
+
+
+def apply_renames(plan, log=None, renamed=None, journal=None, **options):
+    # 按计划执行重命名，返回 (成功数, 失败数)
+    # 冲突在执行前统一解决（见 rename_planner.py），每个文件只调用一次 os.rename（成环时多一次临时名）
+    # 互不相关的文件并发重命名，每个挂载点最多 workers_per_mount 个（见 rename_executor.py）
+    # 传入 renamed 列表时，把成功的 (原路径, 新路径) 追加到其中
+    # 传入 journal（rename_journal.RenameJournal）时，执行前先把全部步骤写入日志，便于撤销和崩溃后恢复
+    # 其余选项（history、template、progress、cancel_event、workers_per_mount）见 execute_steps
+    steps = resolve_renames(plan)
+    writer = journal.begin(steps) if journal is not None else None
+    return execute_steps(steps, log, renamed, writer, **options)
+
+
+def execute_steps(steps, log=None, renamed=None, writer=None, check_free=False, step_numbers=None,
+                  workers_per_mount=RENAME_WORKERS_PER_MOUNT, progress=None, cancel_event=None,
+                  history=None, template='', kind='rename'):
+    # 执行 resolve_renames 生成的步骤 (file_info, 当前路径, 目标路径, 是否为最终名称, 依赖的 file_info)
+    # writer 记录每一步的结果；check_free 为 True 时执行前确认目标不存在（撤销和恢复时文件夹可能已有变化）
+    # progress(已处理文件数, 文件总数) 在每个文件完成或失败后调用
+    # cancel_event 被设置后不再开始新的文件，已完成的部分保持不变并如实记录
+    # 传入 history（rename_history.RenameHistory）时，每个文件的结果另外写入结构化历史，template 和 kind 一并记录
+    # 日志、writer、history 和 progress 只在当前线程中调用
+    log = log or (lambda message: None)
+    total = len({id(step[0]) for step in steps})
+    success_count = 0
+    error_count = 0
+    # 日志索引据此标记一批重命名的开始（见 log_store.py）
+    log(f'{BATCH_START_PREFIX} 共 {total} 个文件')
+    if progress is not None:
+        # 第一个文件完成之前取消时，界面也能知道总数
+        progress(0, total)
+    if history is not None:
+        history = history.begin(getattr(writer, 'batch_id', None), kind, template, total)
+        # 成环时一个文件分两步完成，耗时累加
+        seconds_of = {}
+
+    # 有待分析的请求时（见 perf_stats.request_profile），对这一批做 cProfile 分析
+    with perf_stats.profile_batch():
+        for index, result, error, seconds in run_steps(steps, check_free, workers_per_mount, cancel_event):
+            file_info, source, target, final, _ = steps[index]
+            number = index if step_numbers is None else step_numbers[index]
+            if writer is not None:
+                writer.record(number, result == STEP_OK)
+            if history is not None and result in (STEP_OK, STEP_FAILED):
+                seconds = seconds_of.pop(id(file_info), 0.0) + seconds
+                if result == STEP_OK and not final:
+                    seconds_of[id(file_info)] = seconds
+                else:
+                    history.record(source if result == STEP_FAILED else file_info['path'], target,
+                                   file_info.get('size'), seconds, error)
+            if result == STEP_OK:
+                if not final:
+                    continue
+                success_count += 1
+                if renamed is not None:
+                    renamed.append((file_info['path'], target))
+                log(f'成功重命名: {file_info["filename"]} -> {os.path.basename(target)}')
+            elif result == STEP_FAILED:
+                error_count += 1
+                if source != file_info['path']:
+                    log(f'重命名失败: {file_info["filename"]} - {str(error)}（文件当前名为 {os.path.basename(source)}）')
+                else:
+                    log(f'重命名失败: {file_info["filename"]} - {str(error)}')
+            else:
+                continue
+            if progress is not None:
+                progress(success_count + error_count, total)
+
+    cancelled_count = total - success_count - error_count
+    if writer is not None:
+        writer.end(success_count, error_count, cancelled=cancelled_count)
+    if history is not None:
+        history.end(success_count, error_count, cancelled_count)
+    if cancel_event is not None and cancel_event.is_set():
+        log(f'操作已取消: 成功 {success_count} 个, 失败 {error_count} 个, 未执行 {cancelled_count} 个')
+    else:
+        log(f'操作完成: 成功 {success_count} 个, 失败 {error_count} 个')
+    return success_count, error_count
@@ -0,0 +1,141 @@
+import os
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import perf_stats
+
+# 并发执行重命名：SMB/NFS 等网络共享上每次 os.rename 都要等待一次网络往返，逐个执行时总耗时与文件数成正比
+#   - 涉及相同路径的步骤（同一文件的多步、互相占位的链和环）分在同一组，组内严格按规划顺序执行；
+#     规划时标明要等另一个文件移走的步骤（after）与该文件也在同一组，大小写不敏感的挂载点上
+#     路径写法不同（a.mkv 与 A.mkv）也不会被拆开并发执行
+#   - 不同组之间互不影响，并发执行；每个挂载点（按设备号区分）各有一个线程池，限制对同一台服务器的并发数
+#   - 结果通过队列交回调用线程，日志和重命名日志（journal）只在调用线程中写入
+#   - 取消后不再开始新的文件；成环时已改为临时名的文件会先改完，不会停在临时名上
+
+# 每个挂载点同时进行的重命名数
+RENAME_WORKERS_PER_MOUNT = 8
+
+# 步骤结果
+STEP_OK = 'ok'
+STEP_FAILED = 'failed'
+# 同一文件前面的步骤已失败，本步未执行
+STEP_SKIPPED = 'skipped'
+# 已取消，本步未执行
+STEP_CANCELLED = 'cancelled'
+
+
+def same_file(path1, path2):
+    # 大小写不敏感的文件系统上只改大小写时，目标"存在"的就是源文件本身
+    try:
+        return os.path.samefile(path1, path2)
+    except OSError:
+        return False
+
+
+def group_steps(steps):
+    # steps: [(文件标识, 当前路径, 目标路径, 需等待移走的文件标识或 None), ...]，
+    # 返回按组划分的步骤序号列表，组内保持原顺序
+    parent = {}
+
+    def find(x):
+        root = x
+        while parent.setdefault(root, root) != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    for file_key, source, target, after_key in steps:
+        file_root = find(('file', file_key))
+        keys = [('path', os.path.normcase(source)), ('path', os.path.normcase(target))]
+        if after_key is not None:
+            keys.append(('file', after_key))
+        for key in keys:
+            root = find(key)
+            if root != file_root:
+                parent[root] = file_root
+
+    groups = {}
+    for number, (file_key, _, _, _) in enumerate(steps):
+        groups.setdefault(find(('file', file_key)), []).append(number)
+    return list(groups.values())
+
+
+def _run_group(steps, numbers, check_free, results, cancel_event=None):
+    failed = set()
+    # 已改为临时名、尚未改为最终名称的文件
+    in_flight = set()
+    for number in numbers:
+        file_info, source, target, final, after = steps[number]
+        if id(file_info) in failed:
+            results.put((number, STEP_SKIPPED, None, 0.0))
+            continue
+        if cancel_event is not None and cancel_event.is_set() and not in_flight:
+            results.put((number, STEP_CANCELLED, None, 0.0))
+            continue
+        started = time.perf_counter()
+        try:
+            if after is not None and id(after) in failed:
+                raise OSError(f'目标文件 {os.path.basename(target)} 未能移走')
+            if source != target:
+                if check_free and os.path.lexists(target) and not same_file(source, target):
+                    raise FileExistsError(f'目标文件已存在: {os.path.basename(target)}')
+                os.rename(source, target)
+            if final:
+                in_flight.discard(id(file_info))
+            else:
+                in_flight.add(id(file_info))
+            seconds = time.perf_counter() - started
+            perf_stats.record('rename_io', seconds)
+            results.put((number, STEP_OK, None, seconds))
+        except Exception as e:
+            failed.add(id(file_info))
+            in_flight.discard(id(file_info))
+            seconds = time.perf_counter() - started
+            perf_stats.record('rename_io', seconds)
+            results.put((number, STEP_FAILED, e, seconds))
+
+
+def _mount_key(path, mounts):
+    directory = os.path.dirname(path)
+    key = mounts.get(directory)
+    if key is None:
+        try:
+            key = os.stat(directory).st_dev
+        except OSError:
+            key = directory
+        mounts[directory] = key
+    return key
+
+
+def run_steps(steps, check_free=False, workers_per_mount=RENAME_WORKERS_PER_MOUNT, cancel_event=None):
+    # 执行 resolve_renames 生成的步骤，按完成顺序产出 (步骤序号, 结果, 异常, 耗时秒数)
+    # check_free 为 True 时执行前确认目标不存在（撤销和恢复时文件夹可能已有变化）
+    # cancel_event 被设置后，尚未开始的文件产出 STEP_CANCELLED
+    groups = group_steps([
+        (id(step[0]), step[1], step[2], None if step[4] is None else id(step[4])) for step in steps
+    ])
+    results = queue.Queue()
+    if workers_per_mount <= 1 or len(groups) <= 1:
+        for numbers in groups:
+            _run_group(steps, numbers, check_free, results, cancel_event)
+            while not results.empty():
+                yield results.get()
+        return
+
+    pools = {}
+    mounts = {}
+    try:
+        for numbers in groups:
+            key = _mount_key(steps[numbers[0]][1], mounts)
+            pool = pools.get(key)
+            if pool is None:
+                pool = pools[key] = ThreadPoolExecutor(max_workers=workers_per_mount)
+            pool.submit(_run_group, steps, numbers, check_free, results, cancel_event)
+        # 每一步恰好产出一个结果
+        for _ in range(len(steps)):
+            yield results.get()
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=True)
@@ -0,0 +1,227 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+# 结构化重命名历史：与文本日志并列的 JSON Lines 事件流（默认 rename_history.jsonl，放在 config.json 旁边）
+# 每批一条 batch 事件、每个文件一条 rename 事件、结束时一条 batch_end 事件：
+#   {"type": "batch", "time": ..., "batch": 批次号, "kind": "rename"|"undo"|"resume", "template": 命名规则, "files": 文件数}
+#   {"type": "rename", "time": ..., "batch": ..., "ok": true|false, "old": 原路径, "new": 新路径, "size": 字节数,
+#    "ms": 耗时毫秒, "errno": 错误码, "error": 错误信息}
+#   {"type": "batch_end", "time": ..., "batch": ..., "success": ..., "error": ..., "cancelled": ..., "seconds": ...}
+# 查询命令逐行流式读取，不会把整个文件读进内存：
+#   python rename_history.py where "[Group] Title - 03 [WebRip 1080p].mkv"
+#   python rename_history.py daily
+#   python rename_history.py errors
+
+HISTORY_FILE = 'rename_history.jsonl'
+# 累计这么多条事件后写入文件一次
+HISTORY_FLUSH_EVERY = 1000
+
+# rename 事件的键按固定顺序写出，统计时直接用正则取字段，不必逐行 json.loads
+_DAILY_RE = re.compile(r'^\{"type": "rename", "time": "(\d{4}-\d{2}-\d{2})[^"]*", "batch": "[^"]*", '
+                       r'"ok": (true|false), .*"size": (\d+|null), "ms": ([\d.e+-]+|null), "errno": ')
+
+
+def history_file_for(config_file):
+    # 历史文件与配置文件放在同一目录
+    return os.path.join(os.path.dirname(os.path.abspath(config_file)), HISTORY_FILE)
+
+
+_now_cache = [None, '']
+
+
+def _now():
+    # 同一秒内的事件复用格式化好的时间
+    second = int(time.time())
+    if _now_cache[0] != second:
+        _now_cache[0] = second
+        _now_cache[1] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(second))
+    return _now_cache[1]
+
+
+class RenameHistory:
+    def __init__(self, history_file=HISTORY_FILE):
+        self.history_file = history_file
+
+    def begin(self, batch_id=None, kind='rename', template='', total=0):
+        return HistoryBatch(self.history_file, batch_id or datetime.now().strftime('%Y%m%d-%H%M%S-%f'),
+                            kind, template, total)
+
+
+class HistoryBatch:
+    # 一批重命名的事件，只在执行重命名的线程中写入
+    def __init__(self, history_file, batch_id, kind, template, total):
+        self.history_file = history_file
+        self.batch_id = batch_id
+        self.started = datetime.now()
+        self.pending = []
+        self.write({'type': 'batch', 'time': _now(), 'batch': batch_id, 'kind': kind,
+                    'template': template, 'files': total})
+
+    def write(self, event):
+        self.pending.append(json.dumps(event, ensure_ascii=False) + '\n')
+        if len(self.pending) >= HISTORY_FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        try:
+            with open(self.history_file, 'a', encoding='utf-8') as f:
+                f.writelines(self.pending)
+        except OSError as e:
+            print(f'保存重命名历史失败: {str(e)}', file=sys.stderr)
+        self.pending = []
+
+    def record(self, old_path, new_path, size, seconds, error=None):
+        self.write({
+            'type': 'rename', 'time': _now(), 'batch': self.batch_id, 'ok': error is None,
+            'old': old_path, 'new': new_path, 'size': size, 'ms': round(seconds * 1000, 3),
+            'errno': getattr(error, 'winerror', None) or getattr(error, 'errno', None),
+            'error': None if error is None else str(error)
+        })
+
+    def end(self, success_count, error_count, cancelled_count):
+        self.write({
+            'type': 'batch_end', 'time': _now(), 'batch': self.batch_id, 'success': success_count,
+            'error': error_count, 'cancelled': cancelled_count,
+            'seconds': round((datetime.now() - self.started).total_seconds(), 3)
+        })
+        self.flush()
+
+
+# ---- 查询 ----
+
+def _lines(history_file, needle=None):
+    # 逐行读取，给出 needle 时只返回包含它的行
+    try:
+        f = open(history_file, encoding='utf-8')
+    except OSError:
+        return
+    with f:
+        for line in f:
+            if needle is None or needle in line:
+                yield line
+
+
+def iter_events(history_file, needle=None):
+    # 逐行读取事件；给出 needle 时先按原始文本过滤，只解析可能匹配的行
+    for line in _lines(history_file, needle):
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # 写入中途退出时最后一行可能不完整
+            continue
+
+
+def _json_text(text):
+    # 字符串在事件行中的写法，用于按原始文本预先过滤
+    return json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+def where(history_file, name):
+    # 追踪文件的去向：依次跟随 old -> new，name 不含目录时按文件名匹配
+    by_basename = os.path.basename(name) == name
+    # 当前追踪的路径，及其在事件行中的写法
+    tracked = {} if by_basename else {os.path.abspath(name): _json_text(os.path.abspath(name))}
+    needle = _json_text(name)
+    for line in _lines(history_file):
+        if needle not in line and not any(text in line for text in tracked.values()):
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if event.get('type') != 'rename' or not event['ok']:
+            continue
+        old = event['old']
+        if old in tracked or (by_basename and os.path.basename(old) == name):
+            tracked.pop(old, None)
+            tracked[event['new']] = _json_text(event['new'])
+            yield event
+
+
+def daily(history_file):
+    # 按天统计：{日期: [成功数, 失败数, 字节数, 总耗时毫秒]}
+    stats = {}
+    for line in _lines(history_file, '"type": "rename"'):
+        match = _DAILY_RE.match(line)
+        if match is not None:
+            date, ok, size, ms = match.groups()
+            ok = ok == 'true'
+            size = int(size) if size != 'null' else 0
+            ms = float(ms) if ms != 'null' else 0
+        else:
+            # 不是本模块写出的格式（如手工编辑过），按 JSON 解析
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            date, ok, size, ms = event['time'][:10], event['ok'], event.get('size') or 0, event.get('ms') or 0
+        day = stats.get(date)
+        if day is None:
+            day = stats[date] = [0, 0, 0, 0.0]
+        if ok:
+            day[0] += 1
+            day[2] += size
+        else:
+            day[1] += 1
+        day[3] += ms
+    return stats
+
+
+def errors(history_file):
+    # 失败原因统计：{(错误码, 错误信息去掉路径后的前缀): 次数}
+    counts = {}
+    for event in iter_events(history_file, '"ok": false'):
+        if event.get('type') != 'rename':
+            continue
+        message = (event.get('error') or '').split(':')[0]
+        key = (event.get('errno'), message)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='查询重命名历史')
+    parser.add_argument('--config', default='config.json',
+                        help='配置文件路径（默认 config.json），历史文件在它旁边，与界面和命令行写入的位置相同')
+    parser.add_argument('--history-file', help='历史文件路径（默认为配置文件旁的 rename_history.jsonl）')
+    commands = parser.add_subparsers(dest='command', required=True)
+    where_parser = commands.add_parser('where', help='文件被重命名成了什么')
+    where_parser.add_argument('name', help='原文件路径或文件名')
+    commands.add_parser('daily', help='每天的重命名数量、失败率和速度')
+    commands.add_parser('errors', help='失败原因统计')
+    args = parser.parse_args(argv)
+    if args.history_file is None:
+        args.history_file = history_file_for(args.config)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'where':
+        found = False
+        for event in where(args.history_file, args.name):
+            found = True
+            print(f'{event["time"]}  [{event["batch"]}]  {event["old"]} -> {event["new"]}')
+        if not found:
+            print('未找到该文件的重命名记录', file=sys.stderr)
+            return 1
+    elif args.command == 'daily':
+        print(f'{"日期":<12}{"成功":>10}{"失败":>8}{"失败率":>9}{"大小(GB)":>12}{"平均(ms)":>10}')
+        for date, (success, failed, size, ms) in sorted(daily(args.history_file).items()):
+            total = success + failed
+            print(f'{date:<12}{success:>10}{failed:>8}{failed / total:>9.2%}{size / 1024 ** 3:>12.2f}{ms / total:>10.2f}')
+    else:
+        for (code, message), count in sorted(errors(args.history_file).items(), key=lambda item: -item[1]):
+            print(f'{count:>8}  [{code}] {message}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import os
+import json
+import time
+from datetime import datetime
+
+from rename_engine import execute_steps
+from rename_executor import group_steps
+
+# 重命名日志（预写式）：每批重命名在执行前先把全部步骤写入一个 JSON Lines 文件并 fsync，
+# 执行过程中追加每一步的结果，结束时写入结束记录。借助它可以：
+#   - 一次撤销整批重命名（按相反顺序把每一步改回去）
+#   - 程序在执行中途退出后，下次启动时发现未完成的批次，选择继续完成或回滚
+# 文件格式（每行一个 JSON）：
+#   {"batch": 批次号, "kind": "rename"|"undo", "time": ..., "undo_of": ..., "steps": [[原路径, 目标路径, 是否为最终名称, 文件序号, 依赖的文件序号], ...]}
+#   {"step": 步骤序号, "ok": true|false}（互不相关的步骤并发执行，结果按完成顺序记录）
+#   {"end": true, "success": 成功数, "error": 失败数, "cancelled": 取消时未执行的文件数, "rolled_back": ...}
+#   {"undone_by": 撤销该批次的批次号}
+
+JOURNAL_DIR = 'rename_journal'
+# 保留最近多少个已完成的批次
+JOURNAL_KEEP = 50
+# 步骤结果批量 fsync：累计这么多条或距上次同步超过这么多秒时同步一次
+JOURNAL_SYNC_EVERY = 256
+JOURNAL_SYNC_SECONDS = 1.0
+
+
+def journal_dir_for(config_file):
+    # 日志目录与配置文件放在同一目录
+    return os.path.join(os.path.dirname(os.path.abspath(config_file)), JOURNAL_DIR)
+
+
+class JournalWriter:
+    def __init__(self, path):
+        self.path = path
+        self.batch_id = os.path.splitext(os.path.basename(path))[0]
+        self.file = open(path, 'a', encoding='utf-8')
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def write(self, entry, sync=False):
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.unsynced += 1
+        if (sync or self.unsynced >= JOURNAL_SYNC_EVERY
+                or time.monotonic() - self.last_sync >= JOURNAL_SYNC_SECONDS):
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def record(self, number, ok):
+        self.write({'step': number, 'ok': ok})
+
+    def end(self, success_count, error_count, cancelled=0, rolled_back=False):
+        entry = {'end': True, 'success': success_count, 'error': error_count}
+        if cancelled:
+            entry['cancelled'] = cancelled
+        if rolled_back:
+            entry['rolled_back'] = True
+        self.write(entry, sync=True)
+        self.close()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class JournalBatch:
+    def __init__(self, path):
+        self.path = path
+        self.batch_id = None
+        self.kind = None
+        self.time = None
+        self.undo_of = None
+        self.steps = []
+        # {步骤序号: 是否成功}
+        self.status = {}
+        self.ended = False
+        self.result = None
+        self.undone_by = None
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 崩溃时最后一行可能只写了一半
+                    continue
+                if 'batch' in entry:
+                    self.batch_id = entry['batch']
+                    self.kind = entry['kind']
+                    self.time = entry['time']
+                    self.undo_of = entry.get('undo_of')
+                    self.steps = entry['steps']
+                elif 'step' in entry:
+                    self.status[entry['step']] = entry['ok']
+                elif 'end' in entry:
+                    self.ended = True
+                    self.result = entry
+                elif 'undone_by' in entry:
+                    self.undone_by = entry['undone_by']
+
+    @property
+    def file_count(self):
+        return len({step[3] for step in self.steps})
+
+    def reconcile(self, writer):
+        # 未记录结果的步骤（崩溃前尚未 fsync）根据文件系统判断执行到了哪一步，并补写到日志中
+        # 互不相关的步骤组是并发执行的，但组内按顺序执行、按顺序记录，未记录的总是组内末尾连续的一段；
+        # 成环时同一路径会先腾空再被占用，不能逐步单独判断，因此依次假设组内执行了前 k 步，
+        # 模拟各路径是否存在，取与实际最吻合的 k
+        done = {number for number, ok in self.status.items() if ok}
+        groups = group_steps([(step[3], step[0], step[1], step[4]) for step in self.steps])
+        for numbers in groups:
+            tail = [number for number in numbers if number not in self.status]
+            if not tail:
+                continue
+            for number in tail[:self.simulate(numbers, tail)]:
+                done.add(number)
+                self.status[number] = True
+                writer.record(number, True)
+        writer.sync()
+        return done
+
+    def simulate(self, numbers, tail):
+        occupied = set()
+        seen_files = set()
+        for number in numbers:
+            source, _, _, file_number, _ = self.steps[number]
+            if file_number not in seen_files:
+                seen_files.add(file_number)
+                occupied.add(source)
+        for number in numbers:
+            if number == tail[0]:
+                break
+            if self.status.get(number):
+                source, target = self.steps[number][:2]
+                occupied.discard(source)
+                occupied.add(target)
+
+        paths = {path for number in tail for path in self.steps[number][:2]}
+        actual = {path: os.path.lexists(path) for path in paths}
+        mismatch = sum(actual[path] != (path in occupied) for path in paths)
+        best_count, best_mismatch = 0, mismatch
+        for count, number in enumerate(tail, 1):
+            source, target = self.steps[number][:2]
+            if source != target:
+                for path, exists in ((source, False), (target, True)):
+                    mismatch += (actual[path] != exists) - (actual[path] != (path in occupied))
+                    if exists:
+                        occupied.add(path)
+                    else:
+                        occupied.discard(path)
+            if mismatch <= best_mismatch:
+                best_count, best_mismatch = count, mismatch
+        return best_count
+
+
+class RenameJournal:
+    def __init__(self, directory=JOURNAL_DIR, keep=JOURNAL_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    def batch_files(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [os.path.join(self.directory, name) for name in sorted(names) if name.endswith('.jsonl')]
+
+    def batches(self):
+        batches = []
+        for path in self.batch_files():
+            try:
+                batch = JournalBatch(path)
+            except OSError:
+                continue
+            if batch.batch_id is not None:
+                batches.append(batch)
+        return batches
+
+    def begin(self, steps, kind='rename', undo_of=None):
+        # 写入批次的全部步骤并 fsync，之后才能开始重命名
+        os.makedirs(self.directory, exist_ok=True)
+        self.prune()
+        batch_id = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        file_numbers = {}
+        for step in steps:
+            file_numbers.setdefault(id(step[0]), len(file_numbers))
+        entry = {
+            'batch': batch_id,
+            'kind': kind,
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'undo_of': undo_of,
+            'steps': [
+                [source, target, final, file_numbers[id(file_info)],
+                 None if after is None else file_numbers.get(id(after))]
+                for file_info, source, target, final, after in steps
+            ]
+        }
+        writer = JournalWriter(os.path.join(self.directory, batch_id + '.jsonl'))
+        writer.write(entry, sync=True)
+        return writer
+
+    def prune(self):
+        # 只删除已完成的旧批次，未完成的批次保留到处理为止
+        finished = [batch for batch in self.batches() if batch.ended]
+        for batch in finished[:max(0, len(finished) - self.keep)]:
+            try:
+                os.remove(batch.path)
+            except OSError:
+                pass
+
+    def interrupted(self):
+        return [batch for batch in self.batches() if not batch.ended]
+
+    def last_undoable(self):
+        for batch in reversed(self.batches()):
+            if batch.kind == 'rename' and batch.ended and batch.undone_by is None:
+                return batch
+        return None
+
+    def undo(self, batch, log=None, **options):
+        # 按相反顺序撤销批次中已完成的步骤；未完成的批次同时标记为已回滚
+        # options（如 progress、history）传给 execute_steps
+        writer = JournalWriter(batch.path)
+        try:
+            done = batch.reconcile(writer)
+            if not batch.ended:
+                writer.write({'end': True, 'success': 0, 'error': 0, 'rolled_back': True})
+            first_step = {}
+            for number, step in enumerate(batch.steps):
+                first_step.setdefault(step[3], number)
+
+            files = {}
+            steps = []
+            for number in sorted(done, reverse=True):
+                source, target, _, file_number, _ = batch.steps[number]
+                file_info = files.get(file_number)
+                if file_info is None:
+                    # 撤销时文件当前位于最后一步的目标路径
+                    file_info = files[file_number] = {'path': target, 'filename': os.path.basename(target)}
+                steps.append((file_info, target, source, first_step[file_number] == number, None))
+
+            undo_writer = self.begin(steps, 'undo', batch.batch_id)
+            writer.write({'undone_by': undo_writer.batch_id}, sync=True)
+        finally:
+            writer.close()
+        return execute_steps(steps, log, writer=undo_writer, check_free=True, kind='undo', **options)
+
+    def undo_last(self, log=None, **options):
+        # 撤销最近一次完成的重命名，没有可撤销的批次时返回 None
+        batch = self.last_undoable()
+        if batch is None:
+            return None
+        return self.undo(batch, log, **options)
+
+    def resume(self, batch, log=None, **options):
+        # 继续执行中断的批次中尚未执行的步骤
+        writer = JournalWriter(batch.path)
+        done = batch.reconcile(writer)
+        failed_files = {batch.steps[number][3] for number, ok in batch.status.items() if not ok}
+
+        files = {}
+        for source, _, _, file_number, _ in batch.steps:
+            if file_number not in files:
+                files[file_number] = {'path': source, 'filename': os.path.basename(source)}
+
+        steps = []
+        numbers = []
+        for number, (source, target, final, file_number, after) in enumerate(batch.steps):
+            if number in done or number in batch.status or file_number in failed_files:
+                continue
+            steps.append((files[file_number], source, target, final, None if after is None else files[after]))
+            numbers.append(number)
+        return execute_steps(steps, log, writer=writer, check_free=True, step_numbers=numbers, kind='resume', **options)
@@ -0,0 +1,136 @@
+import os
+
+# 重命名规划：执行前在内存中解决所有冲突，执行时每个文件只调用一次 os.rename
+#   - 每个目标目录只列一次，之后的冲突检测都在内存中完成，不再逐个检查文件是否存在
+#   - 目标名已被其他文件占用时，使用确定的计数后缀：名称_1.mkv、名称_2.mkv ……
+#   - 目标名是本批另一个文件的原名时，先重命名占位的文件；互相交换或成环时借助临时文件名
+
+# 临时文件名：.原名.renaming-序号
+TEMP_NAME_FORMAT = '.{name}.renaming-{counter}'
+
+
+def _is_case_insensitive(directory, names):
+    # 用一个已有文件切换大小写后能否访问到同一文件，判断目录所在文件系统是否大小写不敏感
+    if os.name == 'nt':
+        return True
+    for name in names:
+        swapped = name.swapcase()
+        if swapped != name:
+            try:
+                return os.path.samefile(os.path.join(directory, name), os.path.join(directory, swapped))
+            except OSError:
+                return False
+    return False
+
+
+class DirectoryNames:
+    # 一个目录中已占用的文件名（只列一次目录）
+    def __init__(self, directory):
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            names = []
+        self.case_insensitive = _is_case_insensitive(directory, names)
+        self.taken = {self.key(name) for name in names}
+
+    def key(self, name):
+        return name.casefold() if self.case_insensitive else name
+
+    def unique_name(self, name, make_candidate):
+        # 按计数依次尝试 make_candidate(name, n)，返回第一个未被占用的名称并标记为已占用
+        counter = 1
+        candidate = make_candidate(name, counter)
+        while self.key(candidate) in self.taken:
+            counter += 1
+            candidate = make_candidate(name, counter)
+        self.taken.add(self.key(candidate))
+        return candidate
+
+
+def _counter_name(name, counter):
+    base_name, ext = os.path.splitext(name)
+    return f'{base_name}_{counter}{ext}'
+
+
+def _temp_name(name, counter):
+    return TEMP_NAME_FORMAT.format(name=name, counter=counter)
+
+
+def resolve_renames(plan):
+    # plan: [(file_info, 新路径), ...]
+    # 返回执行步骤 [(file_info, 当前路径, 目标路径, 是否为最终名称, 依赖的 file_info), ...]，
+    # 按顺序执行即可，每一步的目标路径在执行时都是空闲的（假设期间没有其他程序改动这些目录）
+    # 依赖的 file_info 不为 None 时，目标路径原先是该文件的原名：该文件重命名失败时必须跳过这一步，
+    # 否则会覆盖它（POSIX 上 os.rename 会直接替换已存在的文件）
+    directories = {}
+
+    def names_in(directory):
+        names = directories.get(directory)
+        if names is None:
+            names = directories[directory] = DirectoryNames(directory)
+        return names
+
+    # 1. 本批文件的原名在重命名后会被释放，先从已占用集合中移除
+    moves = []
+    for file_info, new_path in plan:
+        old_path = file_info['path']
+        old_dir, old_name = os.path.split(old_path)
+        old_names = names_in(old_dir)
+        old_names.taken.discard(old_names.key(old_name))
+        moves.append([file_info, old_path, new_path])
+
+    # 2. 依次为每个文件确定最终名称：已被其他文件占用（含本批中排在前面的文件）时加计数后缀
+    for move in moves:
+        directory, name = os.path.split(move[2])
+        names = names_in(directory)
+        if names.key(name) in names.taken:
+            name = names.unique_name(name, _counter_name)
+            move[2] = os.path.join(directory, name)
+        else:
+            names.taken.add(names.key(name))
+
+    # 3. 确定执行顺序：目标是另一个文件的原名时，那个文件必须先移走
+    def path_key(path):
+        directory, name = os.path.split(path)
+        return directory, names_in(directory).key(name)
+
+    source_of = {path_key(move[1]): i for i, move in enumerate(moves)}
+    blocker = []
+    for i, move in enumerate(moves):
+        j = source_of.get(path_key(move[2]))
+        blocker.append(j if j is not None and j != i else None)
+
+    def step(k, source=None, final=True):
+        move = moves[k]
+        after = blocker[k]
+        return (move[0], source or move[1], move[2], final, None if after is None else moves[after][0])
+
+    steps = []
+    visited = set()
+    for i in range(len(moves)):
+        if i in visited:
+            continue
+        # 沿"被谁占用"的链向前走，链上的文件要倒序执行
+        chain = []
+        j = i
+        while j is not None and j not in visited:
+            visited.add(j)
+            chain.append(j)
+            j = blocker[j]
+
+        if j is not None and j in chain:
+            # 成环：环上第一个文件先改为临时名，其余倒序执行，最后再把临时名改为最终名称
+            start = chain.index(j)
+            cycle = chain[start:]
+            head = moves[cycle[0]]
+            directory, name = os.path.split(head[1])
+            temp_path = os.path.join(directory, names_in(directory).unique_name(name, _temp_name))
+            steps.append((head[0], head[1], temp_path, False, None))
+            for k in reversed(cycle[1:]):
+                steps.append(step(k))
+            steps.append(step(cycle[0], temp_path))
+            chain = chain[:start]
+
+        for k in reversed(chain):
+            steps.append(step(k))
+    return steps
@@ -0,0 +1,85 @@
+import time
+import queue
+import threading
+
+# 后台重命名：重命名在工作线程中进行，日志消息放入队列、进度写入属性，由界面线程定时取出
+# 工作线程从不直接访问界面；界面线程按固定间隔刷新，文件再多也不会被逐条更新拖慢
+
+# 界面刷新进度和日志的间隔（秒）
+PROGRESS_INTERVAL = 0.1
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return '--:--'
+    seconds = int(seconds + 0.5)
+    if seconds >= 3600:
+        return f'{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+    return f'{seconds // 60:02d}:{seconds % 60:02d}'
+
+
+class RenameProgress:
+    # 已处理文件数、总数及预计剩余时间，只由工作线程写入
+    def __init__(self):
+        self.done = 0
+        self.total = 0
+        self.started = time.monotonic()
+
+    def update(self, done, total):
+        self.done = done
+        self.total = total
+
+    def eta(self):
+        # 按目前的平均速度估计剩余秒数，尚无完成的文件时返回 None
+        if not self.done:
+            return None
+        elapsed = time.monotonic() - self.started
+        return elapsed / self.done * (self.total - self.done)
+
+    def describe(self):
+        return f'已处理 {self.done}/{self.total}，预计剩余 {format_eta(self.eta())}'
+
+
+class RenameJob:
+    # work(log, progress, cancel_event) 执行实际的重命名并返回 (成功数, 失败数)，
+    # 例如 lambda log, progress, cancel_event: apply_renames(plan, log, progress=progress, cancel_event=cancel_event)
+    def __init__(self, work, cancellable=True):
+        self.work = work
+        self.cancellable = cancellable
+        self.messages = queue.Queue()
+        self.progress = RenameProgress()
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.result = None
+        self.error = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def finished(self):
+        return not self.thread.is_alive() and (self.result is not None or self.error is not None)
+
+    def start(self):
+        self.progress.started = time.monotonic()
+        self.thread.start()
+
+    def cancel(self):
+        if self.cancellable:
+            self.cancel_event.set()
+
+    def run(self):
+        try:
+            self.result = self.work(self.messages.put, self.progress.update, self.cancel_event)
+        except Exception as e:
+            self.error = e
+
+    def drain(self):
+        # 在界面线程中调用：取出目前为止的全部日志消息
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
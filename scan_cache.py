@@ -0,0 +1,74 @@
+import os
+import json
+import sqlite3
+
+# 目录扫描缓存（SQLite，默认放在 config.json 旁边）
+# 每个目录保存一行：目录的 mtime/inode/设备号、子目录名、以及其中视频文件的名称和大小
+# （扩展名和数字序列由 FileRecord 按需从文件名得出，不入缓存）
+# 目录中增删或重命名文件都会改变目录的 mtime，因此 mtime/inode 未变时可以直接使用缓存的列表，
+# 无需再次列目录和逐个 stat 文件
+# 注意：文件内容变化（如仍在下载的文件变大）不会改变目录 mtime，缓存中的大小可能偏旧
+
+SCAN_CACHE_FILE = 'scan_cache.db'
+# 缓存行格式的版本（PRAGMA user_version），与文件中的不一致时清空重建
+#   1: files 为 [文件名列表, 扩展名列表, 大小列表, 数字序列列表]
+#   2: files 为 [文件名列表, 大小列表]
+SCAN_CACHE_VERSION = 2
+
+
+def cache_file_for(config_file):
+    # 缓存文件与配置文件放在同一目录
+    return os.path.join(os.path.dirname(os.path.abspath(config_file)), SCAN_CACHE_FILE)
+
+
+class ScanCache:
+    def __init__(self, db_file=SCAN_CACHE_FILE):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file)
+        try:
+            if self.conn.execute('PRAGMA user_version').fetchone()[0] != SCAN_CACHE_VERSION:
+                self.conn.execute('DROP TABLE IF EXISTS dirs')
+                self.conn.execute(f'PRAGMA user_version = {SCAN_CACHE_VERSION}')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS dirs ('
+                'path TEXT PRIMARY KEY, mtime_ns INTEGER, inode INTEGER, dev INTEGER, '
+                'subdirs TEXT, files TEXT)'
+            )
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.close()
+            raise
+
+    def load_subtree(self, root):
+        # 读取 root 及其所有子目录的缓存行：{目录: (mtime_ns, inode, dev, subdirs_json, files_json)}
+        # JSON 只在命中时才解析
+        root = os.path.normpath(os.path.abspath(root))
+        prefix = root if root.endswith(os.sep) else root + os.sep
+        rows = self.conn.execute(
+            'SELECT path, mtime_ns, inode, dev, subdirs, files FROM dirs '
+            'WHERE path = ? OR (path >= ? AND path < ?)',
+            (root, prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+        )
+        return {row[0]: row[1:] for row in rows}
+
+    def store(self, entries):
+        # entries: [(目录, os.stat 结果, 子目录名列表, [文件名列表, 大小列表]), ...]
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO dirs (path, mtime_ns, inode, dev, subdirs, files) VALUES (?, ?, ?, ?, ?, ?)',
+            [
+                (path, st.st_mtime_ns, st.st_ino, st.st_dev,
+                 json.dumps(subdirs, ensure_ascii=False), json.dumps(files, ensure_ascii=False))
+                for path, st, subdirs, files in entries
+            ]
+        )
+        self.conn.commit()
+
+    def clear(self):
+        self.conn.execute('DELETE FROM dirs')
+        self.conn.commit()
+
+    def close(self):
+        try:
+            self.conn.close()
+        except sqlite3.Error:
+            pass
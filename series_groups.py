@@ -0,0 +1,108 @@
+import re
+import copy
+from functools import lru_cache
+
+from name_template import render_names
+from episode_detector import analyze_episode_fields, field_values
+from release_lexer import lex_release
+import perf_stats
+
+# 多部剧集一起重命名：按规范化的剧集标题把文件分组，每组各自的标题、季数和集数序列，整批一次渲染和重命名
+#   - 标题和季数取自 release_lexer.lex_release，与 [原标题] 占位符的解析结果一致：
+#     去掉 [字幕组]、(画质) 等括号标签和 ★04月新番★ 这类装饰，截到集数、季数或画质标签之前
+#   - 规范化（忽略大小写、标点和空白）后的标题加季数作为分组键，整批文件只需遍历一次、按哈希归组
+#   - 每组单独识别集数字段；识别不出时（如组内只有一个文件）沿用整批的集数字段（通常是 " - 03" 这类各剧集共用的位置），
+#     其次取带有明确集数标记（EP、第…话）的数字，再不行按组内序号编号
+#   - 用户可以按分组键修改某组的标题和季数（RenameSettings.series_overrides）
+
+# 组内无法按变化方式识别时，集数标记的权重至少为此值才采用
+MARKER_PRIOR = 0.9
+_KEY_RE = re.compile(r'[\W_]+')
+
+
+def series_of(filename):
+    # 返回 (分组键, 标题, 季数)，季数未标明时为 ''
+    info = lex_release(filename)
+    title = info.title or ''
+    season = info.season or ''
+    return f'{season}:{_title_key(title)}', title, season
+
+
+@lru_cache(maxsize=4096)
+def _title_key(title):
+    return _KEY_RE.sub(' ', title).strip().casefold()
+
+
+class SeriesGroup:
+    def __init__(self, key, title, season):
+        self.key = key
+        self.title = title
+        self.season = season
+        # 组内文件保持列表中的顺序，没有集数字段的文件按组内序号编号
+        self.files = []
+        self.episode_field = None
+        self.confidence = 0.0
+
+    def detect_episode_field(self, fallback=None):
+        analysis = analyze_episode_fields(self.files)
+        self.confidence = analysis.confidence
+        if analysis.is_confident:
+            self.episode_field = analysis.best.key
+        elif fallback is not None and any(value is not None for value in field_values(self.files, fallback)):
+            self.episode_field = fallback
+        elif analysis.best is not None and analysis.best.prior >= MARKER_PRIOR:
+            self.episode_field = analysis.best.key
+        else:
+            self.episode_field = None
+
+    def settings_for(self, settings):
+        # 本组的命名参数：用户修改过的标题和季数优先，其次是从文件名得出的，再次是界面上填写的
+        override = (settings.series_overrides or {}).get(self.key, {})
+        group_settings = copy.copy(settings)
+        group_settings.title = override.get('title') or self.title or settings.title
+        group_settings.season = override.get('season') or self.season or settings.season
+        group_settings.episode_field = self.episode_field
+        group_settings.episode_pattern = None
+        return group_settings
+
+
+def group_by_series(files, episode_field=None):
+    # 按剧集分组，返回 SeriesGroup 列表（按首次出现的顺序）；episode_field 为整批识别出的集数字段
+    groups = {}
+    with perf_stats.span('group', len(files)):
+        for file_info in files:
+            key, title, season = series_of(file_info['filename'])
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = SeriesGroup(key, title, season)
+            group.files.append(file_info)
+        for group in groups.values():
+            group.detect_episode_field(episode_field)
+    return list(groups.values())
+
+
+def render_series_names(settings, files, groups=None):
+    # 各组分别渲染，返回与 files 顺序一致的新文件名；groups 可传入已分好的组（须由同一批文件得出）
+    if groups is None:
+        groups = group_by_series(files, settings.episode_field)
+    names = {}
+    for group in groups:
+        for file_info, name in zip(group.files, render_names(group.settings_for(settings), group.files)):
+            names[id(file_info)] = name
+    return [names[id(file_info)] for file_info in files]
+
+
+def series_order(groups, title_key):
+    # 各组依次排列、组内按集数排序时每个文件的位置：{id(文件): 位置}
+    # 组内文件同时改为排序后的顺序，按组内序号编号时与列表显示一致
+    # groups 也按同样的顺序重新排列
+    order = {}
+    groups.sort(key=lambda group: (title_key(group.title), group.season))
+    for group in groups:
+        if group.episode_field is not None:
+            files = group.files
+            values = [int(value) if value is not None else 0 for value in field_values(files, group.episode_field)]
+            group.files = [files[i] for i in sorted(range(len(files)), key=values.__getitem__)]
+        for file_info in group.files:
+            order[id(file_info)] = len(order)
+    return order
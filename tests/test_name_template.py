@@ -0,0 +1,27 @@
+from rename_engine import FileRecord, RenameSettings, render_batch_names
+
+RULE = '[标题] 第[季数]季 第[集数]集'
+
+
+def make_files():
+    return [FileRecord('/videos/', name, 0) for name in ('Show 01.mkv', 'Show 02.mkv', 'Show 03.mkv')]
+
+
+def test_season_episode_rule_kept_by_default():
+    # Qt 前端和命令行：自定义规则原样输出
+    settings = RenameSettings(custom_rule=RULE, title='Show', season='1')
+    names = render_batch_names(settings, make_files())
+    assert names[2] == 'Show 第1季 第03集.mkv'
+
+
+def test_season_episode_join_for_tk():
+    # Tk 前端的旧规则：同时含"季"和"集"时改写为"标题 - 季数 - 集数"
+    settings = RenameSettings(custom_rule=RULE, title='Show', season='1', season_episode_join=True)
+    names = render_batch_names(settings, make_files())
+    assert names[2] == 'Show - 1 - 03.mkv'
+
+
+def test_season_episode_join_saved_in_config():
+    settings = RenameSettings(season_episode_join=True)
+    assert RenameSettings.from_config(settings.to_config()).season_episode_join
+    assert not RenameSettings.from_config({}).season_episode_join
@@ -0,0 +1,40 @@
+import os
+
+from rename_executor import STEP_FAILED, STEP_OK, group_steps, run_steps
+
+
+def test_after_keeps_steps_in_one_group():
+    # 路径写法不同（大小写不敏感的挂载点上 B.mkv 就是 b.mkv），只靠 after 把两个文件连在一起
+    steps = [
+        (0, '/v/a.mkv', '/v/B.mkv', 1),
+        (1, '/v/b.mkv', '/v/c.mkv', None),
+        (2, '/v/x.mkv', '/v/y.mkv', None),
+    ]
+    assert sorted(group_steps(steps)) == [[0, 1], [2]]
+
+
+def test_after_chain_joins_groups_transitively():
+    # a 等 b 移走，b 等 c 移走：三个文件同一组，组内保持规划顺序
+    steps = [
+        (2, '/v/c.mkv', '/v/d.mkv', None),
+        (1, '/v/b.mkv', '/v/C.mkv', 2),
+        (0, '/v/a.mkv', '/v/B.mkv', 1),
+    ]
+    assert group_steps(steps) == [[0, 1, 2]]
+
+
+def test_step_after_failed_file_is_not_run(tmp_path):
+    # b 改名失败时，等它移走的 a 不能执行，否则会覆盖 b
+    a, b = {'name': 'a'}, {'name': 'b'}
+    (tmp_path / 'a.mkv').write_text('a')
+    (tmp_path / 'b.mkv').write_text('b')
+    steps = [
+        (b, str(tmp_path / 'b.mkv'), str(tmp_path / 'missing' / 'c.mkv'), True, None),
+        (a, str(tmp_path / 'a.mkv'), str(tmp_path / 'b.mkv'), True, b),
+        ({'name': 'x'}, str(tmp_path / 'x.mkv'), str(tmp_path / 'y.mkv'), True, None),
+    ]
+    (tmp_path / 'x.mkv').write_text('x')
+    results = {number: result for number, result, _, _ in run_steps(steps, workers_per_mount=4)}
+    assert results == {0: STEP_FAILED, 1: STEP_FAILED, 2: STEP_OK}
+    assert (tmp_path / 'b.mkv').read_text() == 'b'
+    assert sorted(os.listdir(tmp_path)) == ['a.mkv', 'b.mkv', 'y.mkv']
@@ -0,0 +1,56 @@
+import os
+
+from rename_engine import make_file_record
+from rename_journal import RenameJournal
+from rename_planner import resolve_renames
+
+MAPPING = {'1.mkv': '2.mkv', '2.mkv': '3.mkv', '3.mkv': '1.mkv', 'x.mkv': 'y.mkv'}
+
+
+def crash_mid_batch(tmp_path, executed, recorded):
+    # 模拟崩溃：日志中只有前 recorded 步的结果（其余尚未 fsync），文件系统上已执行了前 executed 步，
+    # 最后一行只写了一半，也没有结束记录
+    folder = tmp_path / 'videos'
+    folder.mkdir()
+    for name in MAPPING:
+        (folder / name).write_text(name)
+    files = [make_file_record(str(folder / name)) for name in MAPPING]
+    steps = resolve_renames([(file_info, str(folder / MAPPING[file_info['filename']])) for file_info in files])
+    journal = RenameJournal(str(tmp_path / 'journal'))
+    writer = journal.begin(steps)
+    for number, (_, source, target, _, _) in enumerate(steps[:executed]):
+        os.rename(source, target)
+        if number < recorded:
+            writer.record(number, True)
+    writer.file.write('{"step": ')
+    writer.close()
+    return folder, journal, len(steps)
+
+
+def contents(folder):
+    return {name: (folder / name).read_text() for name in os.listdir(folder)}
+
+
+def test_resume_then_undo_after_crash(tmp_path):
+    folder, journal, step_count = crash_mid_batch(tmp_path, executed=2, recorded=1)
+    assert step_count == 5
+    batch, = journal.interrupted()
+    assert batch.file_count == 4
+
+    # 崩溃前已执行环上的临时名和一个文件的最终名称，其余 3 个文件由恢复完成
+    assert journal.resume(batch) == (3, 0)
+    assert contents(folder) == {new: old for old, new in MAPPING.items()}
+    assert journal.interrupted() == []
+
+    batch = journal.last_undoable()
+    assert journal.undo(batch) == (4, 0)
+    assert contents(folder) == {name: name for name in MAPPING}
+    assert journal.last_undoable() is None
+
+
+def test_undo_interrupted_batch_rolls_back(tmp_path):
+    folder, journal, _ = crash_mid_batch(tmp_path, executed=3, recorded=0)
+    batch, = journal.interrupted()
+    journal.undo(batch)
+    assert contents(folder) == {name: name for name in MAPPING}
+    assert journal.interrupted() == []
@@ -0,0 +1,45 @@
+import os
+
+from rename_engine import apply_renames, make_file_record
+from rename_planner import resolve_renames
+
+
+def write_files(folder, names):
+    # 每个文件的内容是自己的原名，重命名后据此确认文件没有被覆盖
+    for name in names:
+        (folder / name).write_text(name)
+    return [make_file_record(str(folder / name)) for name in names]
+
+
+def rename_all(folder, mapping):
+    files = write_files(folder, list(mapping))
+    plan = [(file_info, str(folder / mapping[file_info['filename']])) for file_info in files]
+    success_count, error_count = apply_renames(plan)
+    assert (success_count, error_count) == (len(mapping), 0)
+    return {name: (folder / name).read_text() for name in os.listdir(folder)}
+
+
+def test_swap_two_files(tmp_path):
+    contents = rename_all(tmp_path, {'a.mkv': 'b.mkv', 'b.mkv': 'a.mkv'})
+    assert contents == {'a.mkv': 'b.mkv', 'b.mkv': 'a.mkv'}
+
+
+def test_longer_cycle(tmp_path):
+    mapping = {'1.mkv': '2.mkv', '2.mkv': '3.mkv', '3.mkv': '4.mkv', '4.mkv': '1.mkv'}
+    contents = rename_all(tmp_path, mapping)
+    assert contents == {new: old for old, new in mapping.items()}
+
+
+def test_chain_and_cycle_in_one_batch(tmp_path):
+    # a -> b -> c -> d 是链（d 空闲，倒序执行），x <-> y 互换
+    mapping = {'a.mkv': 'b.mkv', 'b.mkv': 'c.mkv', 'c.mkv': 'd.mkv', 'x.mkv': 'y.mkv', 'y.mkv': 'x.mkv'}
+    contents = rename_all(tmp_path, mapping)
+    assert contents == {new: old for old, new in mapping.items()}
+
+
+def test_cycle_uses_one_temp_name(tmp_path):
+    files = write_files(tmp_path, ['a.mkv', 'b.mkv'])
+    steps = resolve_renames([(files[0], str(tmp_path / 'b.mkv')), (files[1], str(tmp_path / 'a.mkv'))])
+    temps = [step for step in steps if not step[3]]
+    assert len(steps) == 3 and len(temps) == 1
+    assert os.path.basename(temps[0][2]).startswith('.a.mkv.renaming-')
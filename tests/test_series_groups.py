@@ -0,0 +1,42 @@
+import os
+
+import rename_cli
+from series_groups import series_of
+
+RELEASES = [
+    '【喵萌奶茶屋】★04月新番★[间谍过家家][01][1080p][简日双语].mp4',
+    '【喵萌奶茶屋】★04月新番★[间谍过家家][02][1080p][简日双语].mp4',
+    '【喵萌奶茶屋】★10月新番★[葬送的芙莉莲][01][1080p][简日双语].mp4',
+    '【喵萌奶茶屋】★10月新番★[葬送的芙莉莲][02][1080p][简日双语].mp4',
+]
+
+
+def test_series_of_uses_bracket_title_after_decoration():
+    key, title, season = series_of(RELEASES[0])
+    assert (title, season) == ('间谍过家家', '')
+    assert key == ':间谍过家家'
+
+
+def test_series_of_season_after_dash():
+    assert series_of('[G] Oshi no Ko - 2nd Season - 03 [1080p].mkv')[1:] == ('Oshi no Ko', '2')
+    assert series_of('[G] 标题 第二季 - 03.mkv')[1:] == ('标题', '2')
+
+
+def test_group_series_renames_decorated_releases(tmp_path):
+    folder = tmp_path / 'videos'
+    folder.mkdir()
+    for name in RELEASES:
+        (folder / name).write_bytes(b'')
+
+    status = rename_cli.main([
+        str(folder), '--group-series', '--config', str(tmp_path / 'config.json'),
+        '--log-file', str(tmp_path / 'rename_log.txt'), '--no-cache'
+    ])
+
+    assert status == 0
+    assert sorted(os.listdir(folder)) == [
+        '番剧 - 葬送的芙莉莲 - 1 - 01.mp4',
+        '番剧 - 葬送的芙莉莲 - 1 - 02.mp4',
+        '番剧 - 间谍过家家 - 1 - 01.mp4',
+        '番剧 - 间谍过家家 - 1 - 02.mp4',
+    ]
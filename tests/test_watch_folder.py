@@ -0,0 +1,14 @@
+import os
+
+from rename_engine import RenameSettings, make_file_record
+from watch_folder import FolderWatcher
+
+
+def test_rename_batch_takes_episode_from_release_name(tmp_path):
+    names = ['[G] Show - 07v2 [1080p].mkv', 'Show.S01E05.1080p.mkv', '【G】★04月新番★[Show][09][1080p].mp4']
+    for name in names:
+        (tmp_path / name).write_bytes(b'x')
+    settings = RenameSettings(template='[标题] - [季数] - [集数]', title='Show', season='1')
+    watcher = FolderWatcher([str(tmp_path)], settings, use_inotify=False)
+    watcher.rename_batch([make_file_record(str(tmp_path / name), 1) for name in names])
+    assert sorted(os.listdir(tmp_path)) == ['Show - 1 - 05.mkv', 'Show - 1 - 07.mkv', 'Show - 1 - 09.mp4']
@@ -0,0 +1,144 @@
+import tkinter as tk
+from tkinter import ttk
+
+# 虚拟化表格：Treeview 中只保留可见的若干行，滚动时复用这些行并按需取数据
+# 数据由 get_rows(start, stop) 提供，返回 [start, stop) 区间内每行的取值元组
+
+
+class VirtualTreeview(ttk.Frame):
+    def __init__(self, master, columns, get_rows, height=10, **kwargs):
+        super().__init__(master, **kwargs)
+        self.get_rows = get_rows
+        self.height = height
+        self.row_count = 0
+        self.offset = 0
+        # 选中的行号（全局行号，滚出可见区域后依然保留）
+        self.selected = set()
+
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', height=height)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(fill=tk.X, expand=False)
+
+        # 可见行对应的 Treeview 条目及其当前显示的内容
+        self.items = []
+        self.shown_rows = []
+
+        # 滚轮只滚动表格本身，不再传递给外层滚动区域
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', self.on_mousewheel)
+        self.tree.bind('<Button-5>', self.on_mousewheel)
+        self.tree.bind('<Prior>', lambda e: self.scroll_by(-self.height))
+        self.tree.bind('<Next>', lambda e: self.scroll_by(self.height))
+        self.tree.bind('<<TreeviewSelect>>', self.on_select)
+
+    def heading(self, column, **kwargs):
+        return self.tree.heading(column, **kwargs)
+
+    def column(self, column, **kwargs):
+        return self.tree.column(column, **kwargs)
+
+    def set_row_count(self, count):
+        self.row_count = count
+        self.selected = {i for i in self.selected if i < count}
+        self.offset = max(0, min(self.offset, count - self.height))
+        self.refresh()
+
+    def refresh(self):
+        # 重新获取可见区域的数据，只改动内容发生变化的单元格
+        stop = min(self.offset + self.height, self.row_count)
+        rows = self.get_rows(self.offset, stop) if stop > self.offset else []
+        self.sync_rows(rows)
+
+        visible = [item for i, item in enumerate(self.items) if self.offset + i in self.selected]
+        if tuple(visible) != self.tree.selection():
+            self.tree.selection_set(visible)
+
+        if self.row_count:
+            self.scrollbar.set(self.offset / self.row_count, stop / self.row_count)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def sync_rows(self, new_rows):
+        columns = self.tree['columns']
+        items = self.items
+        old_rows = self.shown_rows
+        for i in range(min(len(items), len(new_rows))):
+            old_row = old_rows[i]
+            new_row = new_rows[i]
+            if old_row == new_row:
+                continue
+            changed = [c for c in range(len(columns)) if old_row[c] != new_row[c]]
+            if len(changed) == 1:
+                self.tree.set(items[i], columns[changed[0]], new_row[changed[0]])
+            else:
+                self.tree.item(items[i], values=new_row)
+
+        # 删除多余的行或追加新行
+        if len(items) > len(new_rows):
+            self.tree.delete(*items[len(new_rows):])
+            del items[len(new_rows):]
+        for row in new_rows[len(items):]:
+            items.append(self.tree.insert('', tk.END, values=row))
+
+        self.shown_rows = list(new_rows)
+
+    def yview(self, *args):
+        # 滚动条回调：('moveto', 比例) 或 ('scroll', 数量, 'units'/'pages')
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * self.row_count))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.height
+            self.scroll_by(amount)
+
+    def scroll_by(self, amount):
+        self.scroll_to(self.offset + amount)
+        return 'break'
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, self.row_count - self.height))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+
+    def see(self, index):
+        if index < self.offset:
+            self.scroll_to(index)
+        elif index >= self.offset + self.height:
+            self.scroll_to(index - self.height + 1)
+
+    def on_mousewheel(self, event):
+        if event.num == 4:
+            delta = -3
+        elif event.num == 5:
+            delta = 3
+        else:
+            delta = -1 * (event.delta // 120) * 3
+        return self.scroll_by(delta)
+
+    def on_select(self, event=None):
+        selection = set(self.tree.selection())
+        for i, item in enumerate(self.items):
+            if item in selection:
+                self.selected.add(self.offset + i)
+            else:
+                self.selected.discard(self.offset + i)
+
+    def index_of(self, item):
+        return self.offset + self.items.index(item)
+
+    def identify_row(self, y):
+        return self.tree.identify_row(y)
+
+    def select_index(self, index):
+        self.selected = {index}
+        self.refresh()
+
+    def selection_indices(self):
+        return sorted(self.selected)
+
+    def clear_selection(self):
+        self.selected.clear()
+        self.refresh()
@@ -0,0 +1,216 @@
+import os
+import sys
+import time
+import copy
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+from release_lexer import lex_release_cached
+from rename_engine import is_video_file, make_file_record, natural_sort_key, plan_renames, apply_renames
+
+# 监视文件夹：下载完成的新视频文件（大小在一段时间内不再变化）按已保存的规则自动重命名
+# Linux 上使用 inotify（通过 ctypes 调用 libc，无额外依赖），空闲时阻塞等待事件，几乎不占 CPU；
+# 其他平台或 inotify 不可用时，退回到定时检查目录 mtime 的轮询方式
+# 只监视给定的文件夹本身，不包括子文件夹
+
+# 文件大小保持不变多久才认为下载完成（秒）
+DEFAULT_SETTLE_SECONDS = 5.0
+# 轮询方式下检查目录的间隔（秒）
+DEFAULT_POLL_INTERVAL = 2.0
+
+# inotify 事件掩码
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyBackend:
+    # 阻塞等待 inotify 事件，返回有变化的文件路径
+    def __init__(self, folders):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        self.watches = {}
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        for folder in folders:
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), mask)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f'无法监视文件夹: {folder}')
+            self.watches[wd] = folder
+
+    def wait(self, timeout):
+        # timeout 为 None 时一直等待；返回 (变化的路径列表, 是否需要全量重新扫描)
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return [], False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return [], False
+            raise
+        paths = []
+        overflow = False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+            elif name and not mask & IN_ISDIR and wd in self.watches:
+                paths.append(os.path.join(self.watches[wd], os.fsdecode(name)))
+        return paths, overflow
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    # 定时检查目录 mtime，目录有变化时才重新列目录
+    def __init__(self, folders, interval=DEFAULT_POLL_INTERVAL):
+        self.folders = folders
+        self.interval = interval
+        self.mtimes = {folder: self.dir_mtime(folder) for folder in folders}
+
+    @staticmethod
+    def dir_mtime(folder):
+        try:
+            return os.stat(folder).st_mtime_ns
+        except OSError:
+            return None
+
+    def wait(self, timeout):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        paths = []
+        for folder in self.folders:
+            mtime = self.dir_mtime(folder)
+            if mtime != self.mtimes[folder]:
+                self.mtimes[folder] = mtime
+                paths.extend(list_video_files(folder))
+        return paths, False
+
+    def close(self):
+        pass
+
+
+def list_video_files(folder):
+    try:
+        with os.scandir(folder) as it:
+            return [entry.path for entry in it if entry.is_file() and is_video_file(entry.name)]
+    except OSError:
+        return []
+
+
+class FolderWatcher:
+    def __init__(self, folders, settings, log=None, settle_seconds=DEFAULT_SETTLE_SECONDS,
+                 poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=True, journal=None, history=None):
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.settings = settings
+        self.log = log or (lambda message: None)
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.journal = journal
+        self.history = history
+        # 等待下载完成的文件：{路径: (大小, mtime, 最后一次变化的时间)}
+        self.pending = {}
+        # 已存在或已处理过的文件，不再重命名
+        self.seen = set()
+
+    def open_backend(self):
+        if self.use_inotify and sys.platform.startswith('linux'):
+            try:
+                return InotifyBackend(self.folders)
+            except (OSError, AttributeError) as e:
+                self.log(f'inotify 不可用，改为轮询: {str(e)}')
+        return PollingBackend(self.folders, self.poll_interval)
+
+    def run(self, stop_event=None):
+        # 启动时已存在的文件视为已处理，只重命名之后出现的新文件
+        for folder in self.folders:
+            self.seen.update(list_video_files(folder))
+
+        backend = self.open_backend()
+        self.log(f'开始监视文件夹: {", ".join(self.folders)}')
+        try:
+            while stop_event is None or not stop_event.is_set():
+                # 没有待定文件时一直阻塞等待；有待定文件时按稳定时间定期检查
+                timeout = None if not self.pending else self.settle_seconds / 2
+                if stop_event is not None:
+                    timeout = 1.0 if timeout is None else min(timeout, 1.0)
+                paths, overflow = backend.wait(timeout)
+                if overflow:
+                    # 事件队列溢出：重新列出所有文件夹
+                    for folder in self.folders:
+                        paths.extend(list_video_files(folder))
+                self.add_candidates(paths)
+                ready = self.collect_ready(time.monotonic())
+                if ready:
+                    self.rename_batch(ready)
+        finally:
+            backend.close()
+            self.log('停止监视文件夹')
+
+    def add_candidates(self, paths):
+        now = time.monotonic()
+        for path in paths:
+            if path in self.seen or not is_video_file(path):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            previous = self.pending.get(path)
+            if previous is None or previous[:2] != (st.st_size, st.st_mtime_ns):
+                self.pending[path] = (st.st_size, st.st_mtime_ns, now)
+
+    def collect_ready(self, now):
+        # 大小和 mtime 在 settle_seconds 内未变化的文件视为下载完成
+        ready = []
+        for path, (size, mtime, changed_at) in list(self.pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                # 文件已被删除或移走
+                del self.pending[path]
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime):
+                self.pending[path] = (st.st_size, st.st_mtime_ns, now)
+            elif st.st_size > 0 and now - changed_at >= self.settle_seconds:
+                del self.pending[path]
+                ready.append(make_file_record(path, st.st_size))
+        return ready
+
+    def rename_batch(self, files):
+        # 同一批文件一起规划和重命名；能从发布名中识别集数时使用识别到的集数，
+        # 其余文件按自然顺序交给已保存的规则（集数数字或序号）
+        plan = []
+        unmatched = []
+        for file_info in files:
+            self.seen.add(file_info['path'])
+            episode = lex_release_cached(file_info['filename']).episode
+            if episode and not self.settings.episode:
+                settings = copy.copy(self.settings)
+                settings.episode = episode.zfill(2)
+                plan.extend(plan_renames([file_info], settings))
+            else:
+                unmatched.append(file_info)
+        if unmatched:
+            unmatched.sort(key=lambda f: natural_sort_key(f['filename']))
+            plan.extend(plan_renames(unmatched, self.settings))
+
+        renamed = []
+        apply_renames(plan, self.log, renamed, self.journal, history=self.history, template=self.settings.rule)
+        for _, new_path in renamed:
+            self.seen.add(new_path)